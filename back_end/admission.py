@@ -0,0 +1,195 @@
+"""
+Admission control for outbound LLM requests.
+
+A request is admitted when fewer than max_in_flight requests are running
+and the token bucket (requests_per_minute, with a small burst) has a
+token. Otherwise it waits in a bounded FIFO queue until it can go or its
+deadline passes. A full queue or a missed deadline sheds the request
+right away with AdmissionRejected, instead of letting every request
+pile onto the provider and hit its rate limit together.
+
+acquire() blocks the calling thread. acquire_async() waits on the event
+loop instead, in the same queue, so the ASGI app never parks threads of
+the executor that retrieval also runs on.
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+
+from llm_gateway import LLMUnavailable
+from metrics import Histogram
+
+WAIT_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+DEPTH_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+
+class AdmissionRejected(LLMUnavailable):
+    # Shed before reaching the provider: queue full or deadline passed
+    def __init__(self, reason):
+        super().__init__(f"LLM request shed ({reason})")
+        self.reason = reason
+
+
+class _AsyncTicket:
+    # Queue entry for an acquire_async() waiter, woken from any thread
+    __slots__ = ('loop', 'event')
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.event = asyncio.Event()
+
+    def wake(self):
+        try:
+            self.loop.call_soon_threadsafe(self.event.set)
+        except RuntimeError:
+            # The loop is closed; its waiter is gone with it
+            pass
+
+
+class AdmissionController:
+    def __init__(self, max_in_flight=8, requests_per_minute=30, burst=None, max_queue=64, max_wait=5.0):
+        self.max_in_flight = max_in_flight
+        # Token bucket refilled at requests_per_minute; burst is its size
+        self.rate = requests_per_minute / 60.0
+        self.capacity = float(burst or max(1, min(max_in_flight, requests_per_minute)))
+        self.tokens = self.capacity
+        self.refilled_at = time.monotonic()
+        self.max_queue = max_queue
+        # Longest time a request may queue, even if its own deadline is later
+        self.max_wait = max_wait
+
+        self.cond = threading.Condition()
+        self.in_flight = 0
+        # Waiters admitted strictly in arrival order
+        self.queue = deque()
+
+        self.admitted = 0
+        self.shed = {'queue_full': 0, 'deadline': 0}
+        self.wait_ms = Histogram(WAIT_BUCKETS_MS)
+        self.queue_depth = Histogram(DEPTH_BUCKETS)
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.refilled_at) * self.rate)
+        self.refilled_at = now
+
+    def _can_start(self, now):
+        self._refill(now)
+        return self.in_flight < self.max_in_flight and self.tokens >= 1.0
+
+    def _start(self, waited):
+        self.tokens -= 1.0
+        self.in_flight += 1
+        self.admitted += 1
+        self.wait_ms.observe(waited * 1000)
+
+    def acquire(self, deadline_at):
+        """Block until admitted or shed; deadline_at is a time.monotonic() value."""
+        start = time.monotonic()
+        deadline_at = min(deadline_at, start + self.max_wait)
+        with self.cond:
+            self.queue_depth.observe(len(self.queue))
+            if not self.queue and self._can_start(start):
+                self._start(0.0)
+                return
+
+            if len(self.queue) >= self.max_queue:
+                self.shed['queue_full'] += 1
+                raise AdmissionRejected('queue_full')
+
+            ticket = object()
+            self.queue.append(ticket)
+            try:
+                while True:
+                    now = time.monotonic()
+                    if self.queue[0] is ticket and self._can_start(now):
+                        self._start(now - start)
+                        return
+                    remaining = deadline_at - now
+                    if remaining <= 0:
+                        self.shed['deadline'] += 1
+                        raise AdmissionRejected('deadline')
+                    # Wake for a release, or when the bucket has a token again
+                    wait = remaining
+                    if self.tokens < 1.0 and self.rate > 0:
+                        wait = min(wait, (1.0 - self.tokens) / self.rate)
+                    self.cond.wait(wait)
+            finally:
+                self.queue.remove(ticket)
+                self._notify()
+
+    async def acquire_async(self, deadline_at):
+        """acquire() for coroutines; a cancelled waiter leaves the queue holding nothing."""
+        start = time.monotonic()
+        deadline_at = min(deadline_at, start + self.max_wait)
+        with self.cond:
+            self.queue_depth.observe(len(self.queue))
+            if not self.queue and self._can_start(start):
+                self._start(0.0)
+                return
+
+            if len(self.queue) >= self.max_queue:
+                self.shed['queue_full'] += 1
+                raise AdmissionRejected('queue_full')
+
+            ticket = _AsyncTicket(asyncio.get_running_loop())
+            self.queue.append(ticket)
+        try:
+            while True:
+                # Admission happens under the lock with no await after it,
+                # so a slot is only ever taken by a caller that gets it
+                with self.cond:
+                    now = time.monotonic()
+                    if self.queue[0] is ticket and self._can_start(now):
+                        self._start(now - start)
+                        return
+                    remaining = deadline_at - now
+                    if remaining <= 0:
+                        self.shed['deadline'] += 1
+                        raise AdmissionRejected('deadline')
+                    wait = remaining
+                    if self.tokens < 1.0 and self.rate > 0:
+                        wait = min(wait, (1.0 - self.tokens) / self.rate)
+                    ticket.event.clear()
+                try:
+                    await asyncio.wait_for(ticket.event.wait(), wait)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            with self.cond:
+                self.queue.remove(ticket)
+                self._notify()
+
+    def try_acquire(self):
+        # Non-blocking admit, for optional extra requests (hedges, retries)
+        with self.cond:
+            if self.queue or not self._can_start(time.monotonic()):
+                return False
+            self._start(0.0)
+            return True
+
+    def release(self):
+        with self.cond:
+            self.in_flight -= 1
+            self._notify()
+
+    def _notify(self):
+        # Wake thread and coroutine waiters alike; called holding the lock
+        self.cond.notify_all()
+        for ticket in self.queue:
+            if isinstance(ticket, _AsyncTicket):
+                ticket.wake()
+
+    def stats(self):
+        with self.cond:
+            self._refill(time.monotonic())
+            return {
+                'in_flight': self.in_flight,
+                'queued': len(self.queue),
+                'tokens': round(self.tokens, 2),
+                'admitted': self.admitted,
+                'shed': dict(self.shed),
+                'wait_ms': self.wait_ms.snapshot(),
+                'queue_depth': self.queue_depth.snapshot()
+            }
@@ -0,0 +1,384 @@
+"""
+Pre-computed answers for the questions students ask most.
+
+The offline job (`python answer_index.py`) clusters the questions in
+chat_history by tf-idf cosine to a running centroid, keeps the clusters
+asked at least min_support times, and maps each one to the FAQ that
+retrieval returns for most of its questions. It then generates one
+answer per cluster through the normal prompt and LLM path. Retrieval
+picking an FAQ does not make it the right one ("connect to campus wifi"
+retrieves the VPN page on "connect" and "campus"), so an answer is only
+approved on its own when most of the cluster's questions use nothing
+but words from that FAQ, and the answer sticks to the FAQ's wording.
+Everything else is stored for a person to check (--pending, --approve)
+and is never served until approved.
+
+At serve time AnswerIndex matches a question against the centroids and,
+above the threshold, answers straight from the table without retrieval
+or an LLM call. Triggers drop the stored answer when its FAQ changes,
+and a hit is also checked against the FAQ's current last_updated.
+"""
+
+import argparse
+import json
+import math
+import threading
+import time
+from collections import Counter
+
+from response_cache import normalize_question
+from search_index import tokenize
+
+# Cosine between a question and a cluster centroid to join the cluster
+CLUSTER_SIMILARITY = 0.6
+# Questions a cluster needs before it gets a stored answer
+MIN_SUPPORT = 5
+# Share of sampled questions that must retrieve the same top FAQ
+MIN_AGREEMENT = 0.6
+# Share of the answer's words that must appear in the FAQ to be approved
+MIN_GROUNDING = 0.6
+# Centroid terms kept per cluster
+CENTROID_TERMS = 32
+
+IDF_KEY = 'answer_index_idf'
+
+
+def question_terms(text):
+    return normalize_question(text).split()
+
+
+def vectorize(terms, idf, default_idf):
+    # Unit-length tf-idf vector; unseen terms get the rarest weight
+    counts = Counter(terms)
+    vector = {t: (1.0 + math.log(tf)) * idf.get(t, default_idf) for t, tf in counts.items()}
+    norm = math.sqrt(sum(w * w for w in vector.values())) or 1.0
+    return {t: w / norm for t, w in vector.items()}
+
+
+def cosine(vector, centroid):
+    # Both unit length; iterate over the shorter one
+    if len(vector) > len(centroid):
+        vector, centroid = centroid, vector
+    return sum(w * centroid.get(t, 0.0) for t, w in vector.items())
+
+
+def unit(sums, limit=CENTROID_TERMS):
+    top = sorted(sums.items(), key=lambda item: item[1], reverse=True)[:limit]
+    norm = math.sqrt(sum(w * w for _, w in top)) or 1.0
+    return {t: w / norm for t, w in top}
+
+
+def mine_clusters(questions, similarity=CLUSTER_SIMILARITY, min_support=MIN_SUPPORT):
+    """Group question strings into intents.
+
+    Returns (clusters, idf); each cluster has a unit centroid, its support
+    and its distinct normalized questions, most frequent first.
+    """
+    counts = Counter(n for n in (normalize_question(q) for q in questions) if n)
+    if not counts:
+        return [], {}
+
+    total = sum(counts.values())
+    df = Counter()
+    for normalized, count in counts.items():
+        for term in set(normalized.split()):
+            df[term] += count
+    idf = {t: math.log((total + 1) / (d + 1)) + 1.0 for t, d in df.items()}
+
+    clusters = []
+    # term -> clusters whose centroid has it, so each question is only
+    # compared with clusters it shares a word with
+    postings = {}
+    # Most frequent first, so common phrasings seed the clusters
+    for normalized, count in counts.most_common():
+        vector = vectorize(normalized.split(), idf, 0.0)
+        candidates = set()
+        for term in vector:
+            candidates.update(postings.get(term, ()))
+
+        best, best_score = None, similarity
+        for i in candidates:
+            score = cosine(vector, clusters[i]['centroid'])
+            if score >= best_score:
+                best, best_score = i, score
+
+        if best is None:
+            best = len(clusters)
+            clusters.append({'sums': {}, 'centroid': {}, 'support': 0, 'questions': []})
+        cluster = clusters[best]
+        for term, weight in vector.items():
+            if term not in cluster['sums']:
+                postings.setdefault(term, set()).add(best)
+            cluster['sums'][term] = cluster['sums'].get(term, 0.0) + weight * count
+        cluster['centroid'] = unit(cluster['sums'])
+        cluster['support'] += count
+        cluster['questions'].append((normalized, count))
+
+    frequent = [c for c in clusters if c['support'] >= min_support]
+    frequent.sort(key=lambda c: c['support'], reverse=True)
+    for cluster in frequent:
+        del cluster['sums']
+    return frequent, idf
+
+
+def grounding(answer, content):
+    # Share of the answer's words that also appear in the FAQ text
+    words = question_terms(answer)
+    if not words:
+        return 0.0
+    source = set(question_terms(content))
+    return sum(1 for w in words if w in source) / len(words)
+
+
+def covers(question, article):
+    # Every search term of the question appears in the FAQ's title or text
+    terms = tokenize(question)
+    if not terms:
+        return False
+    text = set(tokenize(f"{article.get('title') or ''} {article.get('content') or ''}"))
+    return all(term in text for term in terms)
+
+
+def build_answer_index(db_manager, retrieve, answer, similarity=CLUSTER_SIMILARITY,
+                       min_support=MIN_SUPPORT, max_clusters=200, samples=5, dry_run=False):
+    """Mine chat_history and (re)write the answer_index table.
+
+    retrieve(question) -> (articles, context) and answer(question, context)
+    -> text are the app's own retrieval and LLM calls.
+    """
+    conn = db_manager.get_connection()
+    try:
+        questions = [row[0] for row in conn.execute('SELECT user_message FROM chat_history')]
+    finally:
+        conn.close()
+
+    clusters, idf = mine_clusters(questions, similarity, min_support)
+    clusters = clusters[:max_clusters]
+    print(f"🧭 {len(questions)} questions, {len(clusters)} clusters with at least {min_support}")
+
+    rows = []
+    skipped = 0
+    for cluster in clusters:
+        # Which FAQ do this cluster's most common questions retrieve?
+        votes = Counter()
+        found = {}
+        for normalized, _ in cluster['questions'][:samples]:
+            articles, context = retrieve(normalized)
+            if articles:
+                votes[articles[0]['article_id']] += 1
+                found[articles[0]['article_id']] = (normalized, articles, context)
+        sampled = min(samples, len(cluster['questions']))
+        if not votes or votes.most_common(1)[0][1] / sampled < MIN_AGREEMENT:
+            skipped += 1
+            continue
+
+        article_id = votes.most_common(1)[0][0]
+        representative, articles, context = found[article_id]
+        top = articles[0]
+        # Do the questions talk about this FAQ, or just share a word with it?
+        matched = sum(1 for normalized, _ in cluster['questions'][:samples] if covers(normalized, top))
+        text = '' if dry_run else answer(representative, context)
+        score = grounding(text, top['content']) if text else 0.0
+        approved = score >= MIN_GROUNDING and matched / sampled >= MIN_AGREEMENT
+        rows.append((
+            json.dumps(cluster['centroid']),
+            representative,
+            article_id,
+            top.get('last_updated'),
+            text,
+            json.dumps([a['title'] for a in articles[1:4]]),
+            cluster['support'],
+            1 if approved else 0
+        ))
+        print(f"   {cluster['support']:5} x '{representative}' -> {article_id} "
+              f"(grounding {score:.2f}, {matched}/{sampled} questions match){'' if approved else ' needs review'}")
+
+    if dry_run:
+        return rows
+
+    conn = db_manager.get_connection()
+    try:
+        conn.execute('DELETE FROM answer_index')
+        conn.executemany('''
+            INSERT INTO answer_index (centroid, representative, article_id, article_updated,
+                                      answer, suggestions, support, approved)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', rows)
+        conn.execute('INSERT OR REPLACE INTO sync_state (key, value) VALUES (?, ?)',
+                     (IDF_KEY, json.dumps(idf)))
+        conn.commit()
+    finally:
+        conn.close()
+
+    approved = sum(row[-1] for row in rows)
+    print(f"✅ Stored {len(rows)} answers ({approved} approved, {len(rows) - approved} for review, "
+          f"{skipped} clusters skipped as ambiguous)")
+    return rows
+
+
+def pending_answers(db_manager):
+    # Stored answers waiting for a person: (id, support, question, article_id, title, answer)
+    conn = db_manager.get_connection()
+    try:
+        return conn.execute('''
+            SELECT a.id, a.support, a.representative, a.article_id, f.title, a.answer
+            FROM answer_index a JOIN faqs f ON f.article_id = a.article_id
+            WHERE a.approved = 0
+            ORDER BY a.support DESC
+        ''').fetchall()
+    finally:
+        conn.close()
+
+
+def approve_answers(db_manager, ids):
+    # Mark stored answers as checked; servers pick them up on their next reload
+    if not ids:
+        return 0
+    conn = db_manager.get_connection()
+    try:
+        count = conn.execute(f"UPDATE answer_index SET approved = 1 WHERE id IN ({','.join('?' * len(ids))})",
+                             list(ids)).rowcount
+        conn.commit()
+    finally:
+        conn.close()
+    return count
+
+
+class AnswerIndex:
+    """Serve-time lookup of stored answers by centroid similarity."""
+
+    def __init__(self, db_manager, threshold=0.8, recheck_seconds=5.0):
+        self.db_manager = db_manager
+        self.threshold = threshold
+        # How often to look for a rebuilt or invalidated table
+        self.recheck_seconds = recheck_seconds
+        self.lock = threading.Lock()
+        self.entries = []
+        self.postings = {}
+        self.idf = {}
+        self.default_idf = 1.0
+        self.version = None
+        self.checked_at = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+
+    def load(self):
+        conn = self.db_manager.get_connection()
+        try:
+            version = conn.execute(
+                "SELECT version FROM table_versions WHERE name = 'answer_index'").fetchone()
+            rows = conn.execute('''
+                SELECT a.centroid, a.article_id, a.article_updated, a.answer, a.suggestions,
+                       f.title, f.url
+                FROM answer_index a JOIN faqs f ON f.article_id = a.article_id
+                WHERE a.approved = 1
+            ''').fetchall()
+            idf = conn.execute('SELECT value FROM sync_state WHERE key = ?', (IDF_KEY,)).fetchone()
+        finally:
+            conn.close()
+
+        entries = []
+        postings = {}
+        for centroid, article_id, updated, answer, suggestions, title, url in rows:
+            slot = len(entries)
+            centroid = json.loads(centroid)
+            entries.append({
+                'centroid': centroid,
+                'article_id': article_id,
+                'article_updated': updated,
+                'answer': answer,
+                'suggestions': json.loads(suggestions or '[]'),
+                'title': title,
+                'url': url
+            })
+            for term in centroid:
+                postings.setdefault(term, []).append(slot)
+
+        idf = json.loads(idf[0]) if idf else {}
+        with self.lock:
+            self.entries = entries
+            self.postings = postings
+            self.idf = idf
+            self.default_idf = max(idf.values()) if idf else 1.0
+            self.version = version[0] if version else 0
+            self.checked_at = time.monotonic()
+        return len(entries)
+
+    def maybe_reload(self):
+        if time.monotonic() - self.checked_at < self.recheck_seconds:
+            return
+        self.checked_at = time.monotonic()
+        if self.db_manager.get_table_version('answer_index') != self.version:
+            self.load()
+
+    def lookup(self, question):
+        # Stored answer entry for the question, or None
+        self.maybe_reload()
+        terms = question_terms(question)
+        with self.lock:
+            if not terms or not self.entries:
+                self.misses += 1
+                return None
+            vector = vectorize(terms, self.idf, self.default_idf)
+            candidates = set()
+            for term in vector:
+                candidates.update(self.postings.get(term, ()))
+            best, best_score = None, self.threshold
+            for i in candidates:
+                entry = self.entries[i]
+                if entry is None:
+                    continue
+                score = cosine(vector, entry['centroid'])
+                if score >= best_score:
+                    best, best_score = i, score
+            if best is None:
+                self.misses += 1
+                return None
+            entry = self.entries[best]
+
+        # The FAQ changed since the answer was written: never serve it again
+        if self.db_manager.get_last_updated(entry['article_id']) != entry['article_updated']:
+            with self.lock:
+                self.entries[best] = None
+                self.stale += 1
+            return None
+
+        with self.lock:
+            self.hits += 1
+        return entry
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses + self.stale
+            return {
+                'entries': sum(1 for e in self.entries if e is not None),
+                'hits': self.hits,
+                'misses': self.misses,
+                'stale': self.stale,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0
+            }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Mine chat_history and rebuild the answer index')
+    parser.add_argument('--min-support', type=int, default=MIN_SUPPORT)
+    parser.add_argument('--similarity', type=float, default=CLUSTER_SIMILARITY)
+    parser.add_argument('--max-clusters', type=int, default=200)
+    parser.add_argument('--dry-run', action='store_true', help='list clusters without calling the LLM')
+    parser.add_argument('--pending', action='store_true', help='list stored answers waiting for review')
+    parser.add_argument('--approve', type=int, nargs='+', metavar='ID', help='approve reviewed answers')
+    args = parser.parse_args()
+
+    # Same retrieval, prompt and LLM gateway as /api/chat
+    from app import db_manager, retrieve_context, ask_llm
+    if args.pending:
+        for answer_id, support, question, article_id, title, text in pending_answers(db_manager):
+            print(f"[{answer_id}] {support} x '{question}' -> {title} ({article_id})\n    {text}\n")
+        raise SystemExit
+    if args.approve:
+        print(f"✅ Approved {approve_answers(db_manager, args.approve)} answers")
+        raise SystemExit
+    build_answer_index(db_manager, retrieve_context, ask_llm, similarity=args.similarity,
+                       min_support=args.min_support, max_clusters=args.max_clusters,
+                       dry_run=args.dry_run)
@@ -1,11 +1,11 @@
 from flask_cors import CORS
 from dotenv import load_dotenv
 load_dotenv()
-from flask import Flask, request, jsonify, session, render_template
+from flask import Flask, request, jsonify, session, render_template, Response, stream_with_context
 import uuid
-from datetime import datetime, timezone
+import json
+from datetime import datetime, timezone, timedelta
 import sqlite3
-import re
 import os
 
 
@@ -15,20 +15,38 @@ from groq import Groq
 
 
 
-groq_client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+# No SDK retries: LLMGateway owns deadlines, retries and hedging
+groq_client = Groq(api_key=os.getenv("GROQ_API_KEY"), max_retries=0)
 
 
 
 
 
 #from config_a import Config
-from database import DatabaseManager
+from database import DatabaseManager, FAQ_FIELDS, DEFAULT_FAQ_FIELDS
 from models import init_db
+from retrievers import build_retriever
+from html_text import html_to_text, flatten
+from response_cache import ResponseCache
+from prompt_builder import PromptBuilder
+from single_flight import SingleFlight, SqliteLease, FlightAbandoned, flight_key
+from llm_gateway import LLMGateway, LLMUnavailable
+from admission import AdmissionController, AdmissionRejected
+from answer_index import AnswerIndex
+from classifier import CLASSIFIER_PATH
+from metrics import metrics
+from logs import get_logger, Sampled, setup_logging
 
 
 # app.py
 from config_a import Config, ATLASSIAN_CONFIG
-from atlassian_cl import AtlassianClient
+from atlassian_cl import AtlassianClient, AtlassianError
+
+setup_logging(Config.LOG_LEVEL, Config.LOG_SAMPLE_EVERY)
+log = get_logger('app')
+# Per-request messages: 1 in LOG_SAMPLE_EVERY reaches the log
+sampled = Sampled(log)
+
 try:
     
     atlassian_cl = AtlassianClient()  # no arguments
@@ -43,7 +61,7 @@ except Exception as e:
 
 # Try to import Atlassian client
 # try:
-#     from atlassian_cl import AtlassianClient
+#     from atlassian_cl import AtlassianClient, AtlassianError
 #     atlassian_client = AtlassianClient()
 #     ATLASSIAN_AVAILABLE = True
 #     print("✅ Atlassian client loaded successfully")
@@ -83,17 +101,23 @@ app.secret_key = app.config['SECRET_KEY']
 
 
 # Initialize components
-init_db()
-db_manager = DatabaseManager()
+init_db(Config.DATABASE)
+db_manager = DatabaseManager(Config.DATABASE)
+db_manager.start_chat_writer(
+    batch_size=Config.CHAT_WRITE_BATCH,
+    flush_ms=Config.CHAT_WRITE_FLUSH_MS,
+    max_queue=Config.CHAT_WRITE_QUEUE
+)
 
 def format_answer(content, max_length=500):
     # Format answer for better readability
     if not content:
         return "No content available."
     
-    # Simple cleanup
-    clean_content = re.sub('<[^<]+?>', '', content)  # Remove HTML tags
-    clean_content = ' '.join(clean_content.split())  # Remove extra whitespace
+    # Content is cleaned at sync time; only older rows still carry tags
+    if '<' in content:
+        content = html_to_text(content)
+    clean_content = flatten(content)  # Remove extra whitespace
     
     # Truncate if too long
     if len(clean_content) > max_length:
@@ -164,7 +188,163 @@ def add_test_articles():
 # Add test data on startup
 add_test_articles()
 
+# Serve search from memory; routes below keep it current
+db_manager.build_chunks()
+db_manager.build_index()
+if Config.CATEGORY_ROUTING:
+    db_manager.build_classifier(CLASSIFIER_PATH)
+    metrics.register('classifier', db_manager.classifier.stats)
+if Config.SPELL_CORRECTION:
+    db_manager.build_spelling()
+    metrics.register('spelling', db_manager.spelling.stats)
+retriever = build_retriever(db_manager, Config)
+response_cache = ResponseCache(
+    max_entries=Config.CACHE_MAX_ENTRIES,
+    ttl_seconds=Config.CACHE_TTL_SECONDS,
+    similarity_threshold=Config.CACHE_SIMILARITY
+)
+# Identical questions in flight at the same time share one LLM call
+single_flight = SingleFlight(
+    lease=SqliteLease(db_manager) if Config.SINGLE_FLIGHT_LEASE else None,
+    wait_timeout=Config.SINGLE_FLIGHT_WAIT_SECONDS
+)
+# Keeps us under the provider's concurrency and rate limits during spikes
+admission = AdmissionController(
+    max_in_flight=Config.LLM_MAX_IN_FLIGHT,
+    requests_per_minute=Config.LLM_REQUESTS_PER_MINUTE,
+    max_queue=Config.LLM_MAX_QUEUE,
+    max_wait=Config.LLM_QUEUE_WAIT_SECONDS
+)
+llm_gateway = LLMGateway(
+    groq_client.with_options(timeout=Config.LLM_DEADLINE_SECONDS),
+    "llama-3.3-70b-versatile",
+    deadline=Config.LLM_DEADLINE_SECONDS,
+    hedge=Config.LLM_HEDGE,
+    hedge_min_delay=Config.LLM_HEDGE_MIN_SECONDS,
+    admission=admission
+)
+prompt_builder = PromptBuilder(
+    context_budget=Config.CONTEXT_TOKEN_BUDGET,
+    max_prompt_tokens=Config.MAX_PROMPT_TOKENS,
+    answer_tokens=Config.ANSWER_TOKENS
+)
+
+# Stored answers for the most frequent questions, if the job has run
+answer_index = None
+if Config.ANSWER_INDEX:
+    answer_index = AnswerIndex(db_manager, threshold=Config.ANSWER_INDEX_THRESHOLD)
+    answer_index.load()
+    metrics.register('answer_index', answer_index.stats)
+
+# Component stats exported as gauges on /api/metrics
+metrics.register('response_cache', response_cache.stats)
+metrics.register('prompt_builder', prompt_builder.stats)
+metrics.register('single_flight', single_flight.stats)
+metrics.register('llm', llm_gateway.stats)
+metrics.register('admission', admission.stats)
+metrics.register('chat_writer', db_manager.chat_writer.stats)
+
+def build_prompt(user_message, context):
+    return prompt_builder.render(user_message, context)
+
+@metrics.span('llm')
+def ask_llm(user_message, context):
+    # Blocking Groq completion for one chat turn, within the LLM deadline
+    return llm_gateway.complete(
+        build_prompt(user_message, context),
+        max_tokens=prompt_builder.answer_tokens
+    )
+
+def stream_llm(user_message, context):
+    # Yield answer text as Groq streams it
+    with metrics.span('llm_stream'):
+        yield from llm_gateway.stream(
+            build_prompt(user_message, context),
+            max_tokens=prompt_builder.answer_tokens
+        )
+
+def fallback_answer(relevant_articles):
+    # Retrieval-only answer for when the LLM misses its deadline
+    if not relevant_articles:
+        return "I couldn't find relevant information in our knowledge base. Please try rephrasing your question or contact support."
+    return format_answer(relevant_articles[0]['content'])
+
+def search_query(user_message):
+    # The question with typos fixed against the KB vocabulary; only
+    # search sees it, the LLM still gets the student's own words
+    if db_manager.spelling is None:
+        return user_message
+    with metrics.span('spelling'):
+        query, changes = db_manager.spelling.correct(user_message)
+    if changes:
+        metrics.inc('spelling_corrections', len(changes))
+        sampled.debug('spelling', "Corrected %s", changes)
+    return query
+
+def route_category(user_message):
+    # Category to search in, or None to search every FAQ
+    if db_manager.classifier is None:
+        return None
+    with metrics.span('classify'):
+        category, probability = db_manager.classifier.predict(user_message)
+    if category is None or probability < Config.CATEGORY_ROUTE_CONFIDENCE:
+        metrics.inc('category_routes', outcome='unsure')
+        return None
+    return category
+
+def retrieve_context(user_message):
+    # Pick up FAQ edits and syncs done by other workers first
+    db_manager.refresh_changed()
+    query = search_query(user_message)
+    category = route_category(query)
+    with metrics.span('retrieve'):
+        relevant_articles = []
+        if category is not None:
+            relevant_articles = retriever.search_articles(query, limit=5, category=category)
+            metrics.inc('category_routes', outcome='routed' if relevant_articles else 'fallback')
+        # Nothing in the predicted category: search the whole KB
+        if not relevant_articles:
+            relevant_articles = retriever.search_articles(query, limit=5)
+
+    # Best passages of the top articles, not their full text
+    with metrics.span('prompt'):
+        chunks = db_manager.get_chunks([a['article_id'] for a in relevant_articles])
+        idf = db_manager.index.idf if db_manager.index is not None else None
+        context, _ = prompt_builder.build_context(user_message, relevant_articles, chunks, idf=idf, query=query)
+
+    return relevant_articles, context
+
+def precomputed_answer(user_message):
+    # Stored answer entry for a frequent question, or None
+    if answer_index is None:
+        return None
+    db_manager.refresh_changed()
+    with metrics.span('answer_index'):
+        return answer_index.lookup(search_query(user_message))
+
+def precomputed_response(hit):
+    return {
+        'answer': hit['answer'],
+        'source': hit['title'],
+        'url': hit['url'],
+        'suggestions': hit['suggestions'],
+        'precomputed': True
+    }
+
+def precomputed_events(hit):
+    # The whole stored answer as one SSE exchange
+    yield sse_event('meta', {'source': hit['title'], 'url': hit['url'], 'suggestions': hit['suggestions']})
+    yield sse_event('token', {'text': hit['answer']})
+    yield sse_event('done', {'precomputed': True})
+
+def suggestion_titles(relevant_articles):
+    return [a['title'] for a in relevant_articles[1:4]] if relevant_articles else []
+
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
 @app.route('/api/chat', methods=['POST'])
+@metrics.span('chat')
 def chat():
     try:
         data = request.get_json()
@@ -174,57 +354,176 @@ def chat():
         if not user_message:
             return jsonify({'error': 'No message provided'}), 400
 
-        print(f"💬 Chat request: {user_message}")
-
-        # 1️⃣ Search relevant KB articles in your DB
-        relevant_articles = db_manager.search_articles(user_message, limit=5)
+        sampled.info('chat', "💬 Chat request (%d chars)", len(user_message))
 
-        if relevant_articles:
-            context = "\n\n".join(
-                f"Title: {article['title']}\nContent: {article['content']}"
-                for article in relevant_articles
-            )
-        else:
-            context = "No relevant articles found in the knowledge base."
+        # 0️⃣ Frequent questions have a stored answer: no retrieval, no LLM
+        hit = precomputed_answer(user_message)
+        if hit is not None:
+            with metrics.span('save_chat'):
+                db_manager.save_chat(session_id, user_message, hit['answer'])
+            return jsonify(precomputed_response(hit))
 
-        # 2️⃣ Ask Groq LLM for answer
-        prompt = f"""
-        You are a UMBC CSEE helpdesk assistant. Use the following context to answer:
+        # 1️⃣ Search relevant KB articles in your DB
+        relevant_articles, context = retrieve_context(user_message)
 
-        CONTEXT:
-        {context}
+        # 2️⃣ Ask Groq LLM for answer, unless we already answered this
+        # (or the same question is already being asked right now)
+        answer = response_cache.get(user_message, relevant_articles)
+        degraded = False
+        if answer is None:
+            try:
+                answer, shared = single_flight.do(
+                    flight_key(user_message, context),
+                    lambda: ask_llm(user_message, context)
+                )
+                response_cache.put(user_message, relevant_articles, answer)
+            except AdmissionRejected as e:
+                if Config.LLM_SHED_RESPONSE != '503':
+                    sampled.warning('shed', "⚠️ %s, answering from the KB", e)
+                    answer = fallback_answer(relevant_articles)
+                    degraded = True
+                else:
+                    sampled.warning('shed', "⚠️ %s, returning 503", e)
+                    response = jsonify({'error': 'The assistant is busy, please try again shortly.'})
+                    response.headers['Retry-After'] = str(int(Config.LLM_QUEUE_WAIT_SECONDS) or 1)
+                    return response, 503
+            except LLMUnavailable as e:
+                # Slow or failing provider: answer straight from the KB
+                sampled.warning('llm_unavailable', "⚠️ LLM unavailable, answering from the KB: %s", e)
+                answer = fallback_answer(relevant_articles)
+                degraded = True
+
+        # 3️⃣ Save chat history, one row per student even for shared answers
+        with metrics.span('save_chat'):
+            db_manager.save_chat(session_id, user_message, answer)
+
+        if degraded:
+            top = relevant_articles[0] if relevant_articles else {}
+            return jsonify({
+                'answer': answer,
+                'source': top.get('title'),
+                'url': top.get('url'),
+                'suggestions': suggestion_titles(relevant_articles),
+                'degraded': True
+            })
 
-        USER QUESTION:
-        {user_message}
+        return jsonify({
+            'answer': answer,
+            'source': "UMBC CSEE KB + Groq LLM",
+            'url': None,
+            'suggestions': suggestion_titles(relevant_articles)
+        })
 
-        Provide a clear, helpful answer. If context doesn't contain the answer, say so.
-        """
+    except Exception as e:
+        log.exception("❌ Chat error: %s", e)
+        return jsonify({'error': f'Internal server error: {str(e)}'}), 500
 
-        groq_response = groq_client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
-            messages=[{"role": "user", "content": prompt}]
-        )
 
-        #answer = groq_response.choices[0].message["content"]
-     
+@app.route('/api/chat/stream', methods=['POST'])
+def chat_stream():
+    # Same as /api/chat, but streams the answer as Server-Sent Events:
+    #   event: meta   -> sources and suggestions, sent before the LLM starts
+    #   event: token  -> one chunk of answer text
+    #   event: done   -> end of answer
+    #   event: error  -> generation failed part way
+    data = request.get_json() or {}
+    user_message = data.get('message', '')
+    session_id = session.get('session_id')
 
-        answer = groq_response.choices[0].message.content
+    if not user_message:
+        return jsonify({'error': 'No message provided'}), 400
 
+    sampled.info('chat', "💬 Chat stream request (%d chars)", len(user_message))
 
+    hit = precomputed_answer(user_message)
+    if hit is not None:
+        db_manager.save_chat(session_id, user_message, hit['answer'])
+        return Response(precomputed_events(hit), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
-        # 3️⃣ Save chat history
-        db_manager.save_chat(session_id, user_message, answer)
+    try:
+        relevant_articles, context = retrieve_context(user_message)
+    except Exception as e:
+        log.exception("❌ Chat error: %s", e)
+        return jsonify({'error': f'Internal server error: {str(e)}'}), 500
 
-        return jsonify({
-            'answer': answer,
+    def generate():
+        yield sse_event('meta', {
             'source': "UMBC CSEE KB + Groq LLM",
             'url': None,
-            'suggestions': [a['title'] for a in relevant_articles[1:4]] if relevant_articles else []
+            'suggestions': suggestion_titles(relevant_articles)
         })
 
-    except Exception as e:
-        print(f"❌ Chat error: {e}")
-        return jsonify({'error': f'Internal server error: {str(e)}'}), 500
+        answer = response_cache.get(user_message, relevant_articles)
+        leader = False
+        degraded = False
+        if answer is None:
+            # Followers of an identical in-flight question get its answer in one piece
+            key = flight_key(user_message, context)
+            flight, leader = single_flight.join(key)
+            if not leader:
+                try:
+                    answer = single_flight.wait(flight)
+                except LLMUnavailable as e:
+                    sampled.warning('llm_unavailable', "⚠️ LLM unavailable, answering from the KB: %s", e)
+                    answer = fallback_answer(relevant_articles)
+                    degraded = True
+                except Exception as e:
+                    log.error("❌ Chat stream error: %s", e)
+                    yield sse_event('error', {'error': str(e)})
+                    return
+
+        if answer is not None:
+            yield sse_event('token', {'text': answer})
+        else:
+            parts = []
+            try:
+                for token in stream_llm(user_message, context):
+                    parts.append(token)
+                    yield sse_event('token', {'text': token})
+            except LLMUnavailable as e:
+                if leader:
+                    single_flight.finish(key, flight, error=e)
+                if parts:
+                    # Half an answer is already on screen; don't append a KB excerpt to it
+                    log.error("❌ Chat stream error: %s", e)
+                    yield sse_event('error', {'error': str(e)})
+                    return
+                sampled.warning('llm_unavailable', "⚠️ LLM unavailable, answering from the KB: %s", e)
+                answer = fallback_answer(relevant_articles)
+                degraded = True
+                yield sse_event('token', {'text': answer})
+            except Exception as e:
+                log.error("❌ Chat stream error: %s", e)
+                if leader:
+                    single_flight.finish(key, flight, error=e)
+                yield sse_event('error', {'error': str(e)})
+                return
+            except GeneratorExit:
+                # Client went away mid-stream: let followers ask for themselves
+                if leader:
+                    single_flight.finish(key, flight, error=FlightAbandoned())
+                raise
+            else:
+                answer = ''.join(parts)
+                if leader:
+                    single_flight.finish(key, flight, result=answer)
+                response_cache.put(user_message, relevant_articles, answer)
+
+        with metrics.span('save_chat'):
+            db_manager.save_chat(session_id, user_message, answer)
+        if degraded:
+            top = relevant_articles[0] if relevant_articles else {}
+            yield sse_event('done', {'degraded': True, 'source': top.get('title'), 'url': top.get('url')})
+        else:
+            yield sse_event('done', {})
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        # Stop nginx and friends from buffering the whole stream
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
 
 
 @app.route('/api/faqs', methods=['POST'])
@@ -257,6 +556,7 @@ def add_faq():
 
         conn.commit()
         conn.close()
+        db_manager.refresh_article(article_id)
 
         return jsonify({'message': 'FAQ added successfully', 'article_id': article_id}), 200
 
@@ -273,6 +573,7 @@ def delete_faq(faq_id):
         c.execute("DELETE FROM faqs WHERE article_id = ?", (faq_id,))
         conn.commit()
         conn.close()
+        db_manager.drop_article(faq_id)
 
         return jsonify({"message": "FAQ deleted successfully"}), 200
     except Exception as e:
@@ -301,6 +602,7 @@ def update_faq(article_id):
 
         conn.commit()
         conn.close()
+        db_manager.refresh_article(article_id)
 
         return jsonify({"message": "FAQ updated successfully"}), 200
 
@@ -315,36 +617,53 @@ def update_faq(article_id):
 
 @app.route('/api/faqs', methods=['GET'])
 def list_faqs():
+    # Keyset-paginated list: ?after=<id>&limit=&category=&fields=question,category,...
     try:
-        conn = db_manager.get_connection()
-        c = conn.cursor()
-
-        c.execute('SELECT article_id, title, content, url, category,last_updated FROM faqs')
-        rows = c.fetchall()
-        conn.close()
-
-        faqs = [
-            {
-                "article_id": row[0],     # Use ONLY article_id
-                "question": row[1],
-                "answer": row[2],
-                "url": row[3],
-                "category": row[4],
-                "lastUpdated": row[5]
-            }
-            for row in rows
-        ]
-
-        return jsonify(faqs), 200
+        after = max(0, request.args.get('after', 0, type=int))
+        limit = min(max(1, request.args.get('limit', Config.FAQ_PAGE_SIZE, type=int)), Config.FAQ_MAX_PAGE_SIZE)
+        category = request.args.get('category') or None
+        fields = request.args.get('fields')
+        if fields:
+            fields = [f.strip() for f in fields.split(',') if f.strip()]
+            unknown = [f for f in fields if f not in FAQ_FIELDS]
+            if unknown:
+                return jsonify({'error': f"Unknown fields: {', '.join(unknown)}"}), 400
+            # article_id is the key for edit/delete, so it is always returned
+            fields = ['article_id'] + [f for f in fields if f != 'article_id']
+        else:
+            fields = list(DEFAULT_FAQ_FIELDS)
+
+        # The version counter changes on every write to faqs, so an unchanged
+        # list is answered with a 304 before touching the faqs table
+        version = db_manager.get_table_version('faqs')
+        etag = f'W/"faqs-{version}-{after}-{limit}-{category or ""}-{",".join(fields)}"'
+        if etag in request.headers.get('If-None-Match', ''):
+            response = Response(status=304)
+        else:
+            faqs, next_after = db_manager.list_faqs(after, limit, category, fields)
+            response = jsonify({'faqs': faqs, 'next_after': next_after})
+        response.headers['ETag'] = etag
+        # Browsers revalidate every time instead of serving a stale list
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-
-
-
-
-
+@app.route('/api/faqs/<article_id>', methods=['GET'])
+def get_faq(article_id):
+    # Full FAQ, answer included, for the detail/edit views
+    conn = db_manager.get_connection()
+    try:
+        row = conn.execute(
+            'SELECT article_id, title, content, url, category, last_updated FROM faqs WHERE article_id = ?',
+            (article_id,)
+        ).fetchone()
+    finally:
+        conn.close()
+    if not row:
+        return jsonify({'error': 'FAQ not found'}), 404
+    return jsonify(dict(zip(FAQ_FIELDS, row))), 200
 
 
 @app.before_request
@@ -358,10 +677,17 @@ def index():
     # Serve the main chat interface 
     return render_template('index.html')
 
+SYNC_WATERMARK_KEY = 'confluence_last_sync'
+# CQL reads lastmodified in the API user's profile timezone, not UTC, and
+# offsets run from UTC-12 to UTC+14. Re-listing two days covers any profile
+# plus clock skew; the listing is ids and versions only, and pages whose
+# version we already store are not fetched again.
+SYNC_WATERMARK_OVERLAP = timedelta(days=2)
+
 @app.route('/api/sync', methods=['POST'])
 def sync_articles():
     # Endpoint to sync articles from Atlassian
-    print("Sync endpoint called")
+    log.info("Sync endpoint called")
     
     if not ATLASSIAN_AVAILABLE:
         return jsonify({
@@ -371,7 +697,7 @@ def sync_articles():
         }), 500
     
     try:
-        print("Testing Atlassian connection...")
+        log.debug("Testing Atlassian connection...")
         # Test connection first
         if not atlassian_cl.test_connection():
             return jsonify({
@@ -379,30 +705,61 @@ def sync_articles():
                 'message': 'Cannot connect to Atlassian. Check your credentials and network.'
             }), 500
         
-        print("📚 Fetching articles from Atlassian...")
-        articles_data = atlassian_cl.get_articles()
-        if not articles_data:
+        # Incremental unless ?full=1 or we have never synced
+        started = datetime.now(timezone.utc)
+        watermark = db_manager.get_sync_state(SYNC_WATERMARK_KEY)
+        full = request.args.get('full') == '1' or watermark is None
+
+        if full:
+            log.info("📚 Fetching all articles from Atlassian...")
+            # Every page counts as changed against an empty version map
+            articles_data = atlassian_cl.get_changed_articles({})
+        else:
+            since = datetime.fromisoformat(watermark) - SYNC_WATERMARK_OVERLAP
+            log.info("📚 Fetching articles changed since %s...", f"{since:%Y-%m-%d %H:%M}")
+            articles_data = atlassian_cl.get_changed_articles(
+                db_manager.get_article_versions(),
+                since=since.strftime('%Y-%m-%d %H:%M')
+            )
+
+        # fetch -> parse -> upsert stream through in batches; nothing is
+        # materialized for the whole space
+        parsed_articles = (atlassian_cl.parse_article_content(article) for article in articles_data)
+        count = db_manager.sync_articles(parsed_articles)
+
+        if full and count == 0:
             return jsonify({
                 'status': 'error', 
                 'message': 'No articles found. Check your space key and permissions.'
             }), 404
-            
-        parsed_articles = [atlassian_cl.parse_article_content(article) for article in articles_data]
-        db_manager.sync_articles(parsed_articles)
+        # Every page was listed and fetched by now (a failure raises), but
+        # rows that failed to write must be picked up by the next run
+        if not db_manager.sync_progress['failed']:
+            db_manager.set_sync_state(SYNC_WATERMARK_KEY, started.isoformat())
         
         return jsonify({
             'status': 'success', 
-            'message': f'Synced {len(parsed_articles)} articles',
-            'count': len(parsed_articles)
+            'message': f'Synced {count} articles',
+            'count': count,
+            'failed': db_manager.sync_progress['failed'],
+            'mode': 'full' if full else 'incremental'
         })
+    except AtlassianError as e:
+        # The watermark stays put, so the next sync covers this window again
+        log.error("Sync aborted after %d articles: %s", db_manager.sync_progress['synced'], e)
+        return jsonify({
+            'status': 'error',
+            'message': f'Sync incomplete: {e}',
+            'count': db_manager.sync_progress['synced']
+        }), 502
     except AttributeError as e:
-        print(f"Attribute rror in sync: {e}")
+        log.error("Attribute error in sync: %s", e)
         return jsonify({
             'status': 'error',
             'message': 'Atlassian client method missing. Check atlassian_client.py has all required methods'
         }), 500
     except Exception as e:
-        print(f"Sync error: {e}")
+        log.exception("Sync error: %s", e)
         return jsonify({
             'status': 'error', 
             'message': f'Sync failed: {str(e)}'
@@ -415,14 +772,30 @@ def health_check():
     return jsonify({
         'status': 'healthy', 
         'timestamp': datetime.now(timezone.utc),
-        'atlassian_available': ATLASSIAN_AVAILABLE
+        'atlassian_available': ATLASSIAN_AVAILABLE,
+        'response_cache': response_cache.stats(),
+        'prompt_builder': prompt_builder.stats(),
+        'single_flight': single_flight.stats(),
+        'llm': llm_gateway.stats(),
+        'admission': admission.stats(),
+        'chat_writer': db_manager.chat_writer.stats(),
+        'answer_index': answer_index.stats() if answer_index is not None else None,
+        'classifier': db_manager.classifier.stats() if db_manager.classifier is not None else None,
+        'spelling': db_manager.spelling.stats() if db_manager.spelling is not None else None,
+        'stages': metrics.summary()
     })
 
 
+@app.route('/api/metrics', methods=['GET'])
+def prometheus_metrics():
+    # Prometheus text format: stage latency histograms, counters, component gauges
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+
 def save_or_update_atlassian_page(page):
     article_id = str(page["id"])  # ← use Atlassian ID directly
 
-    conn = sqlite3.connect("faq_chatbot.db")
+    conn = db_manager.get_connection()
     conn.execute("""
         INSERT INTO faqs (article_id, title, content, url)
         VALUES (?, ?, ?, ?)
@@ -433,14 +806,17 @@ def save_or_update_atlassian_page(page):
     """, (article_id, page["title"], page["content"], page["url"]))
     conn.commit()
     conn.close()
+    db_manager.refresh_article(article_id)
 
 
 if __name__ == '__main__':
     print("Starting FAQ Chatbot...")
     print("Available endpoints:")
     print("   GET  /              - Chat interface")
-    print("   POST /api/sync      - Sync articles from Atlassian") 
+    print("   POST /api/sync      - Sync articles from Atlassian (?full=1 to refetch everything)") 
     print("   POST /api/chat      - Send chat message")
+    print("   POST /api/chat/stream - Send chat message, stream answer (SSE)")
     print("   GET  /api/health    - Health check")
+    print("   GET  /api/metrics   - Prometheus metrics")
     app.run(debug=True, port=8000)
 
@@ -0,0 +1,274 @@
+"""
+Async serving mode for the back end.
+
+/api/chat, /api/chat/stream and /api/health run on Quart with the async
+Groq client, so a worker waiting on the LLM just parks a coroutine
+instead of a thread. SQLite work (retrieval, save_chat) is pushed to the
+default thread pool. Every other route is served by the Flask app from
+app.py through a WSGI adapter, so there is one code path for the FAQ
+admin endpoints.
+
+Run with:
+    uvicorn asgi_app:application --port 8000 --workers 2
+"""
+
+import asyncio
+import uuid
+from datetime import datetime, timezone
+
+from asgiref.wsgi import WsgiToAsgi
+from groq import AsyncGroq
+from quart import Quart, request, jsonify, session, Response
+
+import app as flask_app
+from app import (
+    Config,
+    db_manager,
+    response_cache,
+    prompt_builder,
+    admission,
+    answer_index,
+    retrieve_context,
+    precomputed_answer,
+    precomputed_response,
+    precomputed_events,
+    build_prompt,
+    fallback_answer,
+    suggestion_titles,
+    sse_event,
+    ATLASSIAN_AVAILABLE,
+    log,
+    sampled,
+)
+from admission import AdmissionRejected
+from metrics import metrics
+from single_flight import AsyncSingleFlight, flight_key
+from llm_gateway import AsyncLLMGateway, LLMUnavailable
+
+MODEL = "llama-3.3-70b-versatile"
+
+# Coalesces identical questions within this event loop
+single_flight = AsyncSingleFlight(wait_timeout=Config.SINGLE_FLIGHT_WAIT_SECONDS)
+
+async_groq_client = AsyncGroq(max_retries=0, timeout=Config.LLM_DEADLINE_SECONDS)
+llm_gateway = AsyncLLMGateway(
+    async_groq_client,
+    MODEL,
+    deadline=Config.LLM_DEADLINE_SECONDS,
+    hedge=Config.LLM_HEDGE,
+    hedge_min_delay=Config.LLM_HEDGE_MIN_SECONDS,
+    admission=admission
+)
+# /api/metrics (served by Flask) reports the gateway this process really uses
+metrics.register('single_flight', single_flight.stats)
+metrics.register('llm', llm_gateway.stats)
+
+quart_app = Quart(__name__)
+quart_app.config.from_object(Config)
+quart_app.secret_key = quart_app.config['SECRET_KEY']
+
+
+@quart_app.before_request
+async def make_session_permanent():
+    session.permanent = True
+    if 'session_id' not in session:
+        session['session_id'] = str(uuid.uuid4())
+
+
+@quart_app.after_request
+async def add_cors_headers(response):
+    # Same policy as CORS(app, origins="*") on the Flask app
+    response.headers['Access-Control-Allow-Origin'] = '*'
+    response.headers['Access-Control-Allow-Headers'] = 'Content-Type, Authorization'
+    response.headers['Access-Control-Allow-Methods'] = 'GET, POST, OPTIONS'
+    return response
+
+
+async def ask_llm(user_message, context):
+    with metrics.span('llm'):
+        return await llm_gateway.complete(
+            build_prompt(user_message, context),
+            max_tokens=prompt_builder.answer_tokens
+        )
+
+
+@quart_app.route('/api/chat', methods=['POST'])
+async def chat():
+    # metrics.span only decorates plain functions, so time the coroutine here
+    with metrics.span('chat'):
+        return await answer_chat()
+
+
+async def answer_chat():
+    try:
+        data = await request.get_json()
+        user_message = (data or {}).get('message', '')
+        session_id = session.get('session_id')
+
+        if not user_message:
+            return jsonify({'error': 'No message provided'}), 400
+
+        hit = await asyncio.to_thread(precomputed_answer, user_message)
+        if hit is not None:
+            await asyncio.to_thread(db_manager.save_chat, session_id, user_message, hit['answer'])
+            return jsonify(precomputed_response(hit))
+
+        relevant_articles, context = await asyncio.to_thread(retrieve_context, user_message)
+
+        answer = response_cache.get(user_message, relevant_articles)
+        degraded = False
+        if answer is None:
+            try:
+                answer, shared = await single_flight.do(
+                    flight_key(user_message, context),
+                    lambda: ask_llm(user_message, context)
+                )
+                response_cache.put(user_message, relevant_articles, answer)
+            except AdmissionRejected as e:
+                # Same choice as the Flask /api/chat: KB answer or 503
+                if Config.LLM_SHED_RESPONSE != '503':
+                    sampled.warning('shed', "⚠️ %s, answering from the KB", e)
+                    answer = fallback_answer(relevant_articles)
+                    degraded = True
+                else:
+                    sampled.warning('shed', "⚠️ %s, returning 503", e)
+                    response = jsonify({'error': 'The assistant is busy, please try again shortly.'})
+                    response.headers['Retry-After'] = str(int(Config.LLM_QUEUE_WAIT_SECONDS) or 1)
+                    return response, 503
+            except LLMUnavailable as e:
+                sampled.warning('llm_unavailable', "⚠️ LLM unavailable, answering from the KB: %s", e)
+                answer = fallback_answer(relevant_articles)
+                degraded = True
+
+        with metrics.span('save_chat'):
+            await asyncio.to_thread(db_manager.save_chat, session_id, user_message, answer)
+
+        if degraded:
+            top = relevant_articles[0] if relevant_articles else {}
+            return jsonify({
+                'answer': answer,
+                'source': top.get('title'),
+                'url': top.get('url'),
+                'suggestions': suggestion_titles(relevant_articles),
+                'degraded': True
+            })
+
+        return jsonify({
+            'answer': answer,
+            'source': "UMBC CSEE KB + Groq LLM",
+            'url': None,
+            'suggestions': suggestion_titles(relevant_articles)
+        })
+
+    except Exception as e:
+        log.exception("❌ Chat error: %s", e)
+        return jsonify({'error': f'Internal server error: {str(e)}'}), 500
+
+
+@quart_app.route('/api/chat/stream', methods=['POST'])
+async def chat_stream():
+    # Same event format as the Flask /api/chat/stream
+    data = await request.get_json()
+    user_message = (data or {}).get('message', '')
+    session_id = session.get('session_id')
+
+    if not user_message:
+        return jsonify({'error': 'No message provided'}), 400
+
+    hit = await asyncio.to_thread(precomputed_answer, user_message)
+    if hit is not None:
+        await asyncio.to_thread(db_manager.save_chat, session_id, user_message, hit['answer'])
+        response = Response(precomputed_events(hit), mimetype='text/event-stream')
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+
+    try:
+        relevant_articles, context = await asyncio.to_thread(retrieve_context, user_message)
+    except Exception as e:
+        log.exception("❌ Chat error: %s", e)
+        return jsonify({'error': f'Internal server error: {str(e)}'}), 500
+
+    async def generate():
+        yield sse_event('meta', {
+            'source': "UMBC CSEE KB + Groq LLM",
+            'url': None,
+            'suggestions': suggestion_titles(relevant_articles)
+        })
+
+        answer = response_cache.get(user_message, relevant_articles)
+        degraded = False
+        if answer is not None:
+            yield sse_event('token', {'text': answer})
+        else:
+            parts = []
+            try:
+                with metrics.span('llm_stream'):
+                    async for token in llm_gateway.stream(
+                        build_prompt(user_message, context),
+                        max_tokens=prompt_builder.answer_tokens
+                    ):
+                        parts.append(token)
+                        yield sse_event('token', {'text': token})
+            except LLMUnavailable as e:
+                if parts:
+                    log.error("❌ Chat stream error: %s", e)
+                    yield sse_event('error', {'error': str(e)})
+                    return
+                sampled.warning('llm_unavailable', "⚠️ LLM unavailable, answering from the KB: %s", e)
+                answer = fallback_answer(relevant_articles)
+                degraded = True
+                yield sse_event('token', {'text': answer})
+            except Exception as e:
+                log.error("❌ Chat stream error: %s", e)
+                yield sse_event('error', {'error': str(e)})
+                return
+            else:
+                answer = ''.join(parts)
+                response_cache.put(user_message, relevant_articles, answer)
+
+        with metrics.span('save_chat'):
+            await asyncio.to_thread(db_manager.save_chat, session_id, user_message, answer)
+        if degraded:
+            top = relevant_articles[0] if relevant_articles else {}
+            yield sse_event('done', {'degraded': True, 'source': top.get('title'), 'url': top.get('url')})
+        else:
+            yield sse_event('done', {})
+
+    response = Response(generate(), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    response.timeout = None
+    return response
+
+
+@quart_app.route('/api/health', methods=['GET'])
+async def health_check():
+    return jsonify({
+        'status': 'healthy',
+        'timestamp': datetime.now(timezone.utc),
+        'atlassian_available': ATLASSIAN_AVAILABLE,
+        'response_cache': response_cache.stats(),
+        'prompt_builder': prompt_builder.stats(),
+        'single_flight': single_flight.stats(),
+        'llm': llm_gateway.stats(),
+        'admission': admission.stats(),
+        'chat_writer': db_manager.chat_writer.stats(),
+        'answer_index': answer_index.stats() if answer_index is not None else None,
+        'classifier': db_manager.classifier.stats() if db_manager.classifier is not None else None,
+        'spelling': db_manager.spelling.stats() if db_manager.spelling is not None else None,
+        'stages': metrics.summary(),
+        'server': 'asgi'
+    })
+
+
+ASYNC_PATHS = {'/api/chat', '/api/chat/stream', '/api/health'}
+
+wsgi_fallback = WsgiToAsgi(flask_app.app)
+
+
+async def application(scope, receive, send):
+    # Route the chat hot path to Quart and everything else to Flask
+    if scope['type'] == 'http' and scope['path'] not in ASYNC_PATHS:
+        await wsgi_fallback(scope, receive, send)
+    else:
+        await quart_app(scope, receive, send)
@@ -1,15 +1,52 @@
-
-
 from config_a import ATLASSIAN_CONFIG
+from html_text import html_to_text
+from logs import get_logger
+from metrics import metrics
 import requests
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+import random
+import time
 import os
 
+log = get_logger('atlassian')
+
+# Status codes worth retrying; everything else is returned to the caller
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# How long a successful test_connection() is trusted before checking again
+CONNECTION_CHECK_TTL = 300
+
+
+class AtlassianError(Exception):
+    # A page of results could not be read; status is None for network errors
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+
 class AtlassianClient:
-    def __init__(self):
+    def __init__(self, max_workers=4, max_retries=5, backoff_base=0.5, backoff_cap=30.0):
         self.base_url = ATLASSIAN_CONFIG['base_url'].rstrip('/')
         self.email = ATLASSIAN_CONFIG['email']
         self.api_token = ATLASSIAN_CONFIG['api_token']
         self.space_key = ATLASSIAN_CONFIG['space_key']
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.connection_ok_until = 0
+
+        # One keep-alive pool for every request instead of a TLS handshake each
+        self.session = requests.Session()
+        self.session.auth = self.get_auth()
+        self.session.headers.update(self.get_headers())
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
         
     def get_headers(self):
         return {
@@ -19,94 +56,178 @@ class AtlassianClient:
     
     def get_auth(self):
         return (self.email, self.api_token)
+
+    def retry_delay(self, response, attempt):
+        # Honor Retry-After (seconds or HTTP date), else jittered exponential backoff
+        retry_after = response.headers.get('Retry-After') if response is not None else None
+        if retry_after:
+            try:
+                return min(float(retry_after), self.backoff_cap)
+            except ValueError:
+                try:
+                    when = parsedate_to_datetime(retry_after)
+                    return min(max(0.0, (when - datetime.now(timezone.utc)).total_seconds()), self.backoff_cap)
+                except (TypeError, ValueError):
+                    pass
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * (2 ** attempt)))
+
+    def request(self, url, params=None, timeout=30):
+        # GET through the shared session, retrying 429/5xx and dropped connections
+        for attempt in range(self.max_retries + 1):
+            try:
+                # One span per attempt, so retries show up as extra requests
+                with metrics.span('atlassian_request'):
+                    response = self.session.get(url, params=params, timeout=timeout)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                if attempt == self.max_retries:
+                    raise
+                delay = self.retry_delay(None, attempt)
+                metrics.inc('atlassian_retries', reason='connection')
+                log.warning("Request error (%s), retrying in %.1fs", e, delay)
+                time.sleep(delay)
+                continue
+
+            if response.status_code not in RETRY_STATUSES or attempt == self.max_retries:
+                return response
+
+            delay = self.retry_delay(response, attempt)
+            metrics.inc('atlassian_retries', reason=response.status_code)
+            log.warning("Got %d, retrying in %.1fs", response.status_code, delay)
+            time.sleep(delay)
     
     def test_connection(self):
-        # Test basic connection to Confluence
-        url = f"{self.base_url}/rest/api/space"
-        print(f"Testing connection to: {url}")
+        # Test basic connection to Confluence by reading just our space
+        if time.monotonic() < self.connection_ok_until:
+            return True
+
+        url = f"{self.base_url}/rest/api/space/{self.space_key}"
+        log.debug("Testing connection to: %s", url)
         
         try:
-            response = requests.get(
-                url,
-                auth=self.get_auth(),
-                headers=self.get_headers(),
-                timeout=30
-            )
-            print(f"Connection test status: {response.status_code}")
+            response = self.request(url)
             
             if response.status_code == 200:
-                spaces = response.json().get('results', [])
-                space_keys = [space['key'] for space in spaces]
-                print(f"Connection successful! Available spaces: {space_keys}")
+                log.info("Connection successful! Space: %s", response.json().get('key'))
+                self.connection_ok_until = time.monotonic() + CONNECTION_CHECK_TTL
                 return True
             else:
-                print(f"Connection failed: {response.status_code} - {response.text}")
+                log.error("Connection failed: %d - %s", response.status_code, response.text)
                 return False
                 
         except Exception as e:
-            print(f"Connection test error: {e}")
+            log.error("Connection test error: %s", e)
             return False
     
     def get_articles(self, limit=100):
-        # Fetch articles from Confluence space with detailed debugging
-        url = f"{self.base_url}/rest/api/content"
-        params = {
-            'spaceKey': self.space_key,
-            'type': 'page',
-            'limit': limit,
-            'expand': 'body.view,version,space'
-        }
+        # Fetch every page in the space, following Confluence's next links
+        return list(self.iter_articles(limit=limit))
+
+    def iter_articles(self, limit=100, expand='body.view,version,space', cql=None):
+        # Yield articles one result page at a time so callers never wait for the whole space
+        if cql:
+            url = f"{self.base_url}/rest/api/content/search"
+            params = {'cql': cql, 'limit': limit, 'expand': expand}
+        else:
+            url = f"{self.base_url}/rest/api/content"
+            params = {
+                'spaceKey': self.space_key,
+                'type': 'page',
+                'limit': limit,
+                'expand': expand
+            }
         
-        print(f"\n=== DEBUG: Fetching articles ===")
-        print(f"URL: {url}")
-        print(f"Space Key: {self.space_key}")
-        print(f"Email: {self.email}")
-        print(f"Full request: {url}?spaceKey={self.space_key}&type=page")
+        log.debug("Fetching articles from %s (space %s, cql %s)", url, self.space_key, cql)
         
-        try:
-            response = requests.get(
-                url, 
-                params=params, 
-                auth=self.get_auth(),
-                headers=self.get_headers(),
-                timeout=30
-            )
-            
-            print(f"Response status: {response.status_code}")
-            
-            if response.status_code == 401:
-                print("401 Unauthorized - Check your email and API token")
-                return []
-            elif response.status_code == 403:
-                print("403 Forbidden - Your account doesn't have access to this space")
-                return []
-            elif response.status_code == 404:
-                print("404 Not Found - Possible issues:")
-                print("   - Space key is incorrect")
-                print("   - Base URL is wrong") 
-                print("   - Your account doesn't have access to this space")
-                print(f"   - Request URL was: {response.url}")
-                return []
-            
-            response.raise_for_status()
-            data = response.json()
-            
-            print(f"Success! Found {len(data['results'])} articles")
-            
-            if data['results']:
-                print("Sample articles:")
-                for article in data['results'][:3]:
-                    print(f"  - {article['title']} (ID: {article['id']})")
+        total = 0
+        while url:
+            data = self._get_page(url, params)
+            results = data.get('results', [])
+            total += len(results)
+            log.debug("Fetched %d articles (%d so far)", len(results), total)
+            yield from results
+
+            # _links.next already carries the cursor and every query parameter
+            next_link = data.get('_links', {}).get('next')
+            if not next_link or not results:
+                break
+            if next_link.startswith('http'):
+                url = next_link
             else:
-                print("No articles found in this space")
-                
-            return data['results']
-            
+                url = f"{data['_links'].get('base', self.base_url).rstrip('/')}{next_link}"
+            params = None
+
+        if total == 0:
+            log.warning("No articles found in this space")
+
+    def _get_page(self, url, params):
+        # One page of results. Failures raise rather than end the listing
+        # early, so a sync never mistakes an unreadable page for the last one
+        try:
+            response = self.request(url, params=params)
         except requests.exceptions.RequestException as e:
-            print(f"Request failed: {e}")
-            if hasattr(e, 'response') and e.response is not None:
-                print(f"Response text: {e.response.text}")
-            return []
+            log.error("Request failed: %s", e)
+            raise AtlassianError(f"Request failed: {e}") from e
+
+        if response.status_code == 401:
+            message = "401 Unauthorized - Check your email and API token"
+        elif response.status_code == 403:
+            message = "403 Forbidden - Your account doesn't have access to this space"
+        elif response.status_code == 404:
+            message = ("404 Not Found - check the space key, the base URL and that your "
+                       f"account can see the space. Request URL was: {response.url}")
+        elif not response.ok:
+            message = f"{response.status_code} from Confluence: {response.text[:500]}"
+        else:
+            try:
+                return response.json()
+            except ValueError as e:
+                message = f"Unreadable response from {response.url}: {e}"
+        log.error("%s", message)
+        raise AtlassianError(message, response.status_code)
+
+    def get_changed_articles(self, known_versions, since=None, limit=200, batch_size=25):
+        # Incremental sync: list ids + version numbers only, then fetch bodies
+        # for pages that are new or whose version moved past what we store.
+        # Listing without bodies allows big pages; Confluence caps expanded
+        # bodies at small page sizes, so those go out in parallel batches.
+        cql = f'space = "{self.space_key}" AND type = page'
+        if since:
+            cql += f' AND lastmodified > "{since}"'
+
+        changed_ids = []
+        for article in self.iter_articles(limit=limit, expand='version', cql=cql):
+            version = article.get('version', {}).get('number')
+            known = known_versions.get(str(article['id']))
+            if known is None or version is None or version > known:
+                changed_ids.append(str(article['id']))
+
+        log.info("%d articles changed since last sync", len(changed_ids))
+
+        batches = (changed_ids[i:i + batch_size] for i in range(0, len(changed_ids), batch_size))
+        yield from self.fetch_bodies(batches)
+
+    def fetch_bodies(self, batches):
+        # Fetch bodies for several id batches at once, at most max_workers in flight.
+        # Only a couple of batches run ahead of the consumer, so memory stays
+        # bounded however large the space is.
+        def fetch(ids):
+            cql = f"id in ({', '.join(ids)})"
+            with metrics.span('atlassian_fetch_batch'):
+                return list(self.iter_articles(limit=len(ids), cql=cql))
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            pending = deque()
+            try:
+                for ids in batches:
+                    pending.append(pool.submit(fetch, ids))
+                    if len(pending) >= self.max_workers * 2:
+                        yield from pending.popleft().result()
+                while pending:
+                    yield from pending.popleft().result()
+            finally:
+                # A failed batch ends the sync; don't fetch the rest for nothing
+                for future in pending:
+                    future.cancel()
 
     def parse_article_content(self, article):
         # Extract relevant content from article
@@ -114,20 +235,22 @@ class AtlassianClient:
         if 'body' in article and 'view' in article['body']:
             content = article['body']['view']['value']
         
-        # Clean HTML tags
-        import re
-        clean_content = re.sub('<[^<]+?>', '', content)
+        # Clean HTML once here so stored content (and prompts) are plain text
+        clean_content = html_to_text(content)
         
         return {
             'article_id': article['id'],
             'title': article['title'],
             'content': clean_content,
             'url': f"{self.base_url}{article['_links']['webui']}",
-            'last_updated': article['version']['when'] if 'version' in article else None
+            'last_updated': article['version']['when'] if 'version' in article else None,
+            'version': article['version'].get('number') if 'version' in article else None
         }
 
 # Debug script
 if __name__ == '__main__':
+    from logs import setup_logging
+    setup_logging('DEBUG')
     print("=== Testing Atlassian Connection ===")
     client = AtlassianClient()
     
@@ -0,0 +1,384 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark suite for the retrieval, chat and sync paths.
+
+For each KB size it generates a synthetic knowledge base and a question
+workload (both seeded, so every run sees the same data), then measures:
+
+    sync     sync_articles rows/sec into an empty database
+    search   latency and recall@5 / MRR of the in-memory index, FTS5 and
+             the configured hybrid retriever
+    list     GET /api/faqs first page, walking every page, and a 304
+    chat     /api/chat throughput and latency against fake_llm.py
+
+Everything runs in this process against a scratch directory, with the
+LLM pointed at the local fake, so no network or API keys are needed.
+Results go to a JSON file; --compare prints the change between two.
+
+    python benchmark.py --sizes 1000,10000,100000 --output before.json
+    python benchmark.py --compare before.json after.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+BACK_END = os.path.dirname(os.path.abspath(__file__))
+
+SYSTEMS = ['vpn', 'email', 'wifi', 'printer', 'canvas', 'blackboard', 'library', 'parking',
+           'payroll', 'housing', 'registration', 'transcript', 'gradebook', 'laptop', 'duo',
+           'outlook', 'onedrive', 'zoom', 'slack', 'github', 'matlab', 'linux', 'lab', 'badge',
+           'locker', 'shuttle', 'dining', 'gym', 'advising', 'tuition']
+ACTIONS = ['reset', 'install', 'configure', 'access', 'renew', 'cancel', 'request', 'update',
+           'recover', 'connect', 'enable', 'disable', 'transfer', 'download', 'print', 'submit',
+           'appeal', 'schedule', 'verify', 'unlock']
+OBJECTS = ['password', 'account', 'license', 'permit', 'certificate', 'quota', 'profile',
+           'session', 'token', 'device', 'form', 'refund', 'key', 'card', 'backup', 'mailbox',
+           'calendar', 'storage', 'group', 'waiver']
+CATEGORIES = ['IT', 'Library', 'Finance', 'Housing', 'Advising', 'Facilities']
+FILLER = ('the a portal page link open select click then after your student staff campus office '
+          'settings menu option button screen help desk ticket hours days week semester email '
+          'message confirm status approved pending required available online form name number '
+          'system service support contact note before when if this that will can may should '
+          'first next again new old current home login sign request admin team policy').split()
+SYLLABLES = ['ka', 'lo', 'mi', 'ru', 'te', 'vo', 'zan', 'pel', 'dor', 'fin', 'gra', 'hux',
+             'jem', 'kor', 'lix', 'mab', 'nor', 'quo', 'sil', 'tav']
+
+
+def code_name(n):
+    # Unique pseudo-word per article (base-20 syllables), like a product name
+    parts = []
+    for _ in range(4):
+        n, digit = divmod(n, len(SYLLABLES))
+        parts.append(SYLLABLES[digit])
+    return ''.join(parts)
+
+
+def make_kb(size, seed=1):
+    rng = random.Random(seed)
+    articles = []
+    for n in range(size):
+        system, action, obj = rng.choice(SYSTEMS), rng.choice(ACTIONS), rng.choice(OBJECTS)
+        code = code_name(n)
+        title = f"How to {action} your {obj} for {system} {code}"
+        words = [rng.choice(FILLER) for _ in range(rng.randint(80, 220))]
+        # Mention the topic a few times, as real articles do
+        for _ in range(3):
+            words.insert(rng.randrange(len(words)), f"{action} the {system} {obj}")
+        content = (f"To {action} your {system} {obj} ({code}), open the {system} portal. "
+                   + ' '.join(words) + '.')
+        articles.append({
+            'article_id': f"bench-{n}",
+            'title': title,
+            'content': content,
+            'url': f"https://kb.example.edu/{n}",
+            'category': rng.choice(CATEGORIES),
+            'last_updated': f"2026-{rng.randint(1, 9):02d}-{rng.randint(1, 28):02d}T12:00:00",
+            'version': 1,
+            'topic': (system, action, obj, code)
+        })
+    return articles
+
+
+def make_workload(articles, count, seed=2):
+    # (question, expected article_id); most name the article's code word,
+    # the rest only its topic, which several articles can share
+    rng = random.Random(seed)
+    questions = []
+    for _ in range(count):
+        article = rng.choice(articles)
+        system, action, obj, code = article['topic']
+        terms = [action, obj, system]
+        if rng.random() < 0.7:
+            terms.append(code)
+        else:
+            terms.remove(rng.choice(terms[:2]))
+            terms += [rng.choice(FILLER), system]
+        rng.shuffle(terms)
+        questions.append((f"how do i {' '.join(terms)}", article['article_id']))
+    return questions
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def latency_stats(seconds):
+    return {
+        'p50_ms': round(percentile(seconds, 50) * 1000, 3),
+        'p95_ms': round(percentile(seconds, 95) * 1000, 3),
+        'p99_ms': round(percentile(seconds, 99) * 1000, 3),
+    }
+
+
+def load_app(workdir, concurrency):
+    # app.py opens faq_chatbot.db in the working directory and reads its
+    # settings at import, so set both up before the import
+    os.chdir(workdir)
+    sys.path.insert(0, BACK_END)
+    for name, value in {
+        'SECRET_KEY': 'benchmark',
+        'ATLASSIAN_BASE_URL': 'http://127.0.0.1:9',
+        'ATLASSIAN_EMAIL': 'benchmark@example.edu',
+        'ATLASSIAN_API_TOKEN': 'benchmark',
+        'ATLASSIAN_SPACE_KEY': 'KB',
+        'GROQ_API_KEY': 'benchmark',
+        'LOG_LEVEL': 'WARNING',
+        # Measure our own code, not the provider limits admission enforces
+        'LLM_MAX_IN_FLIGHT': str(concurrency),
+        'LLM_REQUESTS_PER_MINUTE': '1000000',
+        'LLM_MAX_QUEUE': str(concurrency * 4),
+    }.items():
+        os.environ.setdefault(name, value)
+
+    import app
+    return app
+
+
+def reset_kb(app):
+    conn = app.db_manager.get_connection()
+    try:
+        conn.execute("DELETE FROM faqs")
+        conn.execute("DELETE FROM chat_history")
+        conn.commit()
+    finally:
+        conn.close()
+    app.db_manager.build_index()
+    app.response_cache.clear()
+
+
+def bench_sync(app, articles):
+    rows = [{k: v for k, v in a.items() if k != 'topic'} for a in articles]
+    start = time.perf_counter()
+    synced = app.db_manager.sync_articles(iter(rows))
+    elapsed = time.perf_counter() - start
+
+    # Category is not part of the Confluence sync; set it for the list filter
+    conn = app.db_manager.get_connection()
+    try:
+        conn.executemany("UPDATE faqs SET category = ? WHERE article_id = ?",
+                         [(a['category'], a['article_id']) for a in articles])
+        conn.commit()
+    finally:
+        conn.close()
+
+    start_index = time.perf_counter()
+    app.db_manager.build_index()
+    return {
+        'rows': synced,
+        'seconds': round(elapsed, 3),
+        'rows_per_sec': round(synced / elapsed, 1),
+        'index_build_seconds': round(time.perf_counter() - start_index, 3)
+    }
+
+
+def bench_search(app, workload):
+    backends = {
+        'index': app.db_manager.index.search,
+        'fts': app.db_manager.search_fts,
+        'hybrid': app.retriever.search_articles,
+    }
+    results = {}
+    for name, search in backends.items():
+        # One untimed pass so every backend starts warm
+        for question, _ in workload[:20]:
+            search(question, 5)
+
+        seconds, hits, reciprocal = [], 0, 0.0
+        for question, expected in workload:
+            start = time.perf_counter()
+            found = search(question, 5)
+            seconds.append(time.perf_counter() - start)
+            ids = [a['article_id'] for a in found]
+            if expected in ids:
+                hits += 1
+                reciprocal += 1.0 / (ids.index(expected) + 1)
+
+        results[name] = dict(latency_stats(seconds),
+                             recall_at_5=round(hits / len(workload), 4),
+                             mrr=round(reciprocal / len(workload), 4))
+    return results
+
+
+def bench_list(app):
+    client = app.app.test_client()
+    start = time.perf_counter()
+    first = client.get('/api/faqs')
+    first_seconds = time.perf_counter() - start
+    etag = first.headers.get('ETag')
+
+    start = time.perf_counter()
+    pages = total_bytes = 0
+    after = 0
+    while after is not None:
+        response = client.get(f'/api/faqs?after={after}&limit=200')
+        pages += 1
+        total_bytes += len(response.data)
+        after = response.get_json()['next_after']
+    walk_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    revalidated = client.get('/api/faqs', headers={'If-None-Match': etag})
+    return {
+        'first_page_ms': round(first_seconds * 1000, 3),
+        'first_page_bytes': len(first.data),
+        'walk_pages': pages,
+        'walk_seconds': round(walk_seconds, 3),
+        'walk_bytes': total_bytes,
+        'revalidate_ms': round((time.perf_counter() - start) * 1000, 3),
+        'revalidate_status': revalidated.status_code
+    }
+
+
+def bench_chat(app, workload, requests, concurrency):
+    from metrics import metrics
+    metrics.reset()
+
+    # A test client per worker, so sessions do not share a cookie jar
+    clients = {}
+
+    def one(i):
+        client = clients.setdefault(i % concurrency, app.app.test_client())
+        question = workload[i % len(workload)][0]
+        start = time.perf_counter()
+        response = client.post('/api/chat', json={'message': question})
+        return response.status_code == 200, time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        outcomes = list(pool.map(one, range(requests)))
+    elapsed = time.perf_counter() - start
+
+    latencies = [t for ok, t in outcomes if ok]
+    stages = metrics.summary()
+    return dict(latency_stats(latencies),
+                requests=requests,
+                concurrency=concurrency,
+                ok=len(latencies),
+                seconds=round(elapsed, 3),
+                throughput_rps=round(len(latencies) / elapsed, 1),
+                stages={name: stages[name] for name in ('retrieve', 'prompt', 'llm', 'save_chat')
+                        if name in stages})
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BACK_END,
+                              capture_output=True, text=True, timeout=10).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def run(args):
+    from fake_llm import FakeLLMServer
+
+    llm = FakeLLMServer(latency=args.llm_latency).start()
+    os.environ['GROQ_BASE_URL'] = llm.base_url
+    workdir = tempfile.mkdtemp(prefix='faq-bench-')
+    app = load_app(workdir, args.concurrency)
+    benchmarks = args.benchmarks.split(',')
+
+    report = {
+        'commit': git_commit(),
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'settings': {
+            'seed': args.seed,
+            'questions': args.questions,
+            'chat_requests': args.chat_requests,
+            'concurrency': args.concurrency,
+            'llm_latency': args.llm_latency
+        },
+        'sizes': {}
+    }
+
+    try:
+        for size in [int(s) for s in args.sizes.split(',')]:
+            print(f"📦 {size} articles")
+            articles = make_kb(size, args.seed)
+            workload = make_workload(articles, args.questions, args.seed + 1)
+            if args.save_workload:
+                with open(f"{args.save_workload}.{size}.jsonl", 'w') as f:
+                    for question, expected in workload:
+                        f.write(json.dumps({'question': question, 'article_id': expected}) + '\n')
+
+            reset_kb(app)
+            result = {'sync': bench_sync(app, articles)}
+            print(f"   sync: {result['sync']['rows_per_sec']} rows/s")
+            if 'search' in benchmarks:
+                result['search'] = bench_search(app, workload)
+                for name, stats in result['search'].items():
+                    print(f"   search {name}: p95 {stats['p95_ms']} ms, recall@5 {stats['recall_at_5']}")
+            if 'list' in benchmarks:
+                result['list'] = bench_list(app)
+                print(f"   list: first page {result['list']['first_page_ms']} ms, "
+                      f"{result['list']['first_page_bytes']} bytes")
+            if 'chat' in benchmarks:
+                result['chat'] = bench_chat(app, workload, args.chat_requests, args.concurrency)
+                print(f"   chat: {result['chat']['throughput_rps']} req/s, p95 {result['chat']['p95_ms']} ms")
+            report['sizes'][str(size)] = result
+    finally:
+        llm.shutdown()
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+
+
+def flatten(value, prefix=''):
+    if isinstance(value, dict):
+        for key, inner in value.items():
+            yield from flatten(inner, f"{prefix}.{key}" if prefix else key)
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+        yield prefix, value
+
+
+def compare(old_path, new_path):
+    with open(old_path) as f:
+        old = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+    print(f"{old.get('commit')} -> {new.get('commit')}")
+    old_values = dict(flatten(old['sizes']))
+    for key, value in flatten(new['sizes']):
+        before = old_values.get(key)
+        if before is None:
+            continue
+        change = f"{(value - before) / before * 100:+7.1f}%" if before else '       -'
+        print(f"  {key:55} {before:>12} -> {value:>12}  {change}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='1000,10000,100000', help='KB sizes, comma separated')
+    parser.add_argument('--benchmarks', default='search,list,chat', help='sync always runs, it loads the KB')
+    parser.add_argument('--questions', type=int, default=500, help='search workload size')
+    parser.add_argument('--chat-requests', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--llm-latency', type=float, default=0.05, help='fake LLM seconds per call')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--save-workload', metavar='PREFIX', help='also write <PREFIX>.<size>.jsonl')
+    parser.add_argument('--output', default='benchmark_results.json')
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'), help='diff two result files and exit')
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+    else:
+        args.output = os.path.abspath(args.output)
+        if args.save_workload:
+            args.save_workload = os.path.abspath(args.save_workload)
+        run(args)
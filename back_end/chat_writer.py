@@ -0,0 +1,119 @@
+import atexit
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+
+from logs import get_logger
+
+log = get_logger('chat_writer')
+
+_STOP = object()
+
+
+class ChatHistoryWriter:
+    """Background writer for chat_history with group commit.
+
+    save_chat only enqueues the row. One thread drains the queue and
+    writes up to batch_size rows per executemany/commit, or whatever
+    arrived within flush_ms of the first row, so bursts share a single
+    commit instead of one each. When the queue is full, callers block
+    for up to put_timeout seconds and then write the row themselves.
+    """
+
+    def __init__(self, db_manager, batch_size=100, flush_ms=50, max_queue=10000, put_timeout=1.0):
+        self.db_manager = db_manager
+        self.batch_size = batch_size
+        self.flush_interval = flush_ms / 1000.0
+        self.put_timeout = put_timeout
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.thread = threading.Thread(target=self.run, name='chat-history-writer', daemon=True)
+        self.running = False
+        self.rows_written = 0
+        self.batches = 0
+        self.overflows = 0
+
+    def start(self):
+        self.running = True
+        self.thread.start()
+        atexit.register(self.stop)
+        return self
+
+    def submit(self, session_id, user_message, bot_response):
+        # Timestamp now, not when the batch lands
+        row = (
+            session_id,
+            user_message,
+            bot_response,
+            datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+        )
+        try:
+            self.queue.put(row, timeout=self.put_timeout)
+        except queue.Full:
+            # Backpressure: the writer is behind, so pay for this row inline
+            self.overflows += 1
+            self.write([row])
+
+    def run(self):
+        while True:
+            row = self.queue.get()
+            if row is _STOP:
+                self.queue.task_done()
+                return
+
+            batch = [row]
+            stop = False
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    row = self.queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if row is _STOP:
+                    stop = True
+                    break
+                batch.append(row)
+
+            self.write(batch)
+            for _ in range(len(batch) + (1 if stop else 0)):
+                self.queue.task_done()
+            if stop:
+                return
+
+    def write(self, rows):
+        conn = self.db_manager.get_connection()
+        try:
+            conn.executemany('''
+                INSERT INTO chat_history (session_id, user_message, bot_response, timestamp)
+                VALUES (?, ?, ?, ?)
+            ''', rows)
+            conn.commit()
+            self.rows_written += len(rows)
+            self.batches += 1
+        except Exception as e:
+            log.error("Failed to save %d chats: %s", len(rows), e)
+        finally:
+            conn.close()
+
+    def flush(self):
+        # Block until everything queued so far is committed
+        self.queue.join()
+
+    def stop(self):
+        # Write out what is left and end the thread
+        if not self.running:
+            return
+        self.running = False
+        self.queue.put(_STOP)
+        self.thread.join()
+
+    def stats(self):
+        return {
+            'queued': self.queue.qsize(),
+            'rows_written': self.rows_written,
+            'batches': self.batches,
+            'overflows': self.overflows
+        }
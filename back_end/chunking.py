@@ -0,0 +1,54 @@
+import re
+
+# Passage size and overlap, in words
+CHUNK_WORDS = 120
+CHUNK_OVERLAP = 30
+
+PARAGRAPH_RE = re.compile(r'\n\s*\n')
+
+
+def split_units(content, max_words):
+    # Paragraphs (with their heading), long ones cut into max_words windows
+    heading = None
+    for block in PARAGRAPH_RE.split(content or ''):
+        block = block.strip()
+        if not block:
+            continue
+        if block.startswith('#'):
+            first, _, rest = block.partition('\n')
+            heading = first.lstrip('#').strip()
+            block = rest.strip()
+            if not block:
+                continue
+
+        words = block.split()
+        for start in range(0, len(words), max_words):
+            yield heading, words[start:start + max_words]
+
+
+def chunk_text(title, content, max_words=CHUNK_WORDS, overlap=CHUNK_OVERLAP):
+    """Split an article into overlapping passages of at most max_words words.
+
+    Paragraph boundaries are kept where possible, each passage starts with
+    the last `overlap` words of the one before it, and the nearest heading
+    is prefixed so a passage still makes sense on its own.
+    """
+    chunks = []
+    words = []
+    heading = None
+
+    def emit():
+        prefix = f"{title} - {heading}: " if heading else f"{title}: "
+        chunks.append(prefix + ' '.join(words))
+
+    for unit_heading, unit_words in split_units(content, max_words):
+        if words and (len(words) + len(unit_words) > max_words or unit_heading != heading):
+            emit()
+            # Carry the overlap only within the same section
+            words = words[-overlap:] if unit_heading == heading and overlap else []
+        heading = unit_heading
+        words.extend(unit_words)
+
+    if words:
+        emit()
+    return chunks or [title]
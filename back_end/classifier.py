@@ -0,0 +1,305 @@
+"""
+Category routing for chat questions.
+
+CategoryClassifier is a multinomial naive Bayes model over hashed word
+unigrams and bigrams. It trains on the categorized FAQs (titles weighted
+like the search index) and on the approved answer_index questions,
+which are real chat_history questions labelled with their FAQ's
+category. The model is nothing but counts, so an FAQ that is added,
+edited or deleted updates it in place without a retrain.
+
+predict() returns (category, probability). retrieve_context() searches
+only that category's partition of the index when the probability clears
+CATEGORY_ROUTE_CONFIDENCE, and falls back to the full index otherwise.
+
+Training reads every FAQ, so the model is also saved to CLASSIFIER_PATH
+with the faqs/answer_index table versions it was built from. A restart
+with unchanged tables loads the snapshot instead of retraining. The
+snapshot's arrays are memory-mapped rather than read into dicts: the
+count table is stored bucket-major with a row offset per bucket, so
+predict() reads a bucket's row straight from the file, and an FAQ edit
+copies only the buckets it touches into the in-memory table.
+"""
+
+import json
+import math
+import mmap
+import os
+import threading
+import zlib
+from array import array
+from collections import Counter
+
+from search_index import tokenize, TITLE_BOOST
+
+# Features hash into 2**FEATURE_BITS buckets; collisions are rare enough
+# at FAQ vocabulary sizes and memory stays bounded
+FEATURE_BITS = 18
+FEATURE_MASK = (1 << FEATURE_BITS) - 1
+# Content tokens read per FAQ; the topic is in the title and first paragraphs
+CONTENT_TOKENS = 200
+# Additive smoothing per feature
+ALPHA = 0.1
+
+CLASSIFIER_PATH = 'faq_classifier.bin'
+# Bumped whenever features change, so older snapshots are retrained
+SNAPSHOT_FORMAT = 3
+
+
+# gram -> bucket, so each distinct word or bigram is hashed once
+_buckets = {}
+MAX_CACHED_BUCKETS = 500000
+
+
+def feature_bucket(gram):
+    value = _buckets.get(gram)
+    if value is None:
+        if len(_buckets) >= MAX_CACHED_BUCKETS:
+            _buckets.clear()
+        value = _buckets[gram] = zlib.crc32(gram.encode('utf-8')) & FEATURE_MASK
+    return value
+
+
+def hashed_features(tokens):
+    # Bucket -> count for the unigrams and bigrams of a token list
+    features = Counter()
+    for gram, count in Counter(tokens).items():
+        features[feature_bucket(gram)] += count
+    for (first, second), count in Counter(zip(tokens, tokens[1:])).items():
+        features[feature_bucket(f'{first} {second}')] += count
+    return features
+
+
+def faq_features(title, content):
+    features = hashed_features(tokenize(content)[:CONTENT_TOKENS])
+    for bucket, count in hashed_features(tokenize(title)).items():
+        features[bucket] += count * TITLE_BOOST
+    return features
+
+
+class CategoryClassifier:
+    def __init__(self, alpha=ALPHA):
+        self.alpha = alpha
+        self.lock = threading.RLock()
+        # bucket -> {category: count}, so scoring only touches the
+        # categories a query's features were seen in. After a snapshot
+        # load this only holds the buckets edited since, over `table`
+        self.counts = {}
+        # (row offsets, category codes, counts, category names) mapped
+        # from a snapshot, or None
+        self.table = None
+        # Buckets with any count, the vocabulary size
+        self.features = 0
+        # category -> total feature count / number of training documents
+        self.totals = Counter()
+        self.documents = Counter()
+        # key -> (category, buckets, counts), to undo a document later. A
+        # snapshot's examples are only sliced out of it on the first edit
+        self.examples = {}
+        self.snapshot_examples = None
+
+    def load(self, faq_rows, question_rows=()):
+        # (article_id, title, content, category) FAQs and (key, question,
+        # category, weight) labelled questions
+        with self.lock:
+            for article_id, title, content, category in faq_rows:
+                self.add_faq(article_id, title, content, category)
+            for key, question, category, weight in question_rows:
+                self.add_example(key, question, category, weight)
+
+    def add_faq(self, article_id, title, content, category):
+        # Train on one FAQ, replacing what it contributed before; FAQs
+        # without a category are only removed
+        if not category:
+            self.remove(article_id)
+            return
+        self._add(article_id, category, faq_features(title, content))
+
+    def add_example(self, key, question, category, weight=1):
+        # A labelled chat question
+        features = hashed_features(tokenize(question))
+        if weight != 1:
+            features = Counter({b: c * weight for b, c in features.items()})
+        self._add(key, category, features)
+
+    def _add(self, key, category, features):
+        with self.lock:
+            self.remove(key)
+            if not features:
+                return
+            for bucket, count in features.items():
+                by_category = self._row(bucket)
+                if not by_category:
+                    self.features += 1
+                by_category[category] = by_category.get(category, 0) + count
+            self.totals[category] += sum(features.values())
+            self.documents[category] += 1
+            self.examples[key] = (category, array('i', features.keys()), array('d', features.values()))
+
+    def remove(self, key):
+        with self.lock:
+            self._unpack_examples()
+            example = self.examples.pop(key, None)
+            if example is None:
+                return False
+            category, buckets, counts = example
+            for bucket, count in zip(buckets, counts):
+                by_category = self._row(bucket)
+                left = by_category[category] - count
+                if left > 1e-9:
+                    by_category[category] = left
+                else:
+                    del by_category[category]
+                    if not by_category:
+                        self.features -= 1
+                        # An empty row still hides the snapshot's
+                        if self.table is None:
+                            del self.counts[bucket]
+            self.totals[category] -= sum(counts)
+            self.documents[category] -= 1
+            if self.documents[category] <= 0:
+                del self.totals[category]
+                del self.documents[category]
+            return True
+
+    def _unpack_examples(self):
+        if self.snapshot_examples is None:
+            return
+        keys, buckets, counts = self.snapshot_examples
+        categories = self.table[3]
+        start = 0
+        for key, code, length in keys:
+            end = start + length
+            self.examples[key] = (categories[code], buckets[start:end], counts[start:end])
+            start = end
+        self.snapshot_examples = None
+
+    def _snapshot_row(self, bucket):
+        # [(category, count), ...] for a bucket in the mapped snapshot
+        if self.table is None:
+            return []
+        offsets, codes, counts, names = self.table
+        return [(names[codes[i]], counts[i]) for i in range(offsets[bucket], offsets[bucket + 1])]
+
+    def _row(self, bucket):
+        # The editable {category: count} for a bucket, copied from the
+        # snapshot the first time it changes
+        by_category = self.counts.get(bucket)
+        if by_category is None:
+            by_category = self.counts[bucket] = dict(self._snapshot_row(bucket))
+        return by_category
+
+    def predict(self, text):
+        # (most likely category, its posterior probability), or (None, 0.0)
+        # when there is nothing to choose between
+        features = hashed_features(tokenize(text))
+        with self.lock:
+            if len(self.documents) < 2 or not features:
+                return None, 0.0
+
+            alpha = self.alpha
+            vocabulary = self.features
+            documents = sum(self.documents.values())
+            length = sum(features.values())
+            # log P(c) + sum over features of log P(f|c), written as the
+            # unseen-feature baseline plus a bonus for each seen feature
+            scores = {}
+            for category, total in self.totals.items():
+                scores[category] = (math.log(self.documents[category] / documents)
+                                    + length * math.log(alpha / (total + alpha * vocabulary)))
+            for bucket, count in features.items():
+                by_category = self.counts.get(bucket)
+                seen_in = by_category.items() if by_category is not None else self._snapshot_row(bucket)
+                for category, seen in seen_in:
+                    scores[category] += count * math.log1p(seen / alpha)
+
+        best = max(scores, key=scores.get)
+        top = scores[best]
+        normalizer = sum(math.exp(score - top) for score in scores.values())
+        return best, 1.0 / normalizer
+
+    def save(self, path, version):
+        # One file, replaced atomically: a JSON header line padded to 8
+        # bytes, then packed arrays, the doubles first so each stays aligned
+        with self.lock:
+            self._unpack_examples()
+            categories = sorted(self.documents)
+            codes = {category: i for i, category in enumerate(categories)}
+            keys = []
+            buckets, counts = array('i'), array('d')
+            for key, (category, example_buckets, example_counts) in self.examples.items():
+                keys.append([key, codes[category], len(example_buckets)])
+                buckets.extend(example_buckets)
+                counts.extend(example_counts)
+            # Bucket-major: bucket b's row is [offsets[b], offsets[b + 1])
+            offsets, table_categories, table_counts = array('i', [0]), array('i'), array('d')
+            for bucket in range(FEATURE_MASK + 1):
+                by_category = self.counts.get(bucket)
+                for category, count in (by_category.items() if by_category is not None
+                                        else self._snapshot_row(bucket)):
+                    table_categories.append(codes[category])
+                    table_counts.append(count)
+                offsets.append(len(table_counts))
+            header = {
+                'format': SNAPSHOT_FORMAT,
+                'version': version,
+                'alpha': self.alpha,
+                'categories': categories,
+                'totals': [self.totals[category] for category in categories],
+                'keys': keys,
+                'table': len(table_counts),
+                'features': self.features
+            }
+
+        line = json.dumps(header).encode('utf-8')
+        line += b' ' * (-(len(line) + 1) % 8) + b'\n'
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(line)
+            for packed in (counts, table_counts, buckets, table_categories, offsets):
+                packed.tofile(f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load_snapshot(cls, path, version):
+        # The model saved for exactly this version, else None. Nothing
+        # past the header is read here; the arrays are views of the mapping
+        try:
+            with open(path, 'rb') as f:
+                header = json.loads(f.readline())
+                if header.get('format') != SNAPSHOT_FORMAT or header['version'] != version:
+                    return None
+                start = f.tell()
+                size = sum(length for _, _, length in header['keys'])
+                table = header['table']
+                if os.fstat(f.fileno()).st_size != start + 12 * (size + table) + 4 * (FEATURE_MASK + 2):
+                    return None
+                mapped = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+        except (OSError, ValueError, KeyError):
+            return None
+
+        sections = []
+        for typecode, length in (('d', size), ('d', table), ('i', size), ('i', table), ('i', FEATURE_MASK + 2)):
+            end = start + length * array(typecode).itemsize
+            sections.append(mapped[start:end].cast(typecode))
+            start = end
+        counts, table_counts, buckets, table_categories, offsets = sections
+
+        classifier = cls(alpha=header['alpha'])
+        categories = header['categories']
+        for code, documents in Counter(code for _, code, _ in header['keys']).items():
+            classifier.documents[categories[code]] = documents
+        for category, total in zip(categories, header['totals']):
+            classifier.totals[category] = total
+        classifier.snapshot_examples = (header['keys'], buckets, counts)
+        classifier.table = (offsets, table_categories, table_counts, categories)
+        classifier.features = header['features']
+        return classifier
+
+    def stats(self):
+        with self.lock:
+            return {
+                'categories': len(self.documents),
+                'examples': sum(self.documents.values()),
+                'features': self.features
+            }
@@ -13,6 +13,69 @@ class Config:
     SECRET_KEY = get_required_env_var('SECRET_KEY')
     DATABASE = 'faq_chatbot.db'
 
+    # Retrieval backends for /api/chat: any of keyword, fts, vector
+    RETRIEVERS = os.getenv('RETRIEVERS', 'keyword,fts').split(',')
+    # How long hybrid retrieval waits for the slowest backend
+    RETRIEVAL_BUDGET_MS = int(os.getenv('RETRIEVAL_BUDGET_MS', '150'))
+    RRF_K = 60
+
+    # Search only the predicted category's FAQs when the classifier is this sure
+    CATEGORY_ROUTING = os.getenv('CATEGORY_ROUTING', 'true').lower() in ('1', 'true', 'yes')
+    CATEGORY_ROUTE_CONFIDENCE = float(os.getenv('CATEGORY_ROUTE_CONFIDENCE', '0.8'))
+    # Fix typos against the KB vocabulary before searching
+    SPELL_CORRECTION = os.getenv('SPELL_CORRECTION', 'true').lower() in ('1', 'true', 'yes')
+
+    # Estimated prompt tokens spent on retrieved passages per chat turn
+    CONTEXT_TOKEN_BUDGET = int(os.getenv('CONTEXT_TOKEN_BUDGET', '1500'))
+    # Model prompt limit we plan against, and room kept free for the answer
+    MAX_PROMPT_TOKENS = int(os.getenv('MAX_PROMPT_TOKENS', '8192'))
+    ANSWER_TOKENS = int(os.getenv('ANSWER_TOKENS', '1024'))
+
+    # LLM answer cache for /api/chat
+    CACHE_MAX_ENTRIES = int(os.getenv('CACHE_MAX_ENTRIES', '1024'))
+    CACHE_TTL_SECONDS = int(os.getenv('CACHE_TTL_SECONDS', '3600'))
+    # Jaccard overlap for reusing a near-duplicate question, 0 turns it off
+    CACHE_SIMILARITY = float(os.getenv('CACHE_SIMILARITY', '0.8'))
+
+    # Per-call LLM deadline (first token when streaming) before falling back
+    # to a retrieval-only answer, and hedging of calls slower than p95
+    LLM_DEADLINE_SECONDS = float(os.getenv('LLM_DEADLINE_SECONDS', '20'))
+    LLM_HEDGE = os.getenv('LLM_HEDGE', 'true').lower() in ('1', 'true', 'yes')
+    LLM_HEDGE_MIN_SECONDS = float(os.getenv('LLM_HEDGE_MIN_SECONDS', '1.0'))
+
+    # Admission control for upstream LLM requests: concurrent requests,
+    # provider rate limit, queued requests and how long one may queue.
+    # Shed requests get the retrieval-only answer, or a 503 from /api/chat
+    # with LLM_SHED_RESPONSE=503
+    LLM_MAX_IN_FLIGHT = int(os.getenv('LLM_MAX_IN_FLIGHT', '8'))
+    LLM_REQUESTS_PER_MINUTE = int(os.getenv('LLM_REQUESTS_PER_MINUTE', '30'))
+    LLM_MAX_QUEUE = int(os.getenv('LLM_MAX_QUEUE', '64'))
+    LLM_QUEUE_WAIT_SECONDS = float(os.getenv('LLM_QUEUE_WAIT_SECONDS', '5'))
+    LLM_SHED_RESPONSE = os.getenv('LLM_SHED_RESPONSE', 'fallback')
+
+    # Serve stored answers for frequent questions (python answer_index.py
+    # builds them); a question must be this close to a cluster centroid
+    ANSWER_INDEX = os.getenv('ANSWER_INDEX', 'true').lower() in ('1', 'true', 'yes')
+    ANSWER_INDEX_THRESHOLD = float(os.getenv('ANSWER_INDEX_THRESHOLD', '0.8'))
+
+    # Page size of GET /api/faqs, and the most a client may ask for
+    FAQ_PAGE_SIZE = int(os.getenv('FAQ_PAGE_SIZE', '50'))
+    FAQ_MAX_PAGE_SIZE = int(os.getenv('FAQ_MAX_PAGE_SIZE', '200'))
+
+    # Share one LLM call between identical concurrent questions; the lease
+    # extends that across worker processes through SQLite
+    SINGLE_FLIGHT_LEASE = os.getenv('SINGLE_FLIGHT_LEASE', 'false').lower() in ('1', 'true', 'yes')
+    SINGLE_FLIGHT_WAIT_SECONDS = float(os.getenv('SINGLE_FLIGHT_WAIT_SECONDS', '60'))
+
+    # DEBUG shows per-request detail; sampled messages pass 1 in LOG_SAMPLE_EVERY
+    LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+    LOG_SAMPLE_EVERY = int(os.getenv('LOG_SAMPLE_EVERY', '100'))
+
+    # Group commit for chat_history: rows per commit, max wait, queue bound
+    CHAT_WRITE_BATCH = int(os.getenv('CHAT_WRITE_BATCH', '100'))
+    CHAT_WRITE_FLUSH_MS = int(os.getenv('CHAT_WRITE_FLUSH_MS', '50'))
+    CHAT_WRITE_QUEUE = int(os.getenv('CHAT_WRITE_QUEUE', '10000'))
+
 ATLASSIAN_CONFIG = {
     'base_url' : get_required_env_var('ATLASSIAN_BASE_URL'),
     'email' : get_required_env_var('ATLASSIAN_EMAIL'),
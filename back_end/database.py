@@ -1,78 +1,723 @@
 import sqlite3
+import re
+import threading
+import time
 from datetime import datetime
 
+from logs import get_logger, Sampled
+from metrics import metrics
+
+log = get_logger('database')
+sampled = Sampled(log)
+
+# Words that carry no meaning for KB search
+STOPWORDS = {
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'but', 'by', 'can', 'do',
+    'does', 'for', 'from', 'how', 'i', 'if', 'in', 'is', 'it', 'me', 'my',
+    'of', 'on', 'or', 'so', 'the', 'to', 'what', 'when', 'where', 'which',
+    'who', 'why', 'with', 'you', 'your'
+}
+
+TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+# bm25 column weights for faqs_fts (title, content)
+TITLE_WEIGHT = 10.0
+CONTENT_WEIGHT = 1.0
+
+
+def build_fts_query(query):
+    # Turn a free-text question into an FTS5 MATCH expression
+    tokens = [t for t in TOKEN_RE.findall(query.lower()) if t not in STOPWORDS]
+    if not tokens:
+        return None
+
+    # Dedupe but keep the user's word order
+    seen = []
+    for token in tokens:
+        if token not in seen:
+            seen.append(token)
+
+    # Prefix match each term so "login" also hits "logins"/"logging"
+    return ' OR '.join(f'"{token}"*' for token in seen)
+
+
+# Applied to every pooled connection
+PRAGMAS = (
+    # Readers no longer wait behind chat_history writers
+    'PRAGMA journal_mode = WAL',
+    # WAL is still crash-safe with NORMAL; skips an fsync per commit
+    'PRAGMA synchronous = NORMAL',
+    'PRAGMA mmap_size = 268435456',
+    'PRAGMA cache_size = -16000',
+    'PRAGMA temp_store = MEMORY',
+    'PRAGMA busy_timeout = 5000',
+    # INSERT OR REPLACE must fire the delete trigger so faqs_fts stays in sync
+    'PRAGMA recursive_triggers = ON',
+)
+
+
+class PooledConnection:
+    """sqlite3.Connection wrapper whose close() hands it back to the pool."""
+
+    _conn = None
+
+    def __init__(self, pool, conn):
+        self._pool = pool
+        self._conn = conn
+
+    def __getattr__(self, name):
+        if self._conn is None:
+            raise sqlite3.ProgrammingError("Cannot operate on a closed database.")
+        return getattr(self._conn, name)
+
+    def __enter__(self):
+        self._conn.__enter__()
+        return self
+
+    def __exit__(self, *exc):
+        return self._conn.__exit__(*exc)
+
+    def close(self):
+        if self._conn is not None:
+            self._pool.release(self._conn)
+            self._conn = None
+
+    def __del__(self):
+        # A handler that raised before close() still returns its connection
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+class ConnectionPool:
+    """Thread-safe pool of long-lived SQLite connections.
+
+    Connections are opened with check_same_thread=False and only ever used
+    by one thread at a time, between get() and close().
+    """
+
+    def __init__(self, db_path, max_idle=8):
+        self.db_path = db_path
+        self.max_idle = max_idle
+        self.idle = []
+        self.lock = threading.Lock()
+
+    def connect(self):
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    def get(self):
+        with self.lock:
+            conn = self.idle.pop() if self.idle else None
+        if conn is None:
+            conn = self.connect()
+        return PooledConnection(self, conn)
+
+    def release(self, conn):
+        # Never hand the next caller a half-finished transaction
+        if conn.in_transaction:
+            conn.rollback()
+        with self.lock:
+            if len(self.idle) < self.max_idle:
+                self.idle.append(conn)
+                return
+        conn.close()
+
+    def close_all(self):
+        with self.lock:
+            idle, self.idle = self.idle, []
+        for conn in idle:
+            conn.close()
+
+
+# GET /api/faqs field name -> faqs column
+FAQ_FIELDS = {
+    'article_id': 'article_id',
+    'question': 'title',
+    'answer': 'content',
+    'url': 'url',
+    'category': 'category',
+    'lastUpdated': 'last_updated'
+}
+
+# List views leave out the answer text unless asked for it
+DEFAULT_FAQ_FIELDS = ('article_id', 'question', 'url', 'category', 'lastUpdated')
+
+
+# Rows per transaction when syncing from Confluence
+SYNC_BATCH_SIZE = 200
+
+# How often searches check whether another worker wrote to faqs
+FAQ_RECHECK_SECONDS = 1.0
+# faq_changes rows kept for workers that are behind; one that falls
+# further behind than this rebuilds from the faqs table instead
+FAQ_CHANGES_KEPT = 50000
+
+# Update in place so the row keeps its id, category and created_at
+UPSERT_ARTICLE = '''
+    INSERT INTO faqs (article_id, title, content, url, last_updated, version)
+    VALUES (?, ?, ?, ?, ?, ?)
+    ON CONFLICT(article_id) DO UPDATE SET
+        title = excluded.title,
+        content = excluded.content,
+        url = excluded.url,
+        last_updated = excluded.last_updated,
+        version = excluded.version
+'''
+
+
 class DatabaseManager:
     def __init__(self, db_path='faq_chatbot.db'):
         self.db_path = db_path
+        self.pool = ConnectionPool(db_path)
+        # In-memory SearchIndex, set by build_index()
+        self.index = None
+        # CategoryClassifier for routing, set by build_classifier()
+        self.classifier = None
+        self.classifier_path = None
+        # SpellCorrector over the KB vocabulary, set by build_spelling()
+        self.spelling = None
+        # embeddings.VectorStore kept current on writes, set by VectorRetriever
+        self.vectors = None
+        # Background ChatHistoryWriter, set by start_chat_writer()
+        self.chat_writer = None
+        # Counters for the last (or running) sync_articles call
+        self.sync_progress = {'synced': 0, 'failed': 0, 'batches': 0}
+        # Last faq_changes row and faqs table version the in-memory
+        # structures reflect, see refresh_changed()
+        self.change_seq = 0
+        self.faqs_version = None
+        self.checked_at = 0.0
+        self.refresh_lock = threading.Lock()
     
     def get_connection(self):
-        return sqlite3.connect(self.db_path)
+        # Borrow a pooled connection; conn.close() returns it
+        return self.pool.get()
     
-    def sync_articles(self, articles):
+    def sync_articles(self, articles, batch_size=SYNC_BATCH_SIZE):
         """Sync articles from Atlassian to local database"""
+        # Accepts any iterable and writes it in chunked transactions, so a
+        # generator of parsed pages is never held in memory all at once
+        progress = {'synced': 0, 'failed': 0, 'batches': 0}
+        self.sync_progress = progress
+
+        log.info("🔄 Syncing articles to database...")
+
+        # Covers fetching too, since articles is usually a lazy generator
+        with metrics.span('sync'):
+            batch = []
+            for article in articles:
+                batch.append(article)
+                if len(batch) >= batch_size:
+                    self._sync_batch(batch, progress)
+                    batch = []
+            if batch:
+                self._sync_batch(batch, progress)
+
+        if progress['synced']:
+            self.save_classifier()
+            self.prune_changes()
+            if self.vectors is not None:
+                self.vectors.compact()
+
+        log.info("Synced %d articles to database%s", progress['synced'],
+                 f" ({progress['failed']} failed)" if progress['failed'] else "")
+        return progress['synced']
+
+    @metrics.span('sync_batch')
+    def _sync_batch(self, batch, progress):
+        rows = [
+            (
+                article['article_id'],
+                article['title'],
+                article['content'],
+                article['url'],
+                article['last_updated'],
+                article.get('version')
+            )
+            for article in batch
+        ]
+
         conn = self.get_connection()
-        c = conn.cursor()
-        
-        print(f"🔄 Syncing {len(articles)} articles to database...")
-        
-        for article in articles:
+        try:
             try:
-                # Use INSERT OR REPLACE (correct spelling)
-                c.execute('''
-                    INSERT OR REPLACE INTO faq_articles 
-                    (article_id, title, content, url, last_updated)
-                    VALUES (?, ?, ?, ?, ?)
-                ''', (
-                    article['article_id'],
-                    article['title'],
-                    article['content'],
-                    article['url'],
-                    article['last_updated']
-                ))
-                print(f"   Synced: {article['title']}")
+                conn.executemany(UPSERT_ARTICLE, rows)
+                for article in batch:
+                    self.write_chunks(conn, article['article_id'], article['title'], article['content'])
+                conn.commit()
+                written = batch
             except Exception as e:
-                print(f"   Failed to sync '{article['title']}': {e}")
-        
-        conn.commit()
-        conn.close()
-        print(f" Successfully synced {len(articles)} articles to database")
+                # One bad row fails the whole executemany; retry row by row
+                conn.rollback()
+                log.warning("Batch failed (%s), retrying row by row", e)
+                written = []
+                for article, row in zip(batch, rows):
+                    try:
+                        conn.execute(UPSERT_ARTICLE, row)
+                        self.write_chunks(conn, article['article_id'], article['title'], article['content'])
+                        written.append(article)
+                    except Exception as e:
+                        progress['failed'] += 1
+                        sampled.warning('sync_row', "Failed to sync '%s': %s", article.get('title'), e)
+                conn.commit()
+            # Sync never sets a category, the upsert keeps the stored one
+            categories = {}
+            if written:
+                categories = dict(conn.execute(
+                    f"SELECT article_id, category FROM faqs WHERE article_id IN ({','.join('?' * len(written))})",
+                    [article['article_id'] for article in written]
+                ).fetchall())
+        finally:
+            conn.close()
+
+        for article in written:
+            self.apply_article(
+                article['article_id'],
+                article['title'],
+                article['content'],
+                article['url'],
+                article['last_updated'],
+                categories.get(article['article_id'])
+            )
+
+        progress['synced'] += len(written)
+        progress['batches'] += 1
+        metrics.inc('sync_rows', len(written))
+        metrics.inc('sync_failed_rows', len(batch) - len(written))
+        log.debug("Synced %d articles so far", progress['synced'])
+
+    def get_article_versions(self):
+        # article_id -> stored Confluence version, for incremental sync
+        conn = self.get_connection()
+        try:
+            rows = conn.execute('SELECT article_id, version FROM faqs WHERE version IS NOT NULL').fetchall()
+        finally:
+            conn.close()
+        return {row[0]: row[1] for row in rows}
+
+    def get_sync_state(self, key):
+        conn = self.get_connection()
+        try:
+            row = conn.execute('SELECT value FROM sync_state WHERE key = ?', (key,)).fetchone()
+        finally:
+            conn.close()
+        return row[0] if row else None
+
+    def set_sync_state(self, key, value):
+        conn = self.get_connection()
+        try:
+            conn.execute('''
+                INSERT INTO sync_state (key, value) VALUES (?, ?)
+                ON CONFLICT(key) DO UPDATE SET value = excluded.value
+            ''', (key, value))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def last_change(self, conn):
+        return conn.execute('SELECT COALESCE(MAX(seq), 0) FROM faq_changes').fetchone()[0]
+
+    def refresh_changed(self):
+        """Apply faqs writes made by other workers to the in-memory search
+        index, classifier, spelling dictionary and vector store.
+
+        Checks the table_versions counter at most every FAQ_RECHECK_SECONDS;
+        when it moved, re-reads just the FAQs listed in faq_changes since
+        the last check. Returns the number of FAQs re-read.
+        """
+        if self.index is None and self.vectors is None:
+            return 0
+        now = time.monotonic()
+        if now - self.checked_at < FAQ_RECHECK_SECONDS:
+            return 0
+        # One thread catches up; the others search what is there meanwhile
+        if not self.refresh_lock.acquire(blocking=False):
+            return 0
+        try:
+            self.checked_at = now
+            version = self.get_table_version('faqs')
+            if version == self.faqs_version:
+                return 0
+
+            changes, rows = [], {}
+            conn = self.get_connection()
+            try:
+                first = conn.execute('SELECT MIN(seq) FROM faq_changes WHERE seq > ?',
+                                     (self.change_seq,)).fetchone()[0]
+                # Sequence numbers have no gaps unless the ones we need were pruned
+                pruned = first is not None and first > self.change_seq + 1
+                if not pruned:
+                    changes = conn.execute('SELECT seq, article_id FROM faq_changes WHERE seq > ? ORDER BY seq',
+                                           (self.change_seq,)).fetchall()
+                    article_ids = list(dict.fromkeys(article_id for _, article_id in changes))
+                    for start in range(0, len(article_ids), 500):
+                        batch = article_ids[start:start + 500]
+                        rows.update((row[0], row) for row in conn.execute(
+                            'SELECT article_id, title, content, url, last_updated, category FROM faqs '
+                            f"WHERE article_id IN ({','.join('?' * len(batch))})",
+                            batch
+                        ).fetchall())
+            finally:
+                conn.close()
+
+            if pruned:
+                log.warning("FAQ change log was pruned past this worker, rebuilding in-memory state")
+                self.rebuild_memory()
+                self.faqs_version = version
+                return len(self.index) if self.index is not None else 0
+
+            for article_id in article_ids:
+                if article_id in rows:
+                    self.apply_article(*rows[article_id])
+                else:
+                    self.drop_article(article_id)
+            if changes:
+                self.change_seq = changes[-1][0]
+                log.info("Re-read %d changed FAQs into memory", len(article_ids))
+            self.faqs_version = version
+            return len(article_ids)
+        finally:
+            self.refresh_lock.release()
+
+    def rebuild_memory(self):
+        # Reload every in-memory structure from faqs
+        conn = self.get_connection()
+        try:
+            self.change_seq = self.last_change(conn)
+        finally:
+            conn.close()
+        if self.index is not None:
+            self.build_index()
+        if self.classifier is not None:
+            self.build_classifier(self.classifier_path)
+        if self.spelling is not None:
+            self.build_spelling()
+        if self.vectors is not None:
+            self.vectors.build()
+
+    def prune_changes(self):
+        # Keep the change log bounded; workers behind it rebuild instead
+        conn = self.get_connection()
+        try:
+            conn.execute('DELETE FROM faq_changes WHERE seq <= (SELECT MAX(seq) FROM faq_changes) - ?',
+                         (FAQ_CHANGES_KEPT,))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def get_table_version(self, name='faqs'):
+        # Counter bumped by triggers on every write to the table
+        conn = self.get_connection()
+        try:
+            row = conn.execute('SELECT version FROM table_versions WHERE name = ?', (name,)).fetchone()
+        finally:
+            conn.close()
+        return row[0] if row else 0
+
+    def list_faqs(self, after=0, limit=50, category=None, fields=DEFAULT_FAQ_FIELDS):
+        """One page of FAQs ordered by id, starting after the given id.
+
+        Returns (faqs, next_after); next_after is None on the last page.
+        """
+        columns = ', '.join(['id'] + [FAQ_FIELDS[field] for field in fields])
+        query = f'SELECT {columns} FROM faqs WHERE id > ?'
+        params = [after]
+        if category:
+            query += ' AND category = ?'
+            params.append(category)
+        query += ' ORDER BY id LIMIT ?'
+        # One extra row tells us whether there is a next page
+        params.append(limit + 1)
+
+        conn = self.get_connection()
+        try:
+            rows = conn.execute(query, params).fetchall()
+        finally:
+            conn.close()
+
+        page = rows[:limit]
+        faqs = [dict(zip(fields, row[1:])) for row in page]
+        next_after = page[-1][0] if len(rows) > limit else None
+        return faqs, next_after
+
+    def build_index(self):
+        # Load every FAQ into an in-memory SearchIndex once at startup
+        from search_index import SearchIndex
+
+        conn = self.get_connection()
+        try:
+            # Writes from here on are replayed by refresh_changed()
+            self.change_seq = self.last_change(conn)
+            rows = conn.execute(
+                'SELECT article_id, title, content, url, last_updated, category FROM faqs'
+            ).fetchall()
+        finally:
+            conn.close()
+
+        index = SearchIndex()
+        index.load(rows)
+        self.index = index
+        log.info("Built search index with %d articles", len(index))
+        return index
+
+    def build_classifier(self, path=None):
+        # Train the category classifier on categorized FAQs and on the
+        # approved answer_index questions, labelled by their FAQ's category.
+        # With a path, reuse the snapshot there if the tables haven't changed
+        from classifier import CategoryClassifier
+
+        version = [self.get_table_version('faqs'), self.get_table_version('answer_index')]
+        if path:
+            classifier = CategoryClassifier.load_snapshot(path, version)
+            if classifier is not None:
+                self.classifier = classifier
+                self.classifier_path = path
+                log.info("Loaded category classifier (%d examples)", classifier.stats()['examples'])
+                return classifier
+
+        conn = self.get_connection()
+        try:
+            faq_rows = conn.execute(
+                "SELECT article_id, title, content, category FROM faqs WHERE category IS NOT NULL AND category != ''"
+            ).fetchall()
+            question_rows = conn.execute('''
+                SELECT 'answer:' || a.id, a.representative, f.category, a.support
+                FROM answer_index a JOIN faqs f ON f.article_id = a.article_id
+                WHERE a.approved = 1 AND f.category IS NOT NULL AND f.category != ''
+            ''').fetchall()
+        finally:
+            conn.close()
+
+        classifier = CategoryClassifier()
+        # A cluster asked 1000 times should not drown out the FAQ text
+        classifier.load(faq_rows, [(key, question, category, min(support, 10))
+                                   for key, question, category, support in question_rows])
+        self.classifier = classifier
+        self.classifier_path = path
+        if path:
+            classifier.save(path, version)
+        log.info("Trained category classifier on %d FAQs and %d questions", len(faq_rows), len(question_rows))
+        return classifier
+
+    def build_spelling(self):
+        # Spelling dictionary and delete map from every FAQ's words
+        from query_processing import SpellCorrector
+
+        conn = self.get_connection()
+        try:
+            rows = conn.execute('SELECT article_id, title, content FROM faqs').fetchall()
+        finally:
+            conn.close()
+
+        spelling = SpellCorrector()
+        spelling.load(rows)
+        self.spelling = spelling
+        log.info("Built spelling dictionary with %d words", spelling.stats()['words'])
+        return spelling
+
+    def save_classifier(self):
+        # Snapshot the incrementally updated classifier, e.g. after a sync
+        if self.classifier is None or not self.classifier_path:
+            return
+        version = [self.get_table_version('faqs'), self.get_table_version('answer_index')]
+        self.classifier.save(self.classifier_path, version)
+
+    def refresh_article(self, article_id):
+        # Re-read one FAQ row after a write, re-chunk it and update the index in place
+        conn = self.get_connection()
+        try:
+            row = conn.execute(
+                'SELECT article_id, title, content, url, last_updated, category FROM faqs WHERE article_id = ?',
+                (article_id,)
+            ).fetchone()
+            if row:
+                self.write_chunks(conn, row[0], row[1], row[2])
+                conn.commit()
+        finally:
+            conn.close()
+
+        if row:
+            self.apply_article(*row)
+        else:
+            self.drop_article(article_id)
+
+    def apply_article(self, article_id, title, content, url, last_updated, category):
+        # Bring the in-memory index, classifier, spelling dictionary and
+        # vector store up to date with one written FAQ
+        if self.index is not None:
+            self.index.add(article_id, title, content, url, last_updated, category)
+        if self.classifier is not None:
+            self.classifier.add_faq(article_id, title, content, category)
+        if self.spelling is not None:
+            self.spelling.add_faq(article_id, title, content)
+        if self.vectors is not None:
+            self.vectors.add(article_id, title, content, url, last_updated, category)
+
+    def write_chunks(self, conn, article_id, title, content):
+        # Replace an article's passages; the caller owns the transaction
+        from chunking import chunk_text
+        from prompt_builder import estimate_tokens
+
+        conn.execute('DELETE FROM faq_chunks WHERE article_id = ?', (article_id,))
+        conn.executemany(
+            'INSERT INTO faq_chunks (article_id, chunk_index, content, token_count) VALUES (?, ?, ?, ?)',
+            [
+                (article_id, i, text, estimate_tokens(text))
+                for i, text in enumerate(chunk_text(title, content))
+            ]
+        )
+
+    def build_chunks(self):
+        # Chunk FAQs that have no passages yet (rows from before faq_chunks, test data)
+        conn = self.get_connection()
+        try:
+            rows = conn.execute('''
+                SELECT article_id, title, content FROM faqs f
+                WHERE NOT EXISTS (SELECT 1 FROM faq_chunks c WHERE c.article_id = f.article_id)
+            ''').fetchall()
+            for row in rows:
+                self.write_chunks(conn, *row)
+            conn.commit()
+        finally:
+            conn.close()
+
+        if rows:
+            log.info("Chunked %d articles into passages", len(rows))
+        return len(rows)
+
+    def get_chunks(self, article_ids):
+        # article_id -> passages in document order
+        chunks = {article_id: [] for article_id in article_ids}
+        if not chunks:
+            return chunks
+
+        conn = self.get_connection()
+        try:
+            rows = conn.execute(
+                f'''SELECT article_id, content FROM faq_chunks
+                    WHERE article_id IN ({','.join('?' * len(chunks))})
+                    ORDER BY article_id, chunk_index''',
+                list(chunks)
+            ).fetchall()
+        finally:
+            conn.close()
+
+        for article_id, content in rows:
+            chunks[article_id].append(content)
+        return chunks
+
+    def get_last_updated(self, article_id):
+        # Current last_updated of an FAQ, or None if it no longer exists
+        self.refresh_changed()
+        if self.index is not None:
+            doc = self.index.get(article_id)
+            return doc['last_updated'] if doc is not None else None
+        conn = self.get_connection()
+        try:
+            row = conn.execute('SELECT last_updated FROM faqs WHERE article_id = ?', (article_id,)).fetchone()
+        finally:
+            conn.close()
+        return row[0] if row else None
+
+    def drop_article(self, article_id):
+        # Remove a deleted FAQ from the index, classifier, spelling dictionary
+        # and vector store
+        if self.index is not None:
+            self.index.remove(article_id)
+        if self.classifier is not None:
+            self.classifier.remove(article_id)
+        if self.spelling is not None:
+            self.spelling.remove(article_id)
+        if self.vectors is not None:
+            self.vectors.remove(article_id)
     
-    def search_articles(self, query, limit=5):
-        # Search for relevant articles based on query
+    def search_articles(self, query, limit=5, category=None):
+        # Search for relevant articles based on query, best match first
+        self.refresh_changed()
+        if self.index is not None:
+            return self.index.search(query, limit, category)
+        return self.search_fts(query, limit, category)
+
+    def search_fts(self, query, limit=5, category=None):
+        # Ranked FTS5 search straight against SQLite; with a category, only
+        # that category and uncategorized FAQs
+        match = build_fts_query(query)
+        if not match:
+            return []
+
+        where = ''
+        params = [match]
+        if category:
+            where = "AND (f.category = ? OR f.category IS NULL OR f.category = '')"
+            params.append(category)
+
         conn = self.get_connection()
         c = conn.cursor()
-        
-        # Simple keyword search
-        search_term = f'%{query}%'
-        
+
         try:
-            c.execute('''
-                SELECT title, content, url 
-                FROM faq_articles 
-                WHERE title LIKE ? OR content LIKE ?
+            c.execute(f'''
+                SELECT f.title, f.content, f.url, f.article_id, f.last_updated
+                FROM faqs_fts
+                JOIN faqs f ON f.id = faqs_fts.rowid
+                WHERE faqs_fts MATCH ? {where}
+                ORDER BY bm25(faqs_fts, ?, ?)
                 LIMIT ?
-            ''', (search_term, search_term, limit))
-            
+            ''', params + [TITLE_WEIGHT, CONTENT_WEIGHT, limit])
+
             results = c.fetchall()
-            
-            formatted_results = []
-            for row in results:
-                formatted_results.append({
-                    'title': row[0], 
-                    'content': row[1], 
-                    'url': row[2]
-                })
-            
-            return formatted_results
-            
+
+        except sqlite3.OperationalError as e:
+            # No FTS5 in this SQLite build, fall back to keyword search
+            sampled.warning('fts_unavailable', "FTS search unavailable, using LIKE: %s", e)
+            try:
+                results = self._like_search(c, query, limit)
+            except Exception as e:
+                sampled.warning('search_error', "Search error: %s", e)
+                return []
         except Exception as e:
-            print(f" Search error: {e}")
+            sampled.warning('search_error', "Search error: %s", e)
             return []
         finally:
             conn.close()
-    
+
+        formatted_results = []
+        for row in results:
+            formatted_results.append({
+                'title': row[0],
+                'content': row[1],
+                'url': row[2],
+                'article_id': row[3],
+                'last_updated': row[4]
+            })
+
+        return formatted_results
+
+    def _like_search(self, c, query, limit):
+        # Simple keyword search
+        search_term = f'%{query}%'
+        c.execute('''
+            SELECT title, content, url, article_id, last_updated
+            FROM faqs
+            WHERE title LIKE ? OR content LIKE ?
+            LIMIT ?
+        ''', (search_term, search_term, limit))
+        return c.fetchall()
+
+    def start_chat_writer(self, **options):
+        # Move chat_history inserts off the request path
+        from chat_writer import ChatHistoryWriter
+        self.chat_writer = ChatHistoryWriter(self, **options).start()
+        return self.chat_writer
+
     def save_chat(self, session_id, user_message, bot_response):
         # Save chat history
+        if self.chat_writer is not None:
+            self.chat_writer.submit(session_id, user_message, bot_response)
+            return
+
         conn = self.get_connection()
         c = conn.cursor()
         
@@ -83,8 +728,8 @@ class DatabaseManager:
             ''', (session_id, user_message, bot_response))
             
             conn.commit()
-            print(f" Saved chat: {user_message[:50]}...")
+            log.debug("Saved chat for session %s", session_id)
         except Exception as e:
-            print(f" Failed to save chat: {e}")
+            log.error("Failed to save chat: %s", e)
         finally:
             conn.close()
\ No newline at end of file
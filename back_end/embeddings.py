@@ -0,0 +1,313 @@
+import glob
+import json
+import os
+import threading
+import time
+import zlib
+
+from database import TOKEN_RE
+from logs import get_logger
+
+log = get_logger('embeddings')
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    np = None
+    NUMPY_AVAILABLE = False
+
+# Manifest naming the current matrix file and its row ids
+VECTORS_PATH = 'faq_vectors.json'
+EMBEDDING_DIM = 1024
+# FAQs embedded in memory since the last build before a rebuild is forced
+MAX_OVERLAY = 2000
+
+
+class HashingEmbedder:
+    """Bag of words + character n-grams hashed into a fixed-size vector.
+
+    Needs no model download or network. Character n-grams let "pasword",
+    "passwords" and "password" land close together.
+    """
+
+    def __init__(self, dim=EMBEDDING_DIM, ngram_range=(3, 5)):
+        self.dim = dim
+        self.ngram_range = ngram_range
+
+    def features(self, text):
+        # Word tokens plus n-grams of each "<word>" with boundary markers
+        for word in TOKEN_RE.findall((text or '').lower()):
+            yield 'w:' + word
+            padded = f'<{word}>'
+            low, high = self.ngram_range
+            for n in range(low, high + 1):
+                for i in range(len(padded) - n + 1):
+                    yield padded[i:i + n]
+
+    def embed(self, texts):
+        # Return a (len(texts), dim) float32 matrix of unit vectors
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature in self.features(text):
+                h = zlib.crc32(feature.encode('utf-8'))
+                # Top bit picks the sign so collisions tend to cancel out
+                matrix[row, h % self.dim] += 1.0 if h & 0x80000000 else -1.0
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        matrix /= norms
+        return matrix
+
+
+class VectorStore:
+    """Cosine retriever over FAQ embeddings kept in a memory-mapped .npy file.
+
+    The matrix is opened with mmap_mode='r', so every worker process maps
+    the same page-cache pages instead of holding its own copy.
+
+    path is a small JSON manifest naming the matrix file and listing the
+    article id of each row. build() writes a new matrix under a fresh name
+    and then replaces the manifest, so a reader always gets ids and rows
+    from the same build. FAQs written since the last build are embedded
+    into a small in-memory overlay that search checks too; their stale
+    matrix rows are masked. Once the overlay grows past max_overlay rows
+    (and after every sync) the matrix is rebuilt.
+    """
+
+    def __init__(self, db_manager, path=VECTORS_PATH, embedder=None, max_overlay=MAX_OVERLAY):
+        if not NUMPY_AVAILABLE:
+            raise RuntimeError("numpy is required for vector search")
+        self.db_manager = db_manager
+        self.path = path
+        self.embedder = embedder or HashingEmbedder()
+        self.max_overlay = max_overlay
+        self.lock = threading.RLock()
+        self.matrix = None
+        self.article_ids = []
+        # article_id -> matrix row, and the text digest that row was built from
+        self.rows = {}
+        self.digests = {}
+        self.articles = {}
+        self.mtime = None
+        # Writes since the matrix was built: article_id -> (digest, vector),
+        # or (None, None) for a deleted FAQ
+        self.overlay = {}
+        self._refresh_overlay()
+
+    def embed_article(self, title, content):
+        # Title goes in twice so it outweighs long page bodies
+        return self.embedder.embed([f"{title} {title} {content}"])[0]
+
+    def build(self, batch_size=256):
+        # Embed every FAQ into a new matrix file, then swap the manifest
+        conn = self.db_manager.get_connection()
+        try:
+            rows = conn.execute('SELECT article_id, title, content FROM faqs ORDER BY id').fetchall()
+        finally:
+            conn.close()
+
+        base = os.path.splitext(self.path)[0]
+        matrix_path = f"{base}.{time.time_ns()}-{os.getpid()}.npy"
+        matrix = np.lib.format.open_memmap(
+            matrix_path + '.tmp', mode='w+', dtype=np.float32,
+            shape=(len(rows), self.embedder.dim)
+        )
+        for start in range(0, len(rows), batch_size):
+            batch = rows[start:start + batch_size]
+            texts = [f"{title} {title} {content}" for _, title, content in batch]
+            matrix[start:start + len(batch)] = self.embedder.embed(texts)
+        matrix.flush()
+        del matrix
+        os.replace(matrix_path + '.tmp', matrix_path)
+
+        manifest = {
+            'matrix': os.path.basename(matrix_path),
+            'ids': [row[0] for row in rows],
+            'digests': [text_digest(title, content) for _, title, content in rows]
+        }
+        with open(self.path + '.tmp', 'w') as f:
+            json.dump(manifest, f)
+        os.replace(self.path + '.tmp', self.path)
+
+        # Older matrices are unreachable now; mappings already open stay valid
+        for old in glob.glob(f"{glob.escape(base)}.*.npy"):
+            if old != matrix_path:
+                try:
+                    os.remove(old)
+                except OSError:
+                    pass
+
+        log.info("Built vector store with %d articles", len(rows))
+        self.load()
+
+    def load(self):
+        # Map the matrix read-only and load the row -> article lookup
+        if not os.path.exists(self.path):
+            self.build()
+            return
+
+        for attempt in range(3):
+            mtime = os.path.getmtime(self.path)
+            with open(self.path) as f:
+                manifest = json.load(f)
+            try:
+                matrix = np.load(os.path.join(os.path.dirname(self.path), manifest['matrix']), mmap_mode='r')
+                break
+            except FileNotFoundError:
+                # Another process swapped in a newer build meanwhile
+                if attempt == 2:
+                    raise
+
+        conn = self.db_manager.get_connection()
+        try:
+            rows = conn.execute('SELECT article_id, title, content, url, last_updated, category FROM faqs').fetchall()
+        finally:
+            conn.close()
+
+        with self.lock:
+            self.mtime = mtime
+            self.matrix = matrix
+            self.article_ids = manifest['ids']
+            self.rows = {article_id: i for i, article_id in enumerate(self.article_ids)}
+            self.digests = dict(zip(self.article_ids, manifest['digests']))
+            self.articles = {row[0]: article_dict(row) for row in rows}
+            # Drop overlay entries the new matrix already covers; writes
+            # that landed after it read faqs stay
+            for article_id, entry in list(self.overlay.items()):
+                if self._covered(article_id, entry):
+                    del self.overlay[article_id]
+            self._refresh_overlay()
+
+    def reload_if_changed(self):
+        # Pick up a matrix rebuilt by another process
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return
+        if mtime != self.mtime:
+            self.load()
+
+    def _covered(self, article_id, entry):
+        digest, _ = entry
+        if digest is None:
+            return article_id not in self.rows
+        return self.digests.get(article_id) == digest
+
+    def _refresh_overlay(self):
+        # Arrays search uses: overlay rows and matrix rows they mask
+        live = [(article_id, entry[1]) for article_id, entry in self.overlay.items() if entry[0] is not None]
+        self.extra_ids = [article_id for article_id, _ in live]
+        self.extra = np.vstack([vector for _, vector in live]) if live else None
+        self.masked = np.array([self.rows[article_id] for article_id in self.overlay if article_id in self.rows],
+                               dtype=np.intp)
+
+    def add(self, article_id, title, content, url, last_updated, category):
+        # Bring one written FAQ up to date without rebuilding the matrix
+        digest = text_digest(title, content)
+        with self.lock:
+            self.articles[article_id] = article_dict((article_id, title, content, url, last_updated, category))
+            if self.digests.get(article_id) == digest:
+                # Same text as the matrix row, e.g. a category change
+                changed = self.overlay.pop(article_id, None) is not None
+            else:
+                self.overlay[article_id] = (digest, self.embed_article(title, content))
+                changed = True
+            if changed:
+                self._refresh_overlay()
+            rebuild = len(self.overlay) > self.max_overlay
+        if rebuild:
+            self.build()
+
+    def remove(self, article_id):
+        with self.lock:
+            self.articles.pop(article_id, None)
+            if article_id in self.rows:
+                self.overlay[article_id] = (None, None)
+            else:
+                self.overlay.pop(article_id, None)
+            self._refresh_overlay()
+
+    def compact(self):
+        # Fold the overlay into a new matrix, e.g. after a sync
+        if self.overlay:
+            self.build()
+
+    def search_articles(self, query, limit=5, category=None):
+        # Same contract as DatabaseManager.search_articles
+        if self.matrix is None:
+            self.load()
+        else:
+            self.reload_if_changed()
+
+        with self.lock:
+            matrix, article_ids = self.matrix, self.article_ids
+            extra, extra_ids, masked = self.extra, self.extra_ids, self.masked
+            articles = self.articles
+        if not len(article_ids) and extra is None:
+            return []
+
+        query_vector = self.embedder.embed([query])[0]
+        if not query_vector.any():
+            return []
+
+        # One matrix-vector product scores every article
+        scores = matrix @ query_vector
+        if len(masked):
+            scores[masked] = 0.0
+        if extra is not None:
+            scores = np.concatenate([scores, extra @ query_vector])
+
+        # Rows are not partitioned by category; over-fetch and filter
+        wanted = limit * 4 if category else limit
+        k = min(wanted, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+
+        results = []
+        for i in top:
+            if scores[i] <= 0:
+                break
+            article_id = article_ids[i] if i < len(article_ids) else extra_ids[i - len(article_ids)]
+            article = articles.get(article_id)
+            if article is None:
+                continue
+            if category and article['category'] and article['category'] != category:
+                continue
+            result = dict(article)
+            result['score'] = float(scores[i])
+            results.append(result)
+            if len(results) == limit:
+                break
+        return results
+
+    def stats(self):
+        with self.lock:
+            return {
+                'rows': len(self.article_ids),
+                'overlay': len(self.overlay)
+            }
+
+
+def text_digest(title, content):
+    # What a row's embedding depends on, to tell stale rows from current ones
+    return zlib.crc32(f"{title}\0{content}".encode('utf-8'))
+
+
+def article_dict(row):
+    article_id, title, content, url, last_updated, category = row
+    return {
+        'title': title,
+        'content': content,
+        'url': url,
+        'article_id': article_id,
+        'last_updated': last_updated,
+        'category': category
+    }
+
+
+if __name__ == '__main__':
+    from models import init_db
+    from database import DatabaseManager
+
+    init_db()
+    VectorStore(DatabaseManager()).build()
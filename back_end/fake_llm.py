@@ -0,0 +1,159 @@
+"""
+Local stand-in for the Groq chat completions API.
+
+Answers POST /openai/v1/chat/completions after an injectable delay, in
+both the plain and the stream=True (SSE) formats. Point the app at it with
+GROQ_BASE_URL=http://127.0.0.1:<port> for load tests and tail-latency
+experiments without spending tokens.
+
+    python fake_llm.py --port 8090 --latency 2.0
+"""
+
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+ANSWER = "To reset your password, open the login page and click Forgot Password."
+
+
+class FakeLLMHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        body = json.loads(self.rfile.read(length) or b'{}')
+        server = self.server
+
+        with server.lock:
+            server.requests += 1
+            fail = server.fail_rate and random.random() < server.fail_rate
+            limited = server.max_concurrent and server.active >= server.max_concurrent
+            if limited:
+                server.rate_limited += 1
+            else:
+                server.active += 1
+
+        if limited:
+            # Like a provider's concurrency limit: rejected right away
+            self.send_json(429, {'error': {'message': 'fake rate limit'}})
+            return
+
+        try:
+            self.respond(body, fail)
+        finally:
+            with server.lock:
+                server.active -= 1
+
+    def respond(self, body, fail):
+        time.sleep(self.server.pick_latency())
+
+        if fail:
+            self.send_json(503, {'error': {'message': 'fake overload'}})
+            return
+
+        if body.get('stream'):
+            self.send_stream(body.get('model'))
+        else:
+            self.send_json(200, {
+                'id': 'fake',
+                'object': 'chat.completion',
+                'created': int(time.time()),
+                'model': body.get('model', 'fake'),
+                'choices': [{
+                    'index': 0,
+                    'message': {'role': 'assistant', 'content': ANSWER},
+                    'finish_reason': 'stop'
+                }],
+                'usage': {'prompt_tokens': 0, 'completion_tokens': 0, 'total_tokens': 0}
+            })
+
+    def send_json(self, status, payload):
+        data = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def send_stream(self, model):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        for word in ANSWER.split(' '):
+            chunk = {
+                'id': 'fake',
+                'object': 'chat.completion.chunk',
+                'created': int(time.time()),
+                'model': model or 'fake',
+                'choices': [{'index': 0, 'delta': {'content': word + ' '}, 'finish_reason': None}]
+            }
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode('utf-8'))
+            self.wfile.flush()
+            time.sleep(self.server.token_delay)
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.close_connection = True
+
+
+class FakeLLMServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, port=0, latency=1.0, jitter=0.0, slow_rate=0.0, slow_latency=5.0,
+                 fail_rate=0.0, token_delay=0.02, max_concurrent=0):
+        super().__init__(('127.0.0.1', port), FakeLLMHandler)
+        self.latency = latency
+        self.jitter = jitter
+        # Fraction of calls that take slow_latency instead, to model a long tail
+        self.slow_rate = slow_rate
+        self.slow_latency = slow_latency
+        self.fail_rate = fail_rate
+        self.token_delay = token_delay
+        # Requests beyond this many in progress get a 429, 0 for no limit
+        self.max_concurrent = max_concurrent
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.active = 0
+        self.rate_limited = 0
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def pick_latency(self):
+        if self.slow_rate and random.random() < self.slow_rate:
+            return self.slow_latency
+        return max(0.0, self.latency + random.uniform(-self.jitter, self.jitter))
+
+    def handle_error(self, request, client_address):
+        # Cancelled and hedged calls hang up mid-response; that is expected
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+    def start(self):
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return self
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Fake Groq chat completions server')
+    parser.add_argument('--port', type=int, default=8090)
+    parser.add_argument('--latency', type=float, default=1.0)
+    parser.add_argument('--jitter', type=float, default=0.0)
+    parser.add_argument('--slow-rate', type=float, default=0.0)
+    parser.add_argument('--slow-latency', type=float, default=5.0)
+    parser.add_argument('--fail-rate', type=float, default=0.0)
+    parser.add_argument('--max-concurrent', type=int, default=0)
+    args = parser.parse_args()
+
+    server = FakeLLMServer(args.port, args.latency, args.jitter, args.slow_rate,
+                           args.slow_latency, args.fail_rate, max_concurrent=args.max_concurrent)
+    print(f"Fake LLM listening on {server.base_url}")
+    server.serve_forever()
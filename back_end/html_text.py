@@ -0,0 +1,146 @@
+"""
+HTML to plain text for Confluence page bodies.
+
+One pass over the markup with html.parser: entities are decoded, script,
+style and Confluence macro chrome are dropped, and block structure is
+kept as lines ("## Heading", "- list item", blank line between
+paragraphs) so later chunking can split on it.
+"""
+
+import re
+from html.parser import HTMLParser
+
+# Content of these tags is never text
+SKIP_TAGS = {'script', 'style', 'noscript', 'template', 'svg', 'head', 'button', 'select', 'iframe'}
+
+# Confluence wraps UI chrome in these classes (expand toggles, toolbars, ...)
+SKIP_CLASSES = re.compile(r'\b(expand-control|confluence-information-macro-icon|aui-icon|toc-macro)\b')
+
+BLOCK_TAGS = {
+    'p', 'div', 'section', 'article', 'table', 'tr', 'blockquote', 'pre',
+    'ul', 'ol', 'dl', 'dt', 'dd', 'br', 'hr', 'figure', 'figcaption'
+}
+HEADING_TAGS = {'h1': 1, 'h2': 2, 'h3': 3, 'h4': 4, 'h5': 5, 'h6': 6}
+CELL_TAGS = {'td', 'th'}
+
+# Tags that never get a closing tag, so they must not open a skip scope
+VOID_TAGS = {'br', 'hr', 'img', 'input', 'meta', 'link', 'col', 'area', 'base', 'source', 'wbr'}
+
+INLINE_SPACE_RE = re.compile(r'[ \t\r\f\v\xa0]+')
+BLANK_LINES_RE = re.compile(r'\n\s*\n\s*(\n\s*)+')
+TAG_RE = re.compile(r'<[^<]+?>')
+
+
+class _TextExtractor(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+        # Inside a skipped element: its tag, and how many of that tag are
+        # open. Only the same tag is counted, since <p>, <li> and <option>
+        # inside it may never be closed
+        self.skip_tag = None
+        self.skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if self.skip_depth:
+            if tag == self.skip_tag:
+                self.skip_depth += 1
+            return
+
+        if tag in SKIP_TAGS or self._is_chrome(attrs):
+            if tag not in VOID_TAGS:
+                self.skip_tag = tag
+                self.skip_depth = 1
+            return
+
+        if tag in HEADING_TAGS:
+            self.parts.append('\n\n' + '#' * HEADING_TAGS[tag] + ' ')
+        elif tag == 'li':
+            self.parts.append('\n- ')
+        elif tag in CELL_TAGS:
+            self.parts.append(' | ')
+        elif tag in BLOCK_TAGS:
+            self.parts.append('\n\n' if tag in ('p', 'table', 'blockquote', 'pre') else '\n')
+
+    def handle_startendtag(self, tag, attrs):
+        if not self.skip_depth and tag in ('br', 'hr'):
+            self.parts.append('\n')
+
+    def handle_endtag(self, tag):
+        if self.skip_depth:
+            if tag == self.skip_tag:
+                self.skip_depth -= 1
+            return
+
+        if tag in HEADING_TAGS or (tag in BLOCK_TAGS and tag != 'tr'):
+            self.parts.append('\n')
+
+    def handle_data(self, data):
+        if not self.skip_depth:
+            self.parts.append(data)
+
+    def _is_chrome(self, attrs):
+        for name, value in attrs:
+            if name == 'class' and value and SKIP_CLASSES.search(value):
+                return True
+            if name == 'aria-hidden' and value == 'true':
+                return True
+        return False
+
+    def text(self):
+        raw = ''.join(self.parts)
+        lines = []
+        for line in raw.split('\n'):
+            line = INLINE_SPACE_RE.sub(' ', line).strip()
+            if line.startswith('| '):
+                line = line[2:]
+            lines.append(line)
+        text = '\n'.join(lines)
+        return BLANK_LINES_RE.sub('\n\n', text).strip()
+
+
+def html_to_text(html):
+    # Structured plain text from an HTML fragment
+    if not html:
+        return ''
+    if '<' not in html and '&' not in html:
+        return html.strip()
+
+    parser = _TextExtractor()
+    parser.feed(html)
+    parser.close()
+    return parser.text()
+
+
+def flatten(text):
+    # Single-line version for short previews
+    return ' '.join(text.split())
+
+
+if __name__ == '__main__':
+    # Benchmark against the old regex strip on a large synthetic page
+    import time
+
+    section = (
+        '<h2>Resetting &amp; recovering your password</h2>'
+        '<div class="expand-control"><span class="aui-icon">toggle</span></div>'
+        '<p>Go to <a href="/login">the login page</a> and click <strong>Forgot&nbsp;Password</strong>.</p>'
+        '<ul><li>Check your email</li><li>Follow the link &rarr; set a new password</li></ul>'
+        '<table><tr><th>System</th><th>URL</th></tr><tr><td>myUMBC</td><td>my.umbc.edu</td></tr></table>'
+        '<script>var tracking = "noise";</script><style>.x { color: red; }</style>'
+    )
+    page = '<div class="wiki-content">' + section * 2000 + '</div>'
+    print(f"Page size: {len(page) / 1024:.0f} KB")
+
+    start = time.perf_counter()
+    old = TAG_RE.sub('', page)
+    old_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    new = html_to_text(page)
+    new_ms = (time.perf_counter() - start) * 1000
+
+    print(f"regex strip:  {old_ms:7.1f} ms, {len(old):8d} chars (entities and script text left in)")
+    print(f"html_to_text: {new_ms:7.1f} ms, {len(new):8d} chars")
+    print()
+    print(html_to_text(section))
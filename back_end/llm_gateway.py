@@ -0,0 +1,359 @@
+"""
+LLM gateway for the chat endpoints.
+
+Every call gets a deadline. Once enough calls have been seen, a call that
+is still running past the observed p95 gets a second, hedged request and
+whichever answers first wins. A failed attempt is retried once while time
+remains. When nothing comes back in time the gateway raises
+LLMUnavailable and the caller falls back to a retrieval-only answer.
+With an AdmissionController, every upstream request (hedges and retries
+included) also needs a slot from it first.
+"""
+
+import asyncio
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+_END = object()
+
+
+class LLMUnavailable(Exception):
+    # No answer within the deadline, or every attempt failed
+    pass
+
+
+class LatencyWindow:
+    # Sliding window of call durations for percentile estimates
+
+    def __init__(self, size=256, min_samples=20):
+        self.samples = deque(maxlen=size)
+        self.min_samples = min_samples
+        self.lock = threading.Lock()
+
+    def record(self, seconds):
+        with self.lock:
+            self.samples.append(seconds)
+
+    def percentile(self, q):
+        with self.lock:
+            if len(self.samples) < self.min_samples:
+                return None
+            ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class _GatewayBase:
+    def __init__(self, client, model, deadline=20.0, hedge=True, hedge_min_delay=1.0,
+                 hedge_budget=0.1, max_retries=1, admission=None):
+        self.client = client
+        # Optional admission.AdmissionController shared by all calls
+        self.admission = admission
+        self.model = model
+        self.deadline = deadline
+        self.hedge = hedge
+        # Never hedge sooner than this, however fast p95 looks
+        self.hedge_min_delay = hedge_min_delay
+        # At most this share of calls may send a hedge, so a slow provider
+        # does not get twice the traffic
+        self.hedge_budget = hedge_budget
+        self.max_retries = max_retries
+
+        self.latency = LatencyWindow()
+        self.first_token = LatencyWindow()
+        self.lock = threading.Lock()
+        self.calls = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.retries = 0
+        self.timeouts = 0
+        self.errors = 0
+
+    def messages(self, prompt):
+        return [{"role": "user", "content": prompt}]
+
+    def try_admit(self):
+        # Extra attempts (hedge, retry) only go out if there is spare capacity
+        return self.admission is None or self.admission.try_acquire()
+
+    def release(self):
+        if self.admission is not None:
+            self.admission.release()
+
+    def count(self, name):
+        with self.lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def hedge_delay(self):
+        # Seconds to wait before hedging this call, or None for no hedge
+        if not self.hedge:
+            return None
+        p95 = self.latency.percentile(0.95)
+        if p95 is None:
+            return None
+        with self.lock:
+            if self.hedges >= self.hedge_budget * self.calls:
+                return None
+        return max(self.hedge_min_delay, p95)
+
+    def stats(self):
+        p50 = self.latency.percentile(0.5)
+        p95 = self.latency.percentile(0.95)
+        ttft = self.first_token.percentile(0.95)
+        with self.lock:
+            return {
+                'calls': self.calls,
+                'hedges': self.hedges,
+                'hedge_wins': self.hedge_wins,
+                'retries': self.retries,
+                'timeouts': self.timeouts,
+                'errors': self.errors,
+                'p50_ms': round(p50 * 1000) if p50 is not None else None,
+                'p95_ms': round(p95 * 1000) if p95 is not None else None,
+                'first_token_p95_ms': round(ttft * 1000) if ttft is not None else None
+            }
+
+
+class LLMGateway(_GatewayBase):
+    """Blocking gateway around a groq.Groq client, for the Flask app.
+
+    Attempts run on a small thread pool so the caller can stop waiting at
+    the deadline; an abandoned attempt finishes in the background, bounded
+    by the client's own timeout.
+    """
+
+    def __init__(self, client, model, max_workers=32, **options):
+        super().__init__(client, model, **options)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='llm')
+
+    def _attempt(self, prompt, max_tokens):
+        # Runs holding an admission slot, which it gives back when done
+        start = time.monotonic()
+        try:
+            response = self.client.chat.completions.create(
+                model=self.model,
+                messages=self.messages(prompt),
+                max_tokens=max_tokens
+            )
+        finally:
+            self.release()
+        self.latency.record(time.monotonic() - start)
+        return response.choices[0].message.content
+
+    def complete(self, prompt, max_tokens=None, deadline=None):
+        deadline = deadline or self.deadline
+        deadline_at = time.monotonic() + deadline
+        self.count('calls')
+
+        # Wait for a slot within the same deadline; AdmissionRejected goes
+        # straight to the caller, it is never retried
+        if self.admission is not None:
+            self.admission.acquire(deadline_at)
+        primary = self.executor.submit(self._attempt, prompt, max_tokens)
+        pending = {primary}
+        delay = self.hedge_delay()
+        hedge_at = time.monotonic() + delay if delay is not None else None
+        retries_left = self.max_retries
+        last_error = None
+
+        while True:
+            now = time.monotonic()
+            if now >= deadline_at:
+                break
+            if not pending:
+                if retries_left <= 0 or not self.try_admit():
+                    break
+                # Every attempt so far failed; try once more while time remains
+                retries_left -= 1
+                self.count('retries')
+                pending.add(self.executor.submit(self._attempt, prompt, max_tokens))
+
+            wake = deadline_at if hedge_at is None else min(deadline_at, hedge_at)
+            done, pending = wait(pending, timeout=max(0.0, wake - now), return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    answer = future.result()
+                except Exception as e:
+                    last_error = e
+                    continue
+                if future is not primary and len(done) == 1:
+                    self.count('hedge_wins')
+                return answer
+
+            if hedge_at is not None and pending and time.monotonic() >= hedge_at:
+                hedge_at = None
+                if self.try_admit():
+                    self.count('hedges')
+                    pending.add(self.executor.submit(self._attempt, prompt, max_tokens))
+
+        if pending:
+            self.count('timeouts')
+            raise LLMUnavailable(f"no answer within {deadline:.1f}s")
+        self.count('errors')
+        raise LLMUnavailable(f"LLM call failed: {last_error}") from last_error
+
+    def stream(self, prompt, max_tokens=None, deadline=None):
+        # Yield tokens; raises LLMUnavailable when the first token (or any
+        # later gap) takes longer than the deadline. Streams are not hedged.
+        deadline = deadline or self.deadline
+        tokens = queue.Queue()
+        self.count('calls')
+        if self.admission is not None:
+            self.admission.acquire(time.monotonic() + deadline)
+
+        def pump():
+            start = time.monotonic()
+            first = True
+            try:
+                stream = self.client.chat.completions.create(
+                    model=self.model,
+                    messages=self.messages(prompt),
+                    max_tokens=max_tokens,
+                    stream=True
+                )
+                for chunk in stream:
+                    token = chunk.choices[0].delta.content
+                    if token:
+                        if first:
+                            self.first_token.record(time.monotonic() - start)
+                            first = False
+                        tokens.put(token)
+                self.latency.record(time.monotonic() - start)
+                tokens.put(_END)
+            except Exception as e:
+                tokens.put(e)
+            finally:
+                self.release()
+
+        self.executor.submit(pump)
+        while True:
+            try:
+                item = tokens.get(timeout=deadline)
+            except queue.Empty:
+                self.count('timeouts')
+                raise LLMUnavailable(f"no tokens within {deadline:.1f}s")
+            if item is _END:
+                return
+            if isinstance(item, Exception):
+                self.count('errors')
+                raise LLMUnavailable(f"LLM stream failed: {item}") from item
+            yield item
+
+
+class AsyncLLMGateway(_GatewayBase):
+    # Same policy around groq.AsyncGroq, for the Quart app
+
+    async def _attempt(self, prompt, max_tokens):
+        start = time.monotonic()
+        response = await self.client.chat.completions.create(
+            model=self.model,
+            messages=self.messages(prompt),
+            max_tokens=max_tokens
+        )
+        self.latency.record(time.monotonic() - start)
+        return response.choices[0].message.content
+
+    def launch(self, prompt, max_tokens):
+        # Start an attempt that holds an admission slot. The slot goes back
+        # when the task ends, even one cancelled before it ever ran
+        task = asyncio.ensure_future(self._attempt(prompt, max_tokens))
+        task.add_done_callback(lambda _: self.release())
+        return task
+
+    async def admit(self, deadline_at):
+        # Wait on the loop itself: no executor thread is parked, and a
+        # cancelled waiter leaves the queue without holding a slot
+        if self.admission is not None:
+            await self.admission.acquire_async(deadline_at)
+
+    async def complete(self, prompt, max_tokens=None, deadline=None):
+        deadline = deadline or self.deadline
+        # One deadline covers queueing for a slot and the call itself
+        deadline_at = time.monotonic() + deadline
+        self.count('calls')
+        await self.admit(deadline_at)
+
+        primary = self.launch(prompt, max_tokens)
+        pending = {primary}
+        delay = self.hedge_delay()
+        hedge_at = time.monotonic() + delay if delay is not None else None
+        retries_left = self.max_retries
+        last_error = None
+
+        try:
+            while True:
+                now = time.monotonic()
+                if now >= deadline_at:
+                    break
+                if not pending:
+                    if retries_left <= 0 or not self.try_admit():
+                        break
+                    retries_left -= 1
+                    self.count('retries')
+                    pending.add(self.launch(prompt, max_tokens))
+
+                wake = deadline_at if hedge_at is None else min(deadline_at, hedge_at)
+                done, pending = await asyncio.wait(pending, timeout=max(0.0, wake - now),
+                                                   return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is not None:
+                        last_error = task.exception()
+                        continue
+                    if task is not primary and len(done) == 1:
+                        self.count('hedge_wins')
+                    return task.result()
+
+                if hedge_at is not None and pending and time.monotonic() >= hedge_at:
+                    hedge_at = None
+                    if self.try_admit():
+                        self.count('hedges')
+                        pending.add(self.launch(prompt, max_tokens))
+        finally:
+            # Unlike threads, losing attempts can simply be cancelled
+            for task in pending:
+                task.cancel()
+
+        if pending:
+            self.count('timeouts')
+            raise LLMUnavailable(f"no answer within {deadline:.1f}s")
+        self.count('errors')
+        raise LLMUnavailable(f"LLM call failed: {last_error}") from last_error
+
+    async def stream(self, prompt, max_tokens=None, deadline=None):
+        deadline = deadline or self.deadline
+        self.count('calls')
+        await self.admit(time.monotonic() + deadline)
+        start = time.monotonic()
+        try:
+            stream = await asyncio.wait_for(self.client.chat.completions.create(
+                model=self.model,
+                messages=self.messages(prompt),
+                max_tokens=max_tokens,
+                stream=True
+            ), deadline)
+            chunks = stream.__aiter__()
+            first = True
+            while True:
+                try:
+                    chunk = await asyncio.wait_for(chunks.__anext__(), deadline)
+                except StopAsyncIteration:
+                    break
+                token = chunk.choices[0].delta.content
+                if token:
+                    if first:
+                        self.first_token.record(time.monotonic() - start)
+                        first = False
+                    yield token
+            self.latency.record(time.monotonic() - start)
+        except asyncio.TimeoutError:
+            self.count('timeouts')
+            raise LLMUnavailable(f"no tokens within {deadline:.1f}s")
+        except LLMUnavailable:
+            raise
+        except Exception as e:
+            self.count('errors')
+            raise LLMUnavailable(f"LLM stream failed: {e}") from e
+        finally:
+            self.release()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Concurrent /api/chat load test: Flask app.run server vs the ASGI mode.
+
+Starts the fake LLM from fake_llm.py, then for each server mode launches
+the back end in a subprocess pointed at it (GROQ_BASE_URL) and fires
+--requests chats with --concurrency clients. Every message is unique so
+the response cache never answers for the LLM.
+
+    python load_test.py --requests 400 --concurrency 200 --latency 2
+"""
+
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from fake_llm import FakeLLMServer
+
+SERVERS = {
+    # Same server the app uses under `python app.py`, minus the reloader
+    'flask': [sys.executable, '-c',
+              "import sys, app; app.app.run(port=int(sys.argv[1]), use_reloader=False)"],
+    'asgi': [sys.executable, '-m', 'uvicorn', 'asgi_app:application',
+             '--log-level', 'warning', '--port'],
+}
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def wait_for(url, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(url, timeout=1)
+            return True
+        except Exception:
+            time.sleep(0.2)
+    return False
+
+
+def post_chat(base_url, message):
+    req = urllib.request.Request(
+        f"{base_url}/api/chat",
+        data=json.dumps({'message': message}).encode('utf-8'),
+        headers={'Content-Type': 'application/json'}
+    )
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req, timeout=120) as response:
+            ok = response.status == 200
+            response.read()
+    except Exception:
+        ok = False
+    return ok, time.perf_counter() - start
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def run_mode(mode, llm_url, total, concurrency):
+    port = free_port()
+    env = dict(os.environ, GROQ_BASE_URL=llm_url, GROQ_API_KEY=os.getenv('GROQ_API_KEY', 'fake'))
+    proc = subprocess.Popen(SERVERS[mode] + [str(port)], env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        if not wait_for(f"{base_url}/api/health"):
+            print(f"{mode}: server did not start")
+            return None
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(
+                lambda i: post_chat(base_url, f"how do I reset my password {mode} {i}"),
+                range(total)
+            ))
+        elapsed = time.perf_counter() - start
+
+        latencies = [t for ok, t in results if ok]
+        return {
+            'mode': mode,
+            'requests': total,
+            'concurrency': concurrency,
+            'ok': len(latencies),
+            'errors': total - len(latencies),
+            'seconds': round(elapsed, 2),
+            'throughput_rps': round(len(latencies) / elapsed, 1),
+            'p50_ms': round(percentile(latencies, 50) * 1000),
+            'p95_ms': round(percentile(latencies, 95) * 1000),
+        }
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=400)
+    parser.add_argument('--concurrency', type=int, default=200)
+    parser.add_argument('--latency', type=float, default=2.0, help='fake LLM seconds per call')
+    parser.add_argument('--modes', default='flask,asgi')
+    args = parser.parse_args()
+
+    llm = FakeLLMServer(latency=args.latency).start()
+    print(f"Fake LLM at {llm.base_url} ({args.latency}s per call)")
+
+    for mode in args.modes.split(','):
+        result = run_mode(mode, llm.base_url, args.requests, args.concurrency)
+        if result:
+            print(json.dumps(result))
+
+    llm.shutdown()
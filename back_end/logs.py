@@ -0,0 +1,66 @@
+"""
+Leveled logging for the back end.
+
+Modules log through get_logger(__name__). setup_logging() is called once
+by the app with Config.LOG_LEVEL; until then only warnings and errors
+are shown. Per-request and per-row messages go through Sampled, which
+passes one in every LOG_SAMPLE_EVERY records of a kind to the log, so a
+busy hot path cannot flood it.
+"""
+
+import logging
+import threading
+
+LOG_FORMAT = '%(asctime)s %(levelname)s %(name)s: %(message)s'
+
+# Set by setup_logging; Sampled reads it on every call
+sample_every = 100
+
+
+def setup_logging(level='INFO', every=100):
+    global sample_every
+    sample_every = max(1, every)
+    root = logging.getLogger('faq')
+    if not root.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter(LOG_FORMAT))
+        root.addHandler(handler)
+        root.propagate = False
+    root.setLevel(level.upper())
+
+
+def get_logger(name):
+    return logging.getLogger('faq').getChild(name)
+
+
+class Sampled:
+    # Passes the 1st, (N+1)th, (2N+1)th... record per key to the logger
+
+    def __init__(self, logger, every=None):
+        self.logger = logger
+        self.every = every
+        self.counts = {}
+        self.lock = threading.Lock()
+
+    def log(self, level, key, msg, *args):
+        if not self.logger.isEnabledFor(level):
+            return
+        every = self.every or sample_every
+        with self.lock:
+            seen = self.counts.get(key, 0)
+            self.counts[key] = seen + 1
+        if seen % every:
+            return
+        if seen:
+            msg += ' (1 of %d)'
+            args += (every,)
+        self.logger.log(level, msg, *args)
+
+    def debug(self, key, msg, *args):
+        self.log(logging.DEBUG, key, msg, *args)
+
+    def info(self, key, msg, *args):
+        self.log(logging.INFO, key, msg, *args)
+
+    def warning(self, key, msg, *args):
+        self.log(logging.WARNING, key, msg, *args)
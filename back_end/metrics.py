@@ -0,0 +1,211 @@
+"""
+In-process metrics for the hot paths.
+
+`with metrics.span('retrieve'):` times a block into that stage's latency
+histogram (it also works as a decorator). Histograms have fixed
+cumulative buckets, so recording is one bisect and an increment, and
+p50/p95/p99 are read back by interpolating inside a bucket. render()
+writes the histograms, counters and registered stats in the Prometheus
+text format for /api/metrics.
+"""
+
+import bisect
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+# Seconds; from a cache hit up to a slow LLM answer
+STAGE_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+QUANTILES = (0.5, 0.95, 0.99)
+
+NAME_RE = re.compile(r'[^a-zA-Z0-9_]')
+
+
+class Histogram:
+    # Cumulative-bucket histogram (Prometheus style); not locked itself
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+    def quantile(self, q):
+        # Interpolate inside the bucket holding the q-th value, like
+        # Prometheus histogram_quantile; None before any observation
+        if not self.count:
+            return None
+        rank = q * self.count
+        running = 0
+        lower = 0.0
+        for bound, count in zip(self.buckets, self.counts):
+            if count and running + count >= rank:
+                return lower + (bound - lower) * (rank - running) / count
+            running += count
+            lower = bound
+        # Past the last bound; that bound is all we can say
+        return self.buckets[-1]
+
+    def snapshot(self):
+        cumulative = []
+        running = 0
+        for bound, count in zip(self.buckets + ('+Inf',), self.counts):
+            running += count
+            cumulative.append((bound, running))
+        return {'buckets': cumulative, 'sum': round(self.total, 3), 'count': self.count}
+
+
+def metric_name(*parts):
+    return NAME_RE.sub('_', '_'.join(str(p) for p in parts if p))
+
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    inner = ','.join(f'{k}="{str(v)}"' for k, v in labels)
+    return '{' + inner + '}'
+
+
+def is_histogram(value):
+    # A Histogram.snapshot() nested in a stats dict
+    return isinstance(value, dict) and set(value) == {'buckets', 'sum', 'count'}
+
+
+def flatten(stats, prefix=''):
+    # Numeric leaves of a nested stats dict as (name, value) pairs;
+    # histogram snapshots are passed through whole
+    for key, value in stats.items():
+        name = metric_name(prefix, key)
+        if is_histogram(value):
+            yield name, value
+        elif isinstance(value, dict):
+            yield from flatten(value, name)
+        elif isinstance(value, bool):
+            yield name, int(value)
+        elif isinstance(value, (int, float)):
+            yield name, value
+
+
+class Metrics:
+    def __init__(self, namespace='faq', buckets=STAGE_BUCKETS):
+        self.namespace = namespace
+        self.buckets = buckets
+        self.lock = threading.Lock()
+        # stage -> Histogram of seconds
+        self.stages = {}
+        # (name, sorted label pairs) -> running total
+        self.counters = {}
+        # name -> function returning a stats dict, exported as gauges
+        # and histograms
+        self.collectors = {}
+
+    def observe(self, stage, seconds):
+        with self.lock:
+            histogram = self.stages.get(stage)
+            if histogram is None:
+                histogram = self.stages[stage] = Histogram(self.buckets)
+            histogram.observe(seconds)
+
+    @contextmanager
+    def span(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        except BaseException as e:
+            # GeneratorExit is a client hanging up, not a failure
+            if not isinstance(e, GeneratorExit):
+                self.inc('stage_errors', stage=stage)
+            raise
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def reset(self):
+        # Drop recorded timings and counters, e.g. between benchmark runs
+        with self.lock:
+            self.stages.clear()
+            self.counters.clear()
+
+    def register(self, name, collect):
+        # collect() is called on every scrape, e.g. admission.stats
+        self.collectors[name] = collect
+
+    def summary(self):
+        # Per-stage count and percentiles in ms, for /api/health
+        with self.lock:
+            result = {}
+            for stage, histogram in sorted(self.stages.items()):
+                entry = {'count': histogram.count}
+                for q in QUANTILES:
+                    value = histogram.quantile(q)
+                    entry[f'p{round(q * 100)}_ms'] = round(value * 1000, 1) if value is not None else None
+                result[stage] = entry
+            return result
+
+    def render(self):
+        # Prometheus text exposition format, version 0.0.4
+        ns = self.namespace
+        lines = []
+        with self.lock:
+            stages = sorted((stage, h.snapshot(), [(q, h.quantile(q)) for q in QUANTILES])
+                            for stage, h in self.stages.items())
+            counters = sorted(self.counters.items())
+
+        name = f'{ns}_stage_duration_seconds'
+        lines.append(f'# HELP {name} Time spent in each request stage.')
+        lines.append(f'# TYPE {name} histogram')
+        for stage, snapshot, _ in stages:
+            for bound, count in snapshot['buckets']:
+                lines.append(f'{name}_bucket{format_labels([("stage", stage), ("le", bound)])} {count}')
+            lines.append(f'{name}_sum{format_labels([("stage", stage)])} {snapshot["sum"]}')
+            lines.append(f'{name}_count{format_labels([("stage", stage)])} {snapshot["count"]}')
+
+        # The same percentiles /api/health shows, for dashboards without
+        # histogram_quantile
+        name = f'{ns}_stage_quantile_seconds'
+        lines.append(f'# HELP {name} In-process p50/p95/p99 estimate per stage.')
+        lines.append(f'# TYPE {name} gauge')
+        for stage, _, quantiles in stages:
+            for q, value in quantiles:
+                if value is not None:
+                    lines.append(f'{name}{format_labels([("stage", stage), ("quantile", q)])} {value:.6f}')
+
+        seen = set()
+        for (counter, labels), value in counters:
+            name = metric_name(ns, counter, 'total')
+            if name not in seen:
+                seen.add(name)
+                lines.append(f'# TYPE {name} counter')
+            lines.append(f'{name}{format_labels(labels)} {value}')
+
+        for source, collect in sorted(self.collectors.items()):
+            try:
+                stats = collect()
+            except Exception:
+                continue
+            for key, value in flatten(stats, metric_name(ns, source)):
+                if is_histogram(value):
+                    lines.append(f'# TYPE {key} histogram')
+                    for bound, count in value['buckets']:
+                        lines.append(f'{key}_bucket{format_labels([("le", bound)])} {count}')
+                    lines.append(f'{key}_sum {value["sum"]}')
+                    lines.append(f'{key}_count {value["count"]}')
+                else:
+                    lines.append(f'# TYPE {key} gauge')
+                    lines.append(f'{key} {value}')
+
+        return '\n'.join(lines) + '\n'
+
+
+# Shared by every module of the process
+metrics = Metrics()
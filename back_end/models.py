@@ -1,23 +1,25 @@
 import sqlite3
 from datetime import datetime
 
-def init_db():
-    conn = sqlite3.connect('faq_chatbot.db')
-    c = conn.cursor()
+# Schema migrations, applied in order at startup. PRAGMA user_version
+# holds the last one applied, so an up-to-date database only costs one
+# PRAGMA read. Databases created before the runner existed start at 0
+# and may already have some of these objects, so every step is written
+# to be safe to re-run.
 
+def migrate_base_tables(c):
     # Main FAQ table (admin + Atlassian)
     c.execute("""
     CREATE TABLE IF NOT EXISTS faqs (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    article_id TEXT UNIQUE,
-    title TEXT NOT NULL,
-    content TEXT NOT NULL,
-    url TEXT,
-    category TEXT,
-    last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-)
-
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        article_id TEXT UNIQUE,
+        title TEXT NOT NULL,
+        content TEXT NOT NULL,
+        url TEXT,
+        category TEXT,
+        last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
     """)
 
     # Chat history table
@@ -31,8 +33,242 @@ def init_db():
     )
     """)
 
-    conn.commit()
-    conn.close()
+def migrate_faq_articles(c):
+    # The first schema called the FAQ table faq_articles; carry its rows over
+    c.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='faq_articles'")
+    if c.fetchone() is None:
+        return
+    c.execute("""
+    INSERT OR IGNORE INTO faqs (article_id, title, content, url, category, last_updated, created_at)
+    SELECT article_id, title, content, url, category, last_updated, created_at FROM faq_articles
+    """)
+    c.execute("DROP TABLE faq_articles")
+
+def migrate_sync_state(c):
+    # Key/value state for background jobs, e.g. the Confluence sync watermark
+    c.execute("""
+    CREATE TABLE IF NOT EXISTS sync_state (
+        key TEXT PRIMARY KEY,
+        value TEXT
+    )
+    """)
+
+    # Confluence version number, so a resync can skip unchanged pages
+    columns = [row[1] for row in c.execute("PRAGMA table_info(faqs)")]
+    if 'version' not in columns:
+        c.execute("ALTER TABLE faqs ADD COLUMN version INTEGER")
+
+def migrate_aux_tables(c):
+    # Cross-worker single-flight leases for identical in-flight LLM calls
+    c.execute("""
+    CREATE TABLE IF NOT EXISTS llm_flights (
+        key TEXT PRIMARY KEY,
+        owner TEXT NOT NULL,
+        expires_at REAL NOT NULL,
+        answer TEXT
+    )
+    """)
+
+    # Overlapping passages of each FAQ, rebuilt whenever the article changes
+    c.execute("""
+    CREATE TABLE IF NOT EXISTS faq_chunks (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        article_id TEXT NOT NULL,
+        chunk_index INTEGER NOT NULL,
+        content TEXT NOT NULL,
+        token_count INTEGER,
+        UNIQUE (article_id, chunk_index)
+    )
+    """)
+    c.execute("""
+    CREATE TRIGGER IF NOT EXISTS faqs_chunks_ad AFTER DELETE ON faqs BEGIN
+        DELETE FROM faq_chunks WHERE article_id = old.article_id;
+    END
+    """)
+
+def migrate_indexes(c):
+    # Category filter and keyset pagination for GET /api/faqs
+    c.execute("CREATE INDEX IF NOT EXISTS idx_faqs_category ON faqs(category, id)")
+    # "Recently updated" views and incremental jobs keyed on last_updated
+    c.execute("CREATE INDEX IF NOT EXISTS idx_faqs_last_updated ON faqs(last_updated)")
+    # One session's conversation, in order
+    c.execute("CREATE INDEX IF NOT EXISTS idx_chat_history_session ON chat_history(session_id, timestamp)")
+    # Time-range reports and cleanup over all chats
+    c.execute("CREATE INDEX IF NOT EXISTS idx_chat_history_timestamp ON chat_history(timestamp)")
+
+def migrate_table_versions(c):
+    # Bumped by triggers on every faqs write; the ETag of GET /api/faqs
+    c.execute("""
+    CREATE TABLE IF NOT EXISTS table_versions (
+        name TEXT PRIMARY KEY,
+        version INTEGER NOT NULL DEFAULT 0
+    )
+    """)
+    c.execute("INSERT OR IGNORE INTO table_versions (name, version) VALUES ('faqs', 0)")
+    for event in ('INSERT', 'UPDATE', 'DELETE'):
+        c.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS faqs_version_{event.lower()} AFTER {event} ON faqs BEGIN
+            UPDATE table_versions SET version = version + 1 WHERE name = 'faqs';
+        END
+        """)
+
+def init_fts(c):
+    # Full-text index over faqs title/content, kept in sync by triggers
+    c.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='faqs_fts'")
+    exists = c.fetchone() is not None
+
+    try:
+        c.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS faqs_fts USING fts5(
+            title,
+            content,
+            content='faqs',
+            content_rowid='id',
+            tokenize='porter unicode61'
+        )
+        """)
+    except sqlite3.OperationalError as e:
+        # SQLite built without FTS5, search_articles falls back to LIKE
+        print(f"FTS5 not available: {e}")
+        return
+
+    c.execute("""
+    CREATE TRIGGER IF NOT EXISTS faqs_ai AFTER INSERT ON faqs BEGIN
+        INSERT INTO faqs_fts(rowid, title, content)
+        VALUES (new.id, new.title, new.content);
+    END
+    """)
+    c.execute("""
+    CREATE TRIGGER IF NOT EXISTS faqs_ad AFTER DELETE ON faqs BEGIN
+        INSERT INTO faqs_fts(faqs_fts, rowid, title, content)
+        VALUES ('delete', old.id, old.title, old.content);
+    END
+    """)
+    c.execute("""
+    CREATE TRIGGER IF NOT EXISTS faqs_au AFTER UPDATE ON faqs BEGIN
+        INSERT INTO faqs_fts(faqs_fts, rowid, title, content)
+        VALUES ('delete', old.id, old.title, old.content);
+        INSERT INTO faqs_fts(rowid, title, content)
+        VALUES (new.id, new.title, new.content);
+    END
+    """)
+
+    # Index rows that were already in faqs before the FTS table existed
+    if not exists:
+        c.execute("INSERT INTO faqs_fts(faqs_fts) VALUES ('rebuild')")
+
+def migrate_answer_index(c):
+    # Pre-generated answers for frequent question clusters (answer_index.py)
+    c.execute("""
+    CREATE TABLE IF NOT EXISTS answer_index (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        centroid TEXT NOT NULL,
+        representative TEXT NOT NULL,
+        article_id TEXT NOT NULL,
+        article_updated TEXT,
+        answer TEXT NOT NULL,
+        suggestions TEXT,
+        support INTEGER NOT NULL,
+        approved INTEGER NOT NULL DEFAULT 0,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """)
+    c.execute("CREATE INDEX IF NOT EXISTS idx_answer_index_article ON answer_index(article_id)")
+
+    # An answer is only good for the version of the FAQ it was written from
+    c.execute("""
+    CREATE TRIGGER IF NOT EXISTS faqs_answer_index_au AFTER UPDATE ON faqs
+    WHEN old.last_updated IS NOT new.last_updated
+        OR old.title IS NOT new.title
+        OR old.content IS NOT new.content
+    BEGIN
+        DELETE FROM answer_index WHERE article_id = old.article_id;
+    END
+    """)
+    c.execute("""
+    CREATE TRIGGER IF NOT EXISTS faqs_answer_index_ad AFTER DELETE ON faqs BEGIN
+        DELETE FROM answer_index WHERE article_id = old.article_id;
+    END
+    """)
+
+    # Servers reload their copy when this counter moves
+    c.execute("INSERT OR IGNORE INTO table_versions (name, version) VALUES ('answer_index', 0)")
+    for event in ('INSERT', 'UPDATE', 'DELETE'):
+        c.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS answer_index_version_{event.lower()} AFTER {event} ON answer_index BEGIN
+            UPDATE table_versions SET version = version + 1 WHERE name = 'answer_index';
+        END
+        """)
+
+def migrate_faq_changes(c):
+    # Which FAQ each faqs write touched, in order. Every worker keeps its
+    # own in-memory index, so the others replay this to catch up
+    c.execute("""
+    CREATE TABLE IF NOT EXISTS faq_changes (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        article_id TEXT NOT NULL
+    )
+    """)
+    for event, row in (('INSERT', 'new'), ('UPDATE', 'new'), ('DELETE', 'old')):
+        c.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS faqs_changes_{event.lower()} AFTER {event} ON faqs BEGIN
+            INSERT INTO faq_changes (article_id) VALUES ({row}.article_id);
+        END
+        """)
+    # An update that renames the row leaves the old id behind too
+    c.execute("""
+    CREATE TRIGGER IF NOT EXISTS faqs_changes_rename AFTER UPDATE ON faqs
+    WHEN old.article_id IS NOT new.article_id
+    BEGIN
+        INSERT INTO faq_changes (article_id) VALUES (old.article_id);
+    END
+    """)
+
+# (user_version, name, step); only ever append to this list
+MIGRATIONS = [
+    (1, 'base tables', migrate_base_tables),
+    (2, 'faq_articles -> faqs', migrate_faq_articles),
+    (3, 'sync state', migrate_sync_state),
+    (4, 'chunks and flights', migrate_aux_tables),
+    (5, 'full-text index', init_fts),
+    (6, 'indexes', migrate_indexes),
+    (7, 'table versions', migrate_table_versions),
+    (8, 'answer index', migrate_answer_index),
+    (9, 'faq changes', migrate_faq_changes),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+def init_db(db_path='faq_chatbot.db'):
+    # Autocommit mode so each migration controls its own transaction
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    c = conn.cursor()
+    try:
+        current = c.execute("PRAGMA user_version").fetchone()[0]
+        if current >= SCHEMA_VERSION:
+            return current
+
+        for version, name, step in MIGRATIONS:
+            # IMMEDIATE takes the write lock up front, so workers starting
+            # together run each migration once; re-check under the lock
+            c.execute("BEGIN IMMEDIATE")
+            try:
+                if c.execute("PRAGMA user_version").fetchone()[0] >= version:
+                    c.execute("ROLLBACK")
+                    continue
+                step(c)
+                c.execute(f"PRAGMA user_version = {version}")
+                c.execute("COMMIT")
+            except Exception:
+                c.execute("ROLLBACK")
+                raise
+            print(f"🗄️ Applied migration {version}: {name}")
+
+        # Refresh planner statistics for the new indexes
+        c.execute("PRAGMA optimize")
+        return SCHEMA_VERSION
+    finally:
+        conn.close()
 
 if __name__ == '__main__':
     init_db()
@@ -0,0 +1,246 @@
+"""
+Prompt assembly for /api/chat under a token budget.
+
+Candidate passages from the retrieved articles are ranked against the
+question, near-duplicates are dropped, and the best ones are packed into
+whatever room is left after the fixed prompt text and the tokens reserved
+for the answer. Token counts come from a cheap local estimate, so no
+tokenizer download is needed.
+"""
+
+import math
+import re
+import threading
+import time
+from functools import lru_cache
+
+from database import TOKEN_RE
+from search_index import tokenize
+from query_processing import stem
+from logs import get_logger
+from metrics import metrics
+
+log = get_logger('prompt_builder')
+
+PROMPT_TEMPLATE = """
+        You are a UMBC CSEE helpdesk assistant. Use the following context to answer:
+
+        CONTEXT:
+        {context}
+
+        USER QUESTION:
+        {user_message}
+
+        Provide a clear, helpful answer. If context doesn't contain the answer, say so.
+        """
+
+NO_CONTEXT = "No relevant articles found in the knowledge base."
+
+PIECE_RE = re.compile(r'[^\W\d_]+|\d+|[^\w\s]|_')
+
+# Range of repeated words looked for between adjacent passages
+MIN_OVERLAP_WORDS = 5
+MAX_OVERLAP_WORDS = 64
+
+
+@lru_cache(maxsize=8192)
+def estimate_tokens(text):
+    # BPE-style estimate: a word is one token plus one per 6 letters past
+    # the first, numbers split into 3-digit groups, punctuation is 1 each.
+    # Cached because the same passages come back for popular questions.
+    if not text:
+        return 0
+    total = 0
+    for piece in PIECE_RE.findall(text):
+        if piece[0].isdigit():
+            total += (len(piece) + 2) // 3
+        elif piece[0].isalpha():
+            total += 1 + (len(piece) - 1) // 6
+        else:
+            total += 1
+    return total
+
+
+def query_terms(query):
+    # Same stemmed terms the search index (and its idf) uses
+    return set(tokenize(query))
+
+
+@lru_cache(maxsize=4096)
+def term_counts(text):
+    # Passages are immutable, so tokenizing one is paid once per process
+    counts = {}
+    for token in TOKEN_RE.findall(text.lower()):
+        token = stem(token)
+        counts[token] = counts.get(token, 0) + 1
+    return counts
+
+
+def score_passage(terms, text, idf):
+    # Sum of idf over query terms present, damped by passage length
+    counts = term_counts(text)
+    score = sum((1.0 + math.log(counts[term])) * idf(term) for term in terms if term in counts)
+    if not score:
+        return 0.0
+    return score / math.sqrt(estimate_tokens(text) / 50.0 + 1.0)
+
+
+@lru_cache(maxsize=4096)
+def shingles(text):
+    # Word trigrams, so passages that merely share vocabulary are not duplicates
+    words = TOKEN_RE.findall(text.lower())
+    return frozenset(' '.join(words[i:i + 3]) for i in range(max(1, len(words) - 2)))
+
+
+def merge_overlap(previous, text):
+    # Append text to previous, skipping the words the two passages share
+    # (chunk_text repeats the tail of a passage at the start of the next)
+    prev_words = previous.split()
+    words = text.split()
+    # The next passage starts with a short "Title - heading:" prefix
+    for start in range(min(12, len(words))):
+        for size in range(min(len(prev_words), len(words) - start, MAX_OVERLAP_WORDS), MIN_OVERLAP_WORDS - 1, -1):
+            if prev_words[-size:] == words[start:start + size]:
+                return previous + ' ' + ' '.join(words[start + size:]) if start + size < len(words) else previous
+    return None
+
+
+class PromptBuilder:
+    def __init__(self, context_budget=1500, max_prompt_tokens=8192, answer_tokens=1024, duplicate_threshold=0.8):
+        self.context_budget = context_budget
+        self.max_prompt_tokens = max_prompt_tokens
+        # Room kept free for the completion, also sent as max_tokens
+        self.answer_tokens = answer_tokens
+        # Share of a passage's word trigrams already in the prompt that makes it a duplicate
+        self.duplicate_threshold = duplicate_threshold
+
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.prompt_tokens = 0
+        self.max_seen = 0
+        self.assembly_ms = 0.0
+
+    def render(self, user_message, context):
+        return PROMPT_TEMPLATE.format(context=context, user_message=user_message)
+
+    def budget(self, user_message):
+        # Context tokens that fit next to the fixed text and the answer
+        fixed = estimate_tokens(self.render(user_message, ''))
+        room = self.max_prompt_tokens - self.answer_tokens - fixed
+        return max(0, min(self.context_budget, room)), fixed
+
+    def rank(self, user_message, articles, chunks_by_article, idf=None):
+        terms = query_terms(user_message)
+        idf = idf or (lambda term: 1.0)
+
+        candidates = []
+        for rank, article in enumerate(articles):
+            passages = chunks_by_article.get(article.get('article_id')) or [
+                f"{article['title']}: {article['content']}"
+            ]
+            for i, text in enumerate(passages):
+                # Earlier articles and earlier passages win ties
+                score = score_passage(terms, text, idf) - rank * 1e-3 - i * 1e-6
+                candidates.append((score, rank, i, text))
+
+        candidates.sort(reverse=True)
+        return candidates
+
+    def pack(self, candidates, budget):
+        # Greedy fill: best passage of each article first, then the rest
+        selected = []
+        taken = set()
+        seen_grams = []
+        seen_articles = set()
+        used = 0
+        duplicates = 0
+
+        for first_pass in (True, False):
+            for candidate in candidates:
+                score, rank, i, text = candidate
+                if (rank, i) in taken or (first_pass and rank in seen_articles):
+                    continue
+                cost = estimate_tokens(text)
+                if used + cost > budget:
+                    continue
+
+                grams = shingles(text)
+                if any(len(grams & other) >= self.duplicate_threshold * len(grams) for other in seen_grams):
+                    duplicates += 1
+                    taken.add((rank, i))
+                    continue
+
+                selected.append(candidate)
+                taken.add((rank, i))
+                seen_grams.append(grams)
+                seen_articles.add(rank)
+                used += cost
+
+        return selected, duplicates
+
+    def build_context(self, user_message, articles, chunks_by_article, idf=None, query=None):
+        """Context block for the prompt plus per-request token stats.
+
+        Passages are ranked against `query` (the spell-corrected search
+        text) when given; the budget is always for the message as sent.
+        """
+        start = time.perf_counter()
+        budget, fixed = self.budget(user_message)
+
+        passages = []
+        duplicates = 0
+        if articles:
+            candidates = self.rank(query or user_message, articles, chunks_by_article, idf)
+            selected, duplicates = self.pack(candidates, budget)
+
+            # Document order within each article; stitch neighbouring passages
+            selected.sort(key=lambda c: (c[1], c[2]))
+            last = None
+            for _, rank, i, text in selected:
+                merged = merge_overlap(passages[-1], text) if last == (rank, i - 1) else None
+                if merged is not None:
+                    passages[-1] = merged
+                else:
+                    passages.append(text)
+                last = (rank, i)
+
+        context = "\n\n".join(passages) if passages else NO_CONTEXT
+        context_tokens = estimate_tokens(context)
+        stats = {
+            'prompt_tokens': fixed + context_tokens,
+            'context_tokens': context_tokens,
+            'budget': budget,
+            'passages': len(passages),
+            'duplicates': duplicates,
+            'assembly_ms': round((time.perf_counter() - start) * 1000, 3)
+        }
+        self.record(stats)
+        return context, stats
+
+    def record(self, stats):
+        with self.lock:
+            self.requests += 1
+            self.prompt_tokens += stats['prompt_tokens']
+            self.max_seen = max(self.max_seen, stats['prompt_tokens'])
+            self.assembly_ms += stats['assembly_ms']
+
+        # Totals as counters, so a dashboard can chart tokens per prompt
+        metrics.inc('prompt_tokens', stats['prompt_tokens'])
+        metrics.inc('context_tokens', stats['context_tokens'])
+        # Every request, so per-request token counts can be read off the log
+        log.info("Prompt ~%d tokens (%d/%d context, %d passages, %d duplicates dropped, %.2f ms)",
+                 stats['prompt_tokens'], stats['context_tokens'], stats['budget'], stats['passages'],
+                 stats['duplicates'], stats['assembly_ms'])
+
+    def stats(self):
+        with self.lock:
+            requests = self.requests or 1
+            cache = estimate_tokens.cache_info()
+            return {
+                'requests': self.requests,
+                'avg_prompt_tokens': round(self.prompt_tokens / requests, 1),
+                'max_prompt_tokens': self.max_seen,
+                'avg_assembly_ms': round(self.assembly_ms / requests, 3),
+                'estimate_cache_hits': cache.hits,
+                'estimate_cache_misses': cache.misses
+            }
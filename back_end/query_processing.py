@@ -0,0 +1,241 @@
+"""
+Query preprocessing: stemming and spelling correction against the KB.
+
+stem() is the conservative part of the Porter stemmer (plurals, -ed and
+-ing, y -> i, final e), shared by the search index, the classifier and
+passage ranking so "passwords", "password" and "printing"/"print" meet.
+
+SpellCorrector is SymSpell's symmetric delete scheme. The dictionary is
+every word of the FAQ titles and bodies with its frequency; for each
+word we store its deletes, the strings left after removing up to
+max_distance characters from its first prefix_length characters. Two
+words within edit distance d share a delete, so a misspelling is
+corrected by generating its own deletes and looking each one up, rather
+than by comparing it with the whole vocabulary. The few candidates found
+are confirmed with a bounded Damerau-Levenshtein distance.
+"""
+
+import threading
+from collections import Counter
+from functools import lru_cache
+
+from database import TOKEN_RE
+
+VOWELS = frozenset('aeiou')
+
+# Edits allowed per word, and how much of a long word the deletes cover
+MAX_DISTANCE = 2
+PREFIX_LENGTH = 7
+# Shorter words are left alone: "vpm" is as likely "vpn" as "pm"
+MIN_WORD_LENGTH = 4
+# Words up to this length only get one edit
+SHORT_WORD_LENGTH = 5
+
+
+def is_consonant(word, i):
+    if word[i] in VOWELS:
+        return False
+    if word[i] == 'y':
+        return i == 0 or not is_consonant(word, i - 1)
+    return True
+
+
+def measure(word):
+    # Porter's m: the number of vowel-consonant sequences
+    m = 0
+    previous_vowel = False
+    for i in range(len(word)):
+        consonant = is_consonant(word, i)
+        if consonant and previous_vowel:
+            m += 1
+        previous_vowel = not consonant
+    return m
+
+
+def has_vowel(word):
+    return any(not is_consonant(word, i) for i in range(len(word)))
+
+
+def ends_cvc(word):
+    # consonant-vowel-consonant, the last not w, x or y ("hop", not "snow")
+    return (len(word) >= 3 and is_consonant(word, len(word) - 3)
+            and not is_consonant(word, len(word) - 2) and is_consonant(word, len(word) - 1)
+            and word[-1] not in 'wxy')
+
+
+@lru_cache(maxsize=65536)
+def stem(word):
+    # Porter steps 1a, 1b, 1c and 5a
+    if len(word) <= 2 or not word.isalpha():
+        return word
+
+    if word.endswith('sses') or word.endswith('ies'):
+        word = word[:-2]
+    elif word.endswith('s') and not word.endswith('ss'):
+        word = word[:-1]
+
+    if word.endswith('eed'):
+        if measure(word[:-3]) > 0:
+            word = word[:-1]
+    else:
+        for suffix in ('ed', 'ing'):
+            if word.endswith(suffix) and has_vowel(word[:-len(suffix)]):
+                word = word[:-len(suffix)]
+                if word.endswith(('at', 'bl', 'iz')):
+                    word += 'e'
+                elif len(word) >= 2 and word[-1] == word[-2] and is_consonant(word, len(word) - 1) \
+                        and word[-1] not in 'lsz':
+                    word = word[:-1]
+                elif measure(word) == 1 and ends_cvc(word):
+                    word += 'e'
+                break
+
+    if word.endswith('y') and has_vowel(word[:-1]):
+        word = word[:-1] + 'i'
+
+    if word.endswith('e'):
+        m = measure(word[:-1])
+        if m > 1 or (m == 1 and not ends_cvc(word[:-1])):
+            word = word[:-1]
+    return word
+
+
+def deletes(word, max_distance):
+    # Every string left after deleting up to max_distance characters
+    found = {word}
+    frontier = [word]
+    for _ in range(max_distance):
+        following = []
+        for current in frontier:
+            for i in range(len(current)):
+                shorter = current[:i] + current[i + 1:]
+                if shorter not in found:
+                    found.add(shorter)
+                    following.append(shorter)
+        frontier = following
+    return found
+
+
+def edit_distance(a, b, limit):
+    # Optimal string alignment distance, or limit + 1 once it is exceeded
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    # Typos touch a character or two; the shared ends cost nothing
+    start = 0
+    while start < len(a) and start < len(b) and a[start] == b[start]:
+        start += 1
+    end = 0
+    while end < len(a) - start and end < len(b) - start and a[-1 - end] == b[-1 - end]:
+        end += 1
+    a = a[start:len(a) - end]
+    b = b[start:len(b) - end]
+    if not a or not b:
+        return max(len(a), len(b))
+
+    # Only cells within `limit` of the diagonal can stay under the limit
+    over = limit + 1
+    previous2 = None
+    previous = [j if j <= limit else over for j in range(len(b) + 1)]
+    for i in range(1, len(a) + 1):
+        current = [over] * (len(b) + 1)
+        if i <= limit:
+            current[0] = i
+        row_min = current[0]
+        char = a[i - 1]
+        for j in range(max(1, i - limit), min(len(b), i + limit) + 1):
+            value = previous[j - 1] + (char != b[j - 1])
+            if previous[j] + 1 < value:
+                value = previous[j] + 1
+            if current[j - 1] + 1 < value:
+                value = current[j - 1] + 1
+            if j > 1 and i > 1 and char == b[j - 2] and a[i - 2] == b[j - 1] and previous2[j - 2] + 1 < value:
+                value = previous2[j - 2] + 1
+            current[j] = value
+            if value < row_min:
+                row_min = value
+        if row_min > limit:
+            return over
+        previous2, previous = previous, current
+    return min(previous[-1], over)
+
+
+class SpellCorrector:
+    def __init__(self, max_distance=MAX_DISTANCE, prefix_length=PREFIX_LENGTH):
+        self.max_distance = max_distance
+        self.prefix_length = prefix_length
+        self.lock = threading.RLock()
+        # word -> occurrences in the KB; words keep their key at 0 once
+        # seen, so their deletes are only ever generated once
+        self.frequencies = Counter()
+        # delete -> words it was made from
+        self.deletes = {}
+        # article_id -> ((word, count), ...), to subtract an FAQ later
+        self.documents = {}
+
+    def load(self, rows):
+        # (article_id, title, content) rows
+        with self.lock:
+            for article_id, title, content in rows:
+                self.add_faq(article_id, title, content)
+
+    def add_faq(self, article_id, title, content):
+        # Count one FAQ's words, replacing its previous version
+        words = Counter(TOKEN_RE.findall(f"{title or ''} {content or ''}".lower()))
+        with self.lock:
+            self.remove(article_id)
+            for word, count in words.items():
+                if word not in self.frequencies and len(word) >= 3 and word.isalpha():
+                    for delete in deletes(word[:self.prefix_length], self.max_distance):
+                        self.deletes.setdefault(delete, []).append(word)
+                self.frequencies[word] += count
+            self.documents[article_id] = tuple(words.items())
+
+    def remove(self, article_id):
+        with self.lock:
+            words = self.documents.pop(article_id, None)
+            if words is None:
+                return False
+            for word, count in words:
+                self.frequencies[word] -= count
+            return True
+
+    def correct_word(self, word):
+        # The most frequent KB word closest to `word`, or word itself
+        if len(word) < MIN_WORD_LENGTH or not word.isalpha() or self.frequencies.get(word):
+            return word
+        max_distance = 1 if len(word) <= SHORT_WORD_LENGTH else self.max_distance
+
+        best = None
+        with self.lock:
+            candidates = set()
+            for delete in deletes(word[:self.prefix_length], max_distance):
+                candidates.update(self.deletes.get(delete, ()))
+            limit = max_distance
+            for candidate in candidates:
+                frequency = self.frequencies.get(candidate, 0)
+                if not frequency:
+                    continue
+                # Nothing further than the best match so far can win
+                distance = edit_distance(word, candidate, limit)
+                if distance > limit:
+                    continue
+                limit = distance
+                key = (distance, -frequency, candidate)
+                if best is None or key < best:
+                    best = key
+        return best[2] if best else word
+
+    def correct(self, text):
+        # (lowercased text with known-word fixes, [(typo, fix), ...])
+        words = TOKEN_RE.findall((text or '').lower())
+        corrected = [self.correct_word(word) for word in words]
+        changes = [(a, b) for a, b in zip(words, corrected) if a != b]
+        return ' '.join(corrected), changes
+
+    def stats(self):
+        with self.lock:
+            return {
+                'words': sum(1 for count in self.frequencies.values() if count > 0),
+                'deletes': len(self.deletes),
+                'articles': len(self.documents)
+            }
@@ -0,0 +1,128 @@
+import threading
+import time
+from collections import OrderedDict
+
+from database import TOKEN_RE, STOPWORDS
+
+
+def normalize_question(text):
+    # "How do I reset my password?" -> "reset password"
+    return ' '.join(t for t in TOKEN_RE.findall((text or '').lower()) if t not in STOPWORDS)
+
+
+def article_signature(articles):
+    # Which articles (and which version of each) an answer was built from
+    return tuple((a.get('article_id'), a.get('last_updated')) for a in articles)
+
+
+def jaccard(a, b):
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class ResponseCache:
+    """LRU + TTL cache of LLM answers for /api/chat.
+
+    Keys combine the normalized question with the id and last_updated of
+    every retrieved article, so editing or re-syncing an FAQ changes the
+    key and stale answers simply stop being hit and age out.
+    """
+
+    def __init__(self, max_entries=1024, ttl_seconds=3600, similarity_threshold=0.0):
+        self.max_entries = max_entries
+        self.ttl = ttl_seconds
+        # 0 disables near-duplicate matching
+        self.similarity_threshold = similarity_threshold
+        self.lock = threading.Lock()
+        # (question, signature) -> (expires_at, answer)
+        self.entries = OrderedDict()
+        # signature -> {question: token set}, for near-duplicate lookups
+        self.by_signature = {}
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def make_key(self, question, articles):
+        return normalize_question(question), article_signature(articles)
+
+    def get(self, question, articles):
+        key = self.make_key(question, articles)
+        now = time.monotonic()
+
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] > now:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                self._remove(key)
+
+            if self.similarity_threshold > 0:
+                similar = self._find_similar(key, now)
+                if similar is not None:
+                    self.entries.move_to_end(similar)
+                    self.near_hits += 1
+                    return self.entries[similar][1]
+
+            self.misses += 1
+            return None
+
+    def put(self, question, articles, answer):
+        key = self.make_key(question, articles)
+        with self.lock:
+            if key in self.entries:
+                self._remove(key)
+            self.entries[key] = (time.monotonic() + self.ttl, answer)
+            self.by_signature.setdefault(key[1], {})[key[0]] = set(key[0].split())
+
+            while len(self.entries) > self.max_entries:
+                oldest = next(iter(self.entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def _find_similar(self, key, now):
+        # Only questions answered from the exact same articles are candidates
+        question, signature = key
+        candidates = self.by_signature.get(signature)
+        if not candidates:
+            return None
+
+        tokens = set(question.split())
+        best, best_score = None, self.similarity_threshold
+        for other, other_tokens in list(candidates.items()):
+            other_key = (other, signature)
+            if self.entries[other_key][0] <= now:
+                self._remove(other_key)
+                continue
+            score = jaccard(tokens, other_tokens)
+            if score >= best_score:
+                best, best_score = other_key, score
+        return best
+
+    def _remove(self, key):
+        self.entries.pop(key, None)
+        questions = self.by_signature.get(key[1])
+        if questions is not None:
+            questions.pop(key[0], None)
+            if not questions:
+                del self.by_signature[key[1]]
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.by_signature.clear()
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.near_hits + self.misses
+            return {
+                'entries': len(self.entries),
+                'hits': self.hits,
+                'near_hits': self.near_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round((self.hits + self.near_hits) / lookups, 3) if lookups else 0.0
+            }
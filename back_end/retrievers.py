@@ -0,0 +1,159 @@
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from logs import get_logger, Sampled
+
+log = get_logger('retrievers')
+sampled = Sampled(log)
+
+
+class Retriever(ABC):
+    """Anything with search_articles(query, limit, category) returning article dicts.
+
+    With a category, only FAQs in it (and uncategorized ones) are returned.
+    """
+
+    name = 'base'
+
+    @abstractmethod
+    def search_articles(self, query, limit=5, category=None):
+        ...
+
+
+class KeywordRetriever(Retriever):
+    # In-memory TF-IDF index built by DatabaseManager.build_index()
+    name = 'keyword'
+
+    def __init__(self, db_manager):
+        self.db_manager = db_manager
+        if db_manager.index is None:
+            db_manager.build_index()
+
+    def search_articles(self, query, limit=5, category=None):
+        self.db_manager.refresh_changed()
+        return self.db_manager.index.search(query, limit, category)
+
+
+class FtsRetriever(Retriever):
+    # SQLite FTS5 with bm25 ranking
+    name = 'fts'
+
+    def __init__(self, db_manager):
+        self.db_manager = db_manager
+
+    def search_articles(self, query, limit=5, category=None):
+        return self.db_manager.search_fts(query, limit, category)
+
+
+class VectorRetriever(Retriever):
+    # Hashed n-gram embeddings in a memory-mapped matrix
+    name = 'vector'
+
+    def __init__(self, db_manager):
+        from embeddings import VectorStore
+        self.store = VectorStore(db_manager)
+        self.store.load()
+        # FAQ writes and syncs keep the store current from here on
+        db_manager.vectors = self.store
+
+    def search_articles(self, query, limit=5, category=None):
+        self.store.db_manager.refresh_changed()
+        return self.store.search_articles(query, limit, category)
+
+
+RETRIEVERS = {
+    'keyword': KeywordRetriever,
+    'fts': FtsRetriever,
+    'vector': VectorRetriever,
+}
+
+
+def reciprocal_rank_fusion(result_lists, limit=5, k=60):
+    # Merge ranked lists; each list adds 1 / (k + rank) per article
+    scores = {}
+    articles = {}
+    for results in result_lists:
+        for rank, article in enumerate(results, start=1):
+            key = article.get('article_id') or article['title']
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank)
+            articles.setdefault(key, article)
+
+    ranked = sorted(scores, key=scores.get, reverse=True)[:limit]
+    fused = []
+    for key in ranked:
+        article = dict(articles[key])
+        article['score'] = scores[key]
+        fused.append(article)
+    return fused
+
+
+class HybridRetriever(Retriever):
+    """Query several retrievers in parallel and fuse what returns in time.
+
+    A backend that misses the latency budget is dropped for that request;
+    its thread finishes in the background and the result is discarded.
+    """
+
+    name = 'hybrid'
+
+    def __init__(self, retrievers, budget_ms=150, rrf_k=60, max_workers=8):
+        self.retrievers = retrievers
+        self.budget = budget_ms / 1000.0
+        self.rrf_k = rrf_k
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='retriever')
+        self.timeouts = {r.name: 0 for r in retrievers}
+
+    def search_articles(self, query, limit=5, category=None):
+        # Ask each backend for a deeper list than we return so fusion has overlap
+        depth = limit * 2
+        futures = {
+            self.executor.submit(r.search_articles, query, depth, category): r
+            for r in self.retrievers
+        }
+        done, not_done = wait(futures, timeout=self.budget)
+
+        for future in not_done:
+            name = futures[future].name
+            self.timeouts[name] += 1
+            sampled.warning(('budget', name), "Retriever '%s' missed %.0fms budget", name, self.budget * 1000)
+
+        result_lists = []
+        # Keep the configured backend order so ties break the same way each time
+        for future, retriever in futures.items():
+            if future not in done:
+                continue
+            try:
+                result_lists.append(future.result())
+            except Exception as e:
+                sampled.warning(('failed', retriever.name), "Retriever '%s' failed: %s", retriever.name, e)
+
+        return reciprocal_rank_fusion(result_lists, limit, self.rrf_k)
+
+
+def build_retriever(db_manager, config):
+    # Build the backend mix named in config.RETRIEVERS
+    retrievers = []
+    for name in config.RETRIEVERS:
+        name = name.strip()
+        if not name:
+            continue
+        cls = RETRIEVERS.get(name)
+        if cls is None:
+            print(f"⚠️ Unknown retriever '{name}', skipping")
+            continue
+        try:
+            retrievers.append(cls(db_manager))
+        except Exception as e:
+            print(f"⚠️ Retriever '{name}' failed to load: {e}")
+
+    if not retrievers:
+        print("⚠️ No retrievers configured, using FTS search")
+        return FtsRetriever(db_manager)
+    if len(retrievers) == 1:
+        return retrievers[0]
+
+    return HybridRetriever(
+        retrievers,
+        budget_ms=config.RETRIEVAL_BUDGET_MS,
+        rrf_k=config.RRF_K
+    )
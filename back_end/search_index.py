@@ -0,0 +1,198 @@
+import heapq
+import math
+import threading
+from array import array
+from collections import Counter
+
+from database import TOKEN_RE, STOPWORDS
+from query_processing import stem
+
+# Title words count this many times when weighting a document
+TITLE_BOOST = 3
+
+
+def tokenize(text):
+    # Lowercase, stemmed word tokens without stopwords
+    if not text:
+        return []
+    return [stem(t) for t in TOKEN_RE.findall(text.lower()) if t not in STOPWORDS]
+
+
+class SearchIndex:
+    """In-memory inverted index over the faqs table.
+
+    Documents use log-tf weights with a cosine norm and queries use
+    log-tf * idf (SMART lnc.ltc), so document norms never depend on the
+    collection and rows can be added or removed without a rebuild.
+
+    Each term's postings are split by FAQ category, so a search routed to
+    one category only walks that category's lists (plus uncategorized
+    FAQs, which belong to every category).
+    """
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        # term -> {category: (doc slots, doc weights)}, both array-backed;
+        # '' is the partition of FAQs without a category
+        self.postings = {}
+        # slot -> article dict, None when the slot is free
+        self.docs = []
+        self.terms = []
+        self.slot_by_article = {}
+        self.free_slots = []
+        self.num_docs = 0
+        self.idf_cache = {}
+        # Score accumulator reused across queries, indexed by slot
+        self.scores = array('d')
+
+    def load(self, rows):
+        # Build the index from (article_id, title, content, url, last_updated, category) rows
+        with self.lock:
+            for row in rows:
+                self.add(*row)
+
+    def add(self, article_id, title, content, url=None, last_updated=None, category=None):
+        # Add a document, replacing any older version with the same article_id
+        with self.lock:
+            if article_id in self.slot_by_article:
+                self.remove(article_id)
+
+            counts = Counter(tokenize(content))
+            for token in tokenize(title):
+                counts[token] += TITLE_BOOST
+
+            if self.free_slots:
+                slot = self.free_slots.pop()
+            else:
+                slot = len(self.docs)
+                self.docs.append(None)
+                self.terms.append(None)
+
+            weights = {t: 1.0 + math.log(tf) for t, tf in counts.items()}
+            norm = math.sqrt(sum(w * w for w in weights.values())) or 1.0
+
+            partition = category or ''
+            for term, weight in weights.items():
+                partitions = self.postings.get(term)
+                if partitions is None:
+                    partitions = self.postings[term] = {}
+                entry = partitions.get(partition)
+                if entry is None:
+                    entry = partitions[partition] = (array('l'), array('d'))
+                entry[0].append(slot)
+                entry[1].append(weight / norm)
+
+            self.docs[slot] = {
+                'article_id': article_id,
+                'title': title,
+                'content': content,
+                'url': url,
+                'last_updated': last_updated,
+                'category': category
+            }
+            self.terms[slot] = tuple(weights)
+            self.slot_by_article[article_id] = slot
+            self.num_docs += 1
+            self.idf_cache.clear()
+
+    def get(self, article_id):
+        # Stored article dict, or None
+        with self.lock:
+            slot = self.slot_by_article.get(article_id)
+            return self.docs[slot] if slot is not None else None
+
+    def remove(self, article_id):
+        # Drop a document; only the postings it appears in are touched
+        with self.lock:
+            slot = self.slot_by_article.pop(article_id, None)
+            if slot is None:
+                return False
+
+            partition = self.docs[slot]['category'] or ''
+            for term in self.terms[slot]:
+                partitions = self.postings[term]
+                slots, weights = partitions[partition]
+                i = slots.index(slot)
+                del slots[i]
+                del weights[i]
+                if not slots:
+                    del partitions[partition]
+                    if not partitions:
+                        del self.postings[term]
+
+            self.docs[slot] = None
+            self.terms[slot] = None
+            self.free_slots.append(slot)
+            self.num_docs -= 1
+            self.idf_cache.clear()
+            return True
+
+    def idf(self, term):
+        # Cached until the next add/remove changes document frequencies
+        value = self.idf_cache.get(term)
+        if value is None:
+            partitions = self.postings.get(term)
+            df = sum(len(slots) for slots, _ in partitions.values()) if partitions else 0
+            value = math.log(1.0 + self.num_docs / df) if df else 0.0
+            self.idf_cache[term] = value
+        return value
+
+    def _scratch(self, size):
+        # Grow the shared accumulator only when new slots were added
+        if len(self.scores) < size:
+            self.scores.extend(array('d', bytes(8 * (size - len(self.scores)))))
+        return self.scores
+
+    def categories(self):
+        # Category -> number of FAQs in it
+        with self.lock:
+            return dict(Counter(doc['category'] for doc in self.docs if doc is not None and doc['category']))
+
+    def search(self, query, limit=5, category=None):
+        # Return the top `limit` documents as search_articles-style dicts,
+        # only from `category` and uncategorized FAQs when one is given
+        query_counts = Counter(tokenize(query))
+        if not query_counts:
+            return []
+
+        with self.lock:
+            scores = self._scratch(len(self.docs))
+            touched = []
+
+            for term, tf in query_counts.items():
+                partitions = self.postings.get(term)
+                if partitions is None:
+                    continue
+                q_weight = (1.0 + math.log(tf)) * self.idf(term)
+                if category is None:
+                    entries = partitions.values()
+                else:
+                    entries = [e for e in (partitions.get(category), partitions.get('')) if e]
+                for slots, weights in entries:
+                    for i in range(len(slots)):
+                        slot = slots[i]
+                        if scores[slot] == 0.0:
+                            touched.append(slot)
+                        scores[slot] += q_weight * weights[i]
+
+            best = heapq.nlargest(limit, touched, key=scores.__getitem__)
+            results = []
+            for slot in best:
+                doc = self.docs[slot]
+                results.append({
+                    'title': doc['title'],
+                    'content': doc['content'],
+                    'url': doc['url'],
+                    'article_id': doc['article_id'],
+                    'last_updated': doc['last_updated'],
+                    'category': doc['category'],
+                    'score': scores[slot]
+                })
+
+            for slot in touched:
+                scores[slot] = 0.0
+
+            return results
+
+    def __len__(self):
+        return self.num_docs
@@ -0,0 +1,252 @@
+import asyncio
+import hashlib
+import os
+import threading
+import time
+import uuid
+
+from response_cache import normalize_question
+
+
+def flight_key(question, context):
+    # Same normalized question over the same retrieved context -> same answer
+    digest = hashlib.sha1(context.encode('utf-8')).hexdigest()
+    return f"{normalize_question(question)}|{digest}"
+
+
+class FlightAbandoned(Exception):
+    # The leader went away without an answer (e.g. its client disconnected)
+    pass
+
+
+class Flight:
+    # One in-progress call that later arrivals wait on
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Coalesce identical concurrent calls within one process.
+
+    The first caller for a key runs the function; callers that arrive
+    while it is running block on its result (or its exception) instead of
+    making their own call. With a SqliteLease, the leader also takes a
+    row lease so other worker processes wait for its answer too.
+    """
+
+    def __init__(self, lease=None, wait_timeout=60.0):
+        self.lease = lease
+        # A follower stops waiting and runs the call itself after this long
+        self.wait_timeout = wait_timeout
+        self.lock = threading.Lock()
+        self.flights = {}
+        self.leaders = 0
+        self.coalesced = 0
+        self.timeouts = 0
+
+    def join(self, key):
+        # (flight, True) when the caller must run the call and finish() it
+        with self.lock:
+            flight = self.flights.get(key)
+            if flight is not None:
+                flight.waiters += 1
+                self.coalesced += 1
+                return flight, False
+            flight = self.flights[key] = Flight()
+            self.leaders += 1
+            return flight, True
+
+    def finish(self, key, flight, result=None, error=None):
+        flight.result = result
+        flight.error = error
+        with self.lock:
+            if self.flights.get(key) is flight:
+                del self.flights[key]
+        flight.done.set()
+
+    def wait(self, flight):
+        # Result of someone else's flight, or None if it took too long or was abandoned
+        if not flight.done.wait(self.wait_timeout):
+            with self.lock:
+                self.timeouts += 1
+            return None
+        if isinstance(flight.error, FlightAbandoned):
+            return None
+        if flight.error is not None:
+            raise flight.error
+        return flight.result
+
+    def do(self, key, fn):
+        """Run fn() once per key at a time; returns (result, shared)."""
+        flight, leader = self.join(key)
+        if not leader:
+            result = self.wait(flight)
+            if result is not None:
+                return result, True
+            return fn(), False
+
+        try:
+            if self.lease is not None:
+                result, shared = self.lease.run(key, fn)
+            else:
+                result, shared = fn(), False
+        except Exception as e:
+            self.finish(key, flight, error=e)
+            raise
+        self.finish(key, flight, result=result)
+        return result, shared
+
+    def stats(self):
+        with self.lock:
+            stats = {
+                'in_flight': len(self.flights),
+                'leaders': self.leaders,
+                'coalesced': self.coalesced,
+                'timeouts': self.timeouts
+            }
+        if self.lease is not None:
+            stats['lease'] = self.lease.stats()
+        return stats
+
+
+class AsyncSingleFlight:
+    # Same idea for the Quart app: followers await the leader's future
+
+    def __init__(self, wait_timeout=60.0):
+        self.wait_timeout = wait_timeout
+        self.flights = {}
+        self.leaders = 0
+        self.coalesced = 0
+        self.timeouts = 0
+
+    async def do(self, key, make_coro):
+        future = self.flights.get(key)
+        if future is not None:
+            self.coalesced += 1
+            try:
+                return await asyncio.wait_for(asyncio.shield(future), self.wait_timeout), True
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+                return await make_coro(), False
+            except FlightAbandoned:
+                # The leader was cancelled; its followers were not
+                return await make_coro(), False
+
+        future = self.flights[key] = asyncio.get_running_loop().create_future()
+        self.leaders += 1
+        try:
+            result = await make_coro()
+        except Exception as e:
+            future.set_exception(e)
+            # Nobody may be waiting; don't log "exception never retrieved"
+            future.exception()
+            raise
+        except BaseException:
+            # Cancelled (client went away): hand followers FlightAbandoned,
+            # never our CancelledError, so they make the call themselves
+            future.set_exception(FlightAbandoned())
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result, False
+        finally:
+            del self.flights[key]
+
+    def stats(self):
+        return {
+            'in_flight': len(self.flights),
+            'leaders': self.leaders,
+            'coalesced': self.coalesced,
+            'timeouts': self.timeouts
+        }
+
+
+class SqliteLease:
+    """Cross-process single flight through the llm_flights table.
+
+    The leader inserts (or takes over an expired) row for the key, runs
+    the call and stores the answer on the row for result_ttl seconds.
+    Other workers poll the row until the answer appears, the lease expires
+    (leader died) or they give up, and then run the call themselves.
+    """
+
+    def __init__(self, db_manager, lease_seconds=30.0, result_ttl=5.0, poll_ms=50, wait_timeout=60.0):
+        self.db_manager = db_manager
+        self.lease_seconds = lease_seconds
+        self.result_ttl = result_ttl
+        self.poll_interval = poll_ms / 1000.0
+        self.wait_timeout = wait_timeout
+        self.owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.acquired = 0
+        self.shared = 0
+        self.takeovers = 0
+
+    def acquire(self, key):
+        # True if this process now holds the lease, else the row's answer (or None)
+        now = time.time()
+        conn = self.db_manager.get_connection()
+        try:
+            conn.execute('''
+                INSERT INTO llm_flights (key, owner, expires_at, answer) VALUES (?, ?, ?, NULL)
+                ON CONFLICT(key) DO UPDATE SET
+                    owner = excluded.owner, expires_at = excluded.expires_at, answer = NULL
+                WHERE llm_flights.expires_at < ?
+            ''', (key, self.owner, now + self.lease_seconds, now))
+            conn.commit()
+            row = conn.execute('SELECT owner, answer FROM llm_flights WHERE key = ?', (key,)).fetchone()
+        finally:
+            conn.close()
+
+        if row and row[0] == self.owner and row[1] is None:
+            return True, None
+        return False, row[1] if row else None
+
+    def release(self, key, answer=None):
+        conn = self.db_manager.get_connection()
+        try:
+            if answer is None:
+                # Failed call: let the next worker take over right away
+                conn.execute('DELETE FROM llm_flights WHERE key = ? AND owner = ?', (key, self.owner))
+            else:
+                conn.execute('''
+                    UPDATE llm_flights SET answer = ?, expires_at = ?
+                    WHERE key = ? AND owner = ?
+                ''', (answer, time.time() + self.result_ttl, key, self.owner))
+            # Old rows only matter while someone could still be polling them
+            conn.execute('DELETE FROM llm_flights WHERE expires_at < ?', (time.time() - self.lease_seconds,))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def run(self, key, fn):
+        deadline = time.monotonic() + self.wait_timeout
+        while True:
+            held, answer = self.acquire(key)
+            if answer is not None:
+                self.shared += 1
+                return answer, True
+            if held or time.monotonic() >= deadline:
+                break
+            time.sleep(self.poll_interval)
+
+        if held:
+            self.acquired += 1
+        else:
+            # Waited too long on another worker; answer without the lease
+            self.takeovers += 1
+        try:
+            answer = fn()
+        except Exception:
+            if held:
+                self.release(key)
+            raise
+        if held:
+            self.release(key, answer)
+        return answer, False
+
+    def stats(self):
+        return {'acquired': self.acquired, 'shared': self.shared, 'takeovers': self.takeovers}
@@ -0,0 +1,134 @@
+"""
+Local stand-in for the Confluence REST API used by AtlassianClient.
+
+Serves a synthetic space with cursor-style _links.next pagination on
+/rest/api/content and /rest/api/content/search (CQL 'id in (...)' is
+understood), plus /rest/api/space/<key>. Latency and 429 responses
+(with Retry-After) can be injected to measure sync wall-clock time.
+"""
+
+import json
+import random
+import re
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs, urlencode
+
+# Confluence caps page size much lower once bodies are expanded
+MAX_LIMIT = 200
+MAX_BODY_LIMIT = 25
+
+
+def make_page(page_id, version=1):
+    return {
+        'id': str(page_id),
+        'type': 'page',
+        'title': f'KB article {page_id}',
+        'body': {'view': {'value': f'<p>How to fix problem {page_id}. ' + 'Details. ' * 200 + '</p>'}},
+        'version': {'number': version, 'when': '2024-01-15T10:00:00.000Z'},
+        'space': {'key': 'KB'},
+        '_links': {'webui': f'/spaces/KB/pages/{page_id}'}
+    }
+
+
+class StubConfluenceHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        url = urlparse(self.path)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+
+        with server.lock:
+            server.requests += 1
+            throttle = server.rate_limit and random.random() < server.rate_limit
+            if throttle:
+                server.throttled += 1
+
+        if throttle:
+            self.send_json(429, {'message': 'Rate limited'}, {'Retry-After': str(server.retry_after)})
+            return
+
+        expanded_body = 'body' in query.get('expand', '')
+        time.sleep(server.latency + (server.body_latency if expanded_body else 0))
+
+        path = url.path
+        if path.startswith('/wiki'):
+            path = path[len('/wiki'):]
+
+        if path.startswith('/rest/api/space/'):
+            self.send_json(200, {'key': path.rsplit('/', 1)[-1]})
+        elif path == '/rest/api/space':
+            self.send_json(200, {'results': [{'key': 'KB'}]})
+        elif path in ('/rest/api/content', '/rest/api/content/search'):
+            self.send_content(path, query, expanded_body)
+        else:
+            self.send_json(404, {'message': 'Not found'})
+
+    def send_content(self, path, query, expanded_body):
+        if self.server.fail_status and int(query.get('cursor', 0)) >= self.server.fail_cursor:
+            self.send_json(self.server.fail_status, {'message': 'Failed'})
+            return
+        pages = self.server.pages
+        ids = None
+        match = re.search(r'id in \(([^)]*)\)', query.get('cql', ''))
+        if match:
+            ids = [i.strip() for i in match.group(1).split(',')]
+            items = [pages[i] for i in ids if i in pages]
+        else:
+            items = list(pages.values())
+
+        cap = MAX_BODY_LIMIT if expanded_body else MAX_LIMIT
+        limit = min(int(query.get('limit', 25)), cap)
+        start = int(query.get('cursor', 0))
+        chunk = items[start:start + limit]
+        if not expanded_body:
+            chunk = [{k: v for k, v in page.items() if k != 'body'} for page in chunk]
+
+        links = {'base': f"http://127.0.0.1:{self.server.server_address[1]}/wiki"}
+        if start + limit < len(items):
+            next_query = dict(query, cursor=start + limit)
+            links['next'] = f"{path}?{urlencode(next_query)}"
+
+        self.send_json(200, {'results': chunk, 'size': len(chunk), '_links': links})
+
+    def send_json(self, status, payload, headers=None):
+        data = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class StubConfluenceServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, num_pages=500, latency=0.05, body_latency=0.1, rate_limit=0.0, retry_after=0.2):
+        super().__init__(('127.0.0.1', 0), StubConfluenceHandler)
+        self.pages = {str(i): make_page(i) for i in range(1, num_pages + 1)}
+        self.latency = latency
+        self.body_latency = body_latency
+        # Fraction of requests answered with 429 + Retry-After
+        self.rate_limit = rate_limit
+        self.retry_after = retry_after
+        # Status returned for listing pages from this cursor on, to test failures
+        self.fail_status = None
+        self.fail_cursor = 0
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.throttled = 0
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/wiki"
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
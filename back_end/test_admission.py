@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Test admission control for LLM calls under a spike against the fake LLM
+"""
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from groq import AsyncGroq, Groq
+
+from admission import AdmissionController, AdmissionRejected
+from fake_llm import FakeLLMServer
+from llm_gateway import AsyncLLMGateway, LLMGateway, LLMUnavailable
+
+SPIKE = 64
+
+
+def spike(server, admission):
+    client = Groq(api_key='test', base_url=server.base_url, max_retries=0, timeout=30)
+    gateway = LLMGateway(client, "llama-3.3-70b-versatile", deadline=30, hedge=False,
+                         admission=admission, max_workers=SPIKE)
+    server.requests = server.rate_limited = 0
+
+    def one(_):
+        start = time.perf_counter()
+        try:
+            gateway.complete("How do I reset my password?")
+            outcome = 'ok'
+        except AdmissionRejected as e:
+            outcome = e.reason
+        except LLMUnavailable:
+            outcome = 'failed'
+        return outcome, time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=SPIKE) as pool:
+        results = list(pool.map(one, range(SPIKE)))
+    elapsed = time.perf_counter() - start
+
+    outcomes = {}
+    for outcome, _ in results:
+        outcomes[outcome] = outcomes.get(outcome, 0) + 1
+    answered = sorted(latency for outcome, latency in results if outcome == 'ok')
+    slowest = f"{answered[-1]:.2f}s" if answered else "-"
+    print(f"   {outcomes} in {elapsed:.2f}s, slowest answer {slowest}, "
+          f"{server.requests} upstream requests, {server.rate_limited} got 429")
+    return outcomes
+
+
+print("🧪 Testing admission control with a spike of", SPIKE, "requests...")
+server = FakeLLMServer(latency=0.5, max_concurrent=8).start()
+
+print("1. No admission control: provider allows 8 at a time...")
+outcomes = spike(server, None)
+assert outcomes.get('failed', 0) > SPIKE / 2
+
+print("2. max_in_flight=8: requests queue instead of failing...")
+admission = AdmissionController(max_in_flight=8, requests_per_minute=6000, max_queue=SPIKE, max_wait=10)
+outcomes = spike(server, admission)
+assert outcomes == {'ok': SPIKE}, outcomes
+stats = admission.stats()
+print(f"   wait_ms histogram: {stats['wait_ms']['buckets']}")
+print(f"   queue depth histogram: {stats['queue_depth']['buckets']}")
+
+print("3. max_wait=1s: late requests are shed fast instead of waiting...")
+admission = AdmissionController(max_in_flight=8, requests_per_minute=6000, max_queue=SPIKE, max_wait=1.0)
+outcomes = spike(server, admission)
+assert outcomes.get('failed', 0) == 0 and outcomes.get('deadline', 0) > 0
+
+print("4. max_queue=16: overflow is rejected immediately...")
+admission = AdmissionController(max_in_flight=8, requests_per_minute=6000, max_queue=16, max_wait=10)
+outcomes = spike(server, admission)
+assert outcomes.get('queue_full', 0) > 0 and outcomes.get('failed', 0) == 0
+
+print("5. Rate limit: 120 requests/minute with a burst of 8...")
+admission = AdmissionController(max_in_flight=8, requests_per_minute=120, max_queue=SPIKE, max_wait=3)
+outcomes = spike(server, admission)
+# 8 from the burst plus 2/s for 3s
+assert outcomes['ok'] <= 8 + 2 * 3 + 1, outcomes
+
+print("6. Async gateway: the spike queues on the event loop, not on executor threads...")
+
+
+async def async_spike(admission):
+    # A small default executor, like the one retrieval shares in the ASGI app
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=4))
+    client = AsyncGroq(api_key='test', base_url=server.base_url, max_retries=0, timeout=30)
+    gateway = AsyncLLMGateway(client, "llama-3.3-70b-versatile", deadline=30, hedge=False,
+                              admission=admission)
+    outcomes = {}
+
+    async def one():
+        try:
+            await gateway.complete("How do I reset my password?")
+            outcome = 'ok'
+        except AdmissionRejected as e:
+            outcome = e.reason
+        except LLMUnavailable:
+            outcome = 'failed'
+        outcomes[outcome] = outcomes.get(outcome, 0) + 1
+
+    calls = asyncio.gather(*(one() for _ in range(SPIKE)))
+    await asyncio.sleep(0.2)
+    start = time.perf_counter()
+    await asyncio.to_thread(time.sleep, 0)
+    executor_wait = time.perf_counter() - start
+    await calls
+    print(f"   {outcomes}, an executor job queued mid-spike ran after {executor_wait * 1000:.0f} ms")
+    return outcomes, executor_wait
+
+
+admission = AdmissionController(max_in_flight=8, requests_per_minute=6000, max_queue=SPIKE, max_wait=10)
+outcomes, executor_wait = asyncio.run(async_spike(admission))
+assert outcomes == {'ok': SPIKE}, outcomes
+assert executor_wait < 0.1, executor_wait
+
+print("7. Cancelled async callers give their slots back...")
+
+
+async def cancel_spike(admission):
+    client = AsyncGroq(api_key='test', base_url=server.base_url, max_retries=0, timeout=30)
+    gateway = AsyncLLMGateway(client, "llama-3.3-70b-versatile", deadline=30, hedge=False,
+                              admission=admission)
+    # Half are cancelled while running, half while still queued
+    tasks = [asyncio.ensure_future(gateway.complete("How do I reset my password?")) for _ in range(16)]
+    await asyncio.sleep(0.1)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    await asyncio.sleep(0)
+    after_cancel = admission.stats()
+    # The fake LLM finishes the abandoned requests before it frees its slots
+    await asyncio.sleep(server.latency)
+    # With slots leaked, this would queue and then be shed
+    await gateway.complete("How do I reset my password?", deadline=5)
+    return after_cancel
+
+
+admission = AdmissionController(max_in_flight=8, requests_per_minute=6000, max_queue=SPIKE, max_wait=2)
+stats = asyncio.run(cancel_spike(admission))
+print(f"   after cancelling 16 calls: {stats['in_flight']} in flight, {stats['queued']} queued")
+assert stats['in_flight'] == 0 and stats['queued'] == 0, stats
+
+server.shutdown()
+print("✅ All admission tests passed!")
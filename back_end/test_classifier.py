@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Test the category classifier and category-routed search
+"""
+
+import os
+import tempfile
+import time
+
+from benchmark import make_kb, make_workload, SYSTEMS, CATEGORIES
+from classifier import CategoryClassifier
+from search_index import SearchIndex
+
+# Each system belongs to one department, like a real KB's categories
+CATEGORY_OF = {system: CATEGORIES[i % len(CATEGORIES)] for i, system in enumerate(SYSTEMS)}
+
+print("🧪 Testing the category classifier...")
+articles = make_kb(10000, seed=4)
+for article in articles:
+    article['category'] = CATEGORY_OF[article['topic'][0]]
+by_id = {a['article_id']: a for a in articles}
+workload = make_workload(articles, 2000, seed=5)
+
+print("1. Training...")
+start = time.perf_counter()
+classifier = CategoryClassifier()
+classifier.load((a['article_id'], a['title'], a['content'], a['category']) for a in articles)
+print(f"   {len(articles)} FAQs in {(time.perf_counter() - start) * 1000:.0f} ms, {classifier.stats()}")
+
+print("2. Predicting...")
+correct = confident = confident_correct = 0
+seconds = []
+for question, expected in workload:
+    start = time.perf_counter()
+    category, probability = classifier.predict(question)
+    seconds.append(time.perf_counter() - start)
+    right = category == by_id[expected]['category']
+    correct += right
+    if probability >= 0.8:
+        confident += 1
+        confident_correct += right
+seconds.sort()
+print(f"   accuracy {correct / len(workload):.1%}, {confident / len(workload):.1%} confident "
+      f"at {confident_correct / max(confident, 1):.1%} precision, "
+      f"p50 {seconds[len(seconds) // 2] * 1e6:.0f} us")
+assert correct / len(workload) > 0.9
+assert confident_correct / max(confident, 1) > 0.97
+
+print("3. Routed search vs the full index...")
+index = SearchIndex()
+index.load((a['article_id'], a['title'], a['content'], a['url'], a['last_updated'], a['category'])
+           for a in articles)
+results = {}
+for mode in ('full', 'routed'):
+    hits, seconds = 0, 0.0
+    for question, expected in workload:
+        category = None
+        if mode == 'routed':
+            predicted, probability = classifier.predict(question)
+            category = predicted if probability >= 0.8 else None
+        start = time.perf_counter()
+        found = index.search(question, 5, category) if category else []
+        if not found:
+            found = index.search(question, 5)
+        seconds += time.perf_counter() - start
+        hits += expected in [a['article_id'] for a in found]
+    results[mode] = (hits / len(workload), seconds / len(workload))
+    print(f"   {mode:6}: recall@5 {results[mode][0]:.3f}, {results[mode][1] * 1000:.2f} ms per search")
+assert results['routed'][0] >= results['full'][0] - 0.01
+assert results['routed'][1] < results['full'][1]
+for article in index.search("reset vpn password", 5, 'IT'):
+    assert article['category'] in ('IT', None)
+
+print("4. Incremental updates match a full retrain...")
+classifier.add_faq('new-1', "Reserving the climbing wall", "Book the climbing wall at the rec center.", 'Athletics')
+assert classifier.predict("climbing wall booking")[0] == 'Athletics'
+classifier.add_faq('new-1', "Reserving the climbing wall", "Book the climbing wall at the rec center.", 'Facilities')
+assert classifier.predict("climbing wall booking")[0] == 'Facilities'
+assert classifier.remove('new-1') and not classifier.remove('new-1')
+classifier.remove(articles[0]['article_id'])
+fresh = CategoryClassifier()
+fresh.load((a['article_id'], a['title'], a['content'], a['category']) for a in articles[1:])
+assert classifier.stats() == fresh.stats()
+for question, _ in workload[:200]:
+    a, b = classifier.predict(question), fresh.predict(question)
+    assert a[0] == b[0] and abs(a[1] - b[1]) < 1e-6, (question, a, b)
+
+print("5. Labelled questions and edge cases...")
+classifier.add_example('answer:1', "gym locker combination", 'Housing', weight=10)
+assert classifier.predict("forgot my gym locker combination")[0] == 'Housing'
+assert classifier.predict("")[0] is None
+single = CategoryClassifier()
+single.add_faq('only', "Parking permits", "Buy a permit online.", 'Facilities')
+assert single.predict("parking")[0] is None
+
+print("6. Snapshot loads instead of retraining...")
+path = os.path.join(tempfile.mkdtemp(), 'classifier.bin')
+fresh.save(path, [7, 0])
+start = time.perf_counter()
+loaded = CategoryClassifier.load_snapshot(path, [7, 0])
+load_ms = (time.perf_counter() - start) * 1000
+print(f"   {os.path.getsize(path) / 1e6:.1f} MB loaded in {load_ms:.1f} ms")
+assert load_ms < 50
+assert loaded.stats() == fresh.stats()
+
+
+def same_predictions():
+    for question, _ in workload[:200]:
+        a, b = loaded.predict(question), fresh.predict(question)
+        assert a[0] == b[0] and abs(a[1] - b[1]) < 1e-9, (question, a, b)
+
+
+same_predictions()
+# Edits land on top of the mapped table, and save back out whole
+assert loaded.remove(articles[1]['article_id']) and fresh.remove(articles[1]['article_id'])
+for model in (loaded, fresh):
+    model.add_faq('new-2', "Reserving the climbing wall", "Book the climbing wall at the rec center.", 'Athletics')
+assert loaded.stats() == fresh.stats()
+same_predictions()
+loaded.save(path, [7, 1])
+loaded = CategoryClassifier.load_snapshot(path, [7, 1])
+assert loaded.stats() == fresh.stats()
+same_predictions()
+assert CategoryClassifier.load_snapshot(path, [7, 0]) is None
+assert CategoryClassifier.load_snapshot(path + '.missing', [7, 0]) is None
+
+print("✅ All classifier tests passed!")
@@ -3,6 +3,9 @@
 Test database operations
 """
 
+import os
+import tempfile
+
 from models import init_db
 from database import DatabaseManager
 
@@ -33,4 +36,30 @@ print(f"   Found {len(results)} results")
 print("3. Testing chat save...")
 db_manager.save_chat('test_session', 'Test message', 'Test response')
 
+print("4. Testing writes from another worker...")
+path = os.path.join(tempfile.mkdtemp(), 'workers.db')
+init_db(path)
+writer, reader = DatabaseManager(path), DatabaseManager(path)
+writer.sync_articles(test_articles)
+for manager in (writer, reader):
+    manager.build_index()
+    manager.build_spelling()
+conn = writer.get_connection()
+conn.execute("INSERT INTO faqs (article_id, title, content, last_updated) VALUES "
+             "('db_test2', 'Printing Quota', 'Each student gets a printing quota.', '2024-02-01')")
+conn.execute("UPDATE faqs SET title = 'Renamed Article', last_updated = '2024-03-01' WHERE article_id = 'db_test1'")
+conn.commit()
+conn.close()
+reader.checked_at = 0
+assert [a['article_id'] for a in reader.search_articles("printing quota")] == ['db_test2']
+assert reader.get_last_updated('db_test1') == '2024-03-01'
+assert reader.spelling.correct("printin")[0] == "printing"
+conn = writer.get_connection()
+conn.execute("DELETE FROM faqs WHERE article_id = 'db_test2'")
+conn.commit()
+conn.close()
+reader.checked_at = 0
+assert not reader.search_articles("printing quota")
+print(f"   reader caught up to change {reader.change_seq}")
+
 print("✅ All database tests passed!")
\ No newline at end of file
@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""
+Test HTML to text conversion of Confluence page bodies
+"""
+
+from html_text import html_to_text
+
+print("🧪 Testing HTML to text...")
+
+print("1. Structure and entities...")
+text = html_to_text('<h2>Reset &amp; recover</h2><p>Click <b>Forgot&nbsp;Password</b>.</p>'
+                    '<ul><li>Check email</li><li>Follow the link</li></ul>')
+assert text == "## Reset & recover\n\nClick Forgot Password.\n\n- Check email\n- Follow the link", text
+
+print("2. Script, style and macro chrome are dropped...")
+text = html_to_text('<script>var x = 1;</script><style>.a {}</style>'
+                    '<div class="expand-control"><span class="aui-icon">toggle</span></div><p>Body</p>')
+assert text == "Body", text
+
+print("3. Unclosed tags inside a skipped element don't swallow the page...")
+cases = [
+    ('<div class="expand-control"><p>toggle</div><h2>Steps</h2><p>Real content here</p>',
+     "## Steps\n\nReal content here"),
+    ('<select><option>a<option>b</select><p>Visible text</p>', "Visible text"),
+    ('<div class="toc-macro"><ul><li>One<li>Two</ul></div><p>After the TOC</p>', "After the TOC"),
+    ('<div aria-hidden="true"><div>nested</div><img src="x"></div><p>Shown</p>', "Shown"),
+]
+for html, expected in cases:
+    text = html_to_text(html)
+    print(f"   {html[:40]!r}... -> {text!r}")
+    assert text == expected, (html, text)
+
+print("✅ All HTML to text tests passed!")
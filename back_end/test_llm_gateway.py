@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Test LLM gateway deadlines, hedging and retries against the fake LLM server
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from groq import Groq
+
+from fake_llm import FakeLLMServer
+from llm_gateway import LLMGateway, LLMUnavailable
+
+MODEL = "llama-3.3-70b-versatile"
+
+
+def make_gateway(server, **options):
+    client = Groq(api_key='test', base_url=server.base_url, max_retries=0, timeout=10)
+    return LLMGateway(client, MODEL, **options)
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def run_calls(gateway, count, concurrency=8):
+    def one(_):
+        start = time.perf_counter()
+        try:
+            gateway.complete("How do I reset my password?")
+        except LLMUnavailable:
+            pass
+        return time.perf_counter() - start
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        return list(pool.map(one, range(count)))
+
+
+print("🧪 Testing LLM gateway against fake LLM...")
+
+print("1. Long tail: 3% of calls take 3s instead of 0.2s...")
+# Hedging fires at p95, so it only helps with a tail thinner than 5%
+server = FakeLLMServer(latency=0.2, jitter=0.05, slow_rate=0.03, slow_latency=3.0).start()
+results = {}
+for hedge in (False, True):
+    gateway = make_gateway(server, deadline=10, hedge=hedge, hedge_min_delay=0.3, hedge_budget=0.2)
+    # Warm the latency window so hedging has a p95 to work from
+    run_calls(gateway, 40)
+    server.requests = 0
+    latencies = run_calls(gateway, 300)
+    stats = gateway.stats()
+    results[hedge] = percentile(latencies, 0.99)
+    print(f"   hedge={hedge!s:5}: p50 {percentile(latencies, 0.5) * 1000:5.0f} ms, "
+          f"p99 {percentile(latencies, 0.99) * 1000:5.0f} ms, "
+          f"{server.requests} upstream requests, {stats['hedges']} hedges ({stats['hedge_wins']} won)")
+assert results[True] < results[False], "hedging did not cut the tail"
+server.shutdown()
+
+print("2. Deadline: a 3s provider with a 0.5s deadline gives up on time...")
+server = FakeLLMServer(latency=3.0).start()
+gateway = make_gateway(server, deadline=0.5, hedge=False)
+start = time.perf_counter()
+try:
+    gateway.complete("hello")
+    raise AssertionError("expected LLMUnavailable")
+except LLMUnavailable as e:
+    elapsed = time.perf_counter() - start
+    print(f"   gave up after {elapsed:.2f}s: {e}")
+assert elapsed < 0.8
+
+start = time.perf_counter()
+try:
+    list(gateway.stream("hello"))
+    raise AssertionError("expected LLMUnavailable")
+except LLMUnavailable as e:
+    print(f"   stream gave up after {time.perf_counter() - start:.2f}s: {e}")
+server.shutdown()
+
+print("3. A failed attempt is retried once...")
+server = FakeLLMServer(latency=0.05, fail_rate=0.5).start()
+gateway = make_gateway(server, deadline=5, hedge=False, max_retries=1)
+ok = 0
+for _ in range(100):
+    try:
+        gateway.complete("hello")
+        ok += 1
+    except LLMUnavailable:
+        pass
+stats = gateway.stats()
+print(f"   {ok}/100 answered with 50% upstream failures ({stats['retries']} retries)")
+# 75% expected with one retry, 50% without
+assert ok > 62
+server.shutdown()
+
+print("✅ All LLM gateway tests passed!")
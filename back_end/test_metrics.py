@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Test stage timing, percentile estimates, the Prometheus output and log sampling
+"""
+
+import logging
+import random
+import time
+
+from admission import AdmissionController
+from logs import Sampled
+from metrics import Metrics, Histogram, STAGE_BUCKETS
+
+print("🧪 Testing metrics...")
+
+print("1. Bucket percentiles track the exact ones...")
+rng = random.Random(3)
+values = sorted(rng.lognormvariate(-3, 1) for _ in range(20000))
+histogram = Histogram(STAGE_BUCKETS)
+for value in values:
+    histogram.observe(value)
+for q in (0.5, 0.95, 0.99):
+    exact = values[int(q * len(values))]
+    estimate = histogram.quantile(q)
+    print(f"   p{round(q * 100)}: exact {exact * 1000:7.2f} ms, estimate {estimate * 1000:7.2f} ms")
+    # Never further off than the width of the bucket it falls in
+    assert abs(estimate - exact) / exact < 0.5
+
+print("2. Spans record time and count errors...")
+metrics = Metrics()
+with metrics.span('retrieve'):
+    time.sleep(0.01)
+
+
+@metrics.span('llm')
+def fails():
+    raise RuntimeError("boom")
+
+
+for _ in range(3):
+    try:
+        fails()
+    except RuntimeError:
+        pass
+summary = metrics.summary()
+print(f"   {summary}")
+assert summary['retrieve']['count'] == 1 and 5 < summary['retrieve']['p50_ms'] < 25
+assert summary['llm']['count'] == 3
+assert metrics.counters[('stage_errors', (('stage', 'llm'),))] == 3
+
+print("3. Prometheus text output...")
+metrics.register('cache', lambda: {'hits': 4, 'misses': 1, 'nested': {'size': 2}, 'name': 'lru'})
+text = metrics.render()
+assert 'faq_stage_duration_seconds_bucket{stage="retrieve",le="+Inf"} 1' in text
+assert 'faq_stage_duration_seconds_count{stage="llm"} 3' in text
+assert 'faq_stage_errors_total{stage="llm"} 3' in text
+assert 'faq_cache_hits 4' in text and 'faq_cache_nested_size 2' in text and 'lru' not in text
+admission = AdmissionController(max_in_flight=2, requests_per_minute=6000)
+admission.acquire(time.monotonic() + 1)
+admission.release()
+metrics.register('admission', admission.stats)
+text = metrics.render()
+assert '# TYPE faq_admission_wait_ms histogram' in text
+assert 'faq_admission_wait_ms_bucket{le="+Inf"} 1' in text
+assert 'faq_admission_wait_ms_count 1' in text and 'faq_admission_queue_depth_sum' in text
+for line in text.splitlines():
+    assert line.startswith('#') or len(line.rsplit(' ', 1)) == 2, line
+print(f"   {len(text.splitlines())} lines")
+
+print("4. Sampled logging passes 1 in N...")
+records = []
+
+
+class Collect(logging.Handler):
+    def emit(self, record):
+        records.append(record.getMessage())
+
+
+logger = logging.getLogger('faq.test_metrics')
+logger.addHandler(Collect())
+logger.setLevel(logging.INFO)
+logger.propagate = False
+sampled = Sampled(logger, every=10)
+for i in range(25):
+    sampled.info('chat', "chat %d", i)
+sampled.debug('chat', "hidden below INFO")
+print(f"   {records}")
+assert records == ['chat 0', 'chat 10 (1 of 10)', 'chat 20 (1 of 10)']
+
+print("✅ All metrics tests passed!")
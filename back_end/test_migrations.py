@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Test the schema migrations on a large database in the original layout,
+and show the query plans of the hot queries before and after
+"""
+
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+from models import init_db, SCHEMA_VERSION
+
+FAQS = 20000
+CHATS = 200000
+CATEGORIES = ['IT', 'Library', 'Finance', 'Housing', 'Advising']
+
+QUERIES = {
+    'session history': (
+        "SELECT user_message, bot_response FROM chat_history WHERE session_id = ? ORDER BY timestamp",
+        ('session-42',)
+    ),
+    'chats since': (
+        "SELECT COUNT(*) FROM chat_history WHERE timestamp >= ?",
+        ('2026-06-30 00:00:00',)
+    ),
+    'faqs by category': (
+        "SELECT id, title FROM faqs WHERE id > ? AND category = ? ORDER BY id LIMIT 50",
+        (0, 'Finance')
+    ),
+    'recently updated': (
+        "SELECT article_id, title FROM faqs ORDER BY last_updated DESC LIMIT 20",
+        ()
+    ),
+}
+
+
+def make_legacy_db(path):
+    # The schema before the migration runner: tables only, no indexes,
+    # plus rows left behind in the old faq_articles table
+    conn = sqlite3.connect(path)
+    conn.execute("""
+    CREATE TABLE faqs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        article_id TEXT UNIQUE,
+        title TEXT NOT NULL,
+        content TEXT NOT NULL,
+        url TEXT,
+        category TEXT,
+        last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )""")
+    conn.execute("""
+    CREATE TABLE chat_history (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        session_id TEXT,
+        user_message TEXT,
+        bot_response TEXT,
+        timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )""")
+    conn.execute("""
+    CREATE TABLE faq_articles (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        article_id TEXT UNIQUE,
+        title TEXT NOT NULL,
+        content TEXT NOT NULL,
+        url TEXT,
+        category TEXT,
+        last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )""")
+
+    rng = random.Random(7)
+    conn.executemany(
+        "INSERT INTO faqs (article_id, title, content, url, category, last_updated) VALUES (?, ?, ?, ?, ?, ?)",
+        ((f"kb-{n}", f"Question {n}", f"Answer text for question {n}. " * 20, f"https://kb/{n}",
+          rng.choice(CATEGORIES), f"2026-{rng.randint(1, 9):02d}-{rng.randint(1, 28):02d} 12:00:00")
+         for n in range(FAQS))
+    )
+    conn.executemany(
+        "INSERT INTO chat_history (session_id, user_message, bot_response, timestamp) VALUES (?, ?, ?, ?)",
+        ((f"session-{rng.randint(0, 20000)}", "How do I reset my password?", "Use the portal.",
+          f"2026-{rng.randint(1, 9):02d}-{rng.randint(1, 28):02d} {rng.randint(0, 23):02d}:00:00")
+         for _ in range(CHATS))
+    )
+    conn.execute("INSERT INTO faq_articles (article_id, title, content) VALUES ('legacy-1', 'Old question', 'Old answer')")
+    conn.commit()
+    conn.close()
+
+
+def show_plans(path):
+    conn = sqlite3.connect(path)
+    timings = {}
+    for name, (sql, params) in QUERIES.items():
+        plan = '; '.join(row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params))
+        start = time.perf_counter()
+        for _ in range(20):
+            conn.execute(sql, params).fetchall()
+        timings[name] = (time.perf_counter() - start) / 20 * 1000
+        print(f"   {name:17} {timings[name]:7.2f} ms  {plan}")
+    conn.close()
+    return timings
+
+
+print("🧪 Testing schema migrations...")
+path = os.path.join(tempfile.mkdtemp(), 'legacy.db')
+make_legacy_db(path)
+print(f"1. Legacy database with {FAQS} FAQs and {CHATS} chats, plans before:")
+before = show_plans(path)
+
+print("2. Migrating...")
+start = time.perf_counter()
+assert init_db(path) == SCHEMA_VERSION
+print(f"   migrated to version {SCHEMA_VERSION} in {time.perf_counter() - start:.2f}s")
+
+print("3. Plans after:")
+after = show_plans(path)
+# faqs by category is already quick with common categories: the rowid scan hits early
+for name in ('session history', 'chats since', 'recently updated'):
+    assert after[name] < before[name], name
+
+print("4. Legacy faq_articles rows were carried over...")
+conn = sqlite3.connect(path)
+assert conn.execute("SELECT title FROM faqs WHERE article_id = 'legacy-1'").fetchone() == ('Old question',)
+assert conn.execute("SELECT name FROM sqlite_master WHERE name = 'faq_articles'").fetchone() is None
+fts_rows = conn.execute("SELECT COUNT(*) FROM faqs_fts WHERE faqs_fts MATCH 'question'").fetchone()[0]
+print(f"   faqs_fts rebuilt: {fts_rows} rows match 'question'")
+conn.close()
+
+print("5. Startup on an up-to-date database...")
+start = time.perf_counter()
+init_db(path)
+elapsed = time.perf_counter() - start
+print(f"   init_db took {elapsed * 1000:.1f} ms")
+assert elapsed < 0.5
+
+print("6. Fresh database...")
+fresh = os.path.join(tempfile.mkdtemp(), 'fresh.db')
+init_db(fresh)
+conn = sqlite3.connect(fresh)
+assert conn.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION
+conn.close()
+
+print("✅ All migration tests passed!")
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Test prompt assembly and time it on large candidate sets
+"""
+
+import contextlib
+import io
+import time
+
+from chunking import chunk_text
+from prompt_builder import PromptBuilder, estimate_tokens
+
+
+TOPICS = ['email', 'vpn', 'wifi', 'lab', 'account', 'storage', 'software', 'license', 'cluster', 'badge']
+
+
+def make_article(i, paragraphs):
+    sections = []
+    for p in range(paragraphs):
+        topic = TOPICS[(i + p) % len(TOPICS)]
+        body = ' '.join(
+            f"Step {s} for {topic} setup {i}-{p} covers configuring the {topic} client on a campus machine."
+            for s in range(6)
+        )
+        if p == paragraphs // 2:
+            body += " To reset the printer queue open the print manager and clear stuck jobs."
+        sections.append(f"## {topic.title()} {p}\n\n{body}")
+    return {'article_id': f'a{i}', 'title': f'Printer guide {i}', 'content': '\n\n'.join(sections)}
+
+
+def build(builder, question, articles):
+    chunks = {a['article_id']: chunk_text(a['title'], a['content']) for a in articles}
+    with contextlib.redirect_stdout(io.StringIO()):
+        return builder.build_context(question, articles, chunks)
+
+
+print("🧪 Testing prompt builder...")
+question = 'How do I reset the printer queue?'
+
+print("1. Token estimate is cached and roughly words * 1.3...")
+text = 'Open the print manager and clear stuck jobs from the departmental printer queue. ' * 20
+estimate = estimate_tokens(text)
+print(f"   {len(text.split())} words -> ~{estimate} tokens")
+assert len(text.split()) <= estimate <= 2 * len(text.split())
+hits = estimate_tokens.cache_info().hits
+estimate_tokens(text)
+assert estimate_tokens.cache_info().hits == hits + 1
+
+print("2. Context stays inside the budget and keeps the answer...")
+builder = PromptBuilder(context_budget=800)
+articles = [make_article(i, 40) for i in range(5)]
+context, stats = build(builder, question, articles)
+print(f"   {stats}")
+assert stats['context_tokens'] <= 800
+assert 'printer queue' in context
+
+print("3. Budget shrinks to leave room for the answer...")
+small = PromptBuilder(context_budget=5000, max_prompt_tokens=2000, answer_tokens=1024)
+context, stats = build(small, question, articles)
+assert stats['prompt_tokens'] + small.answer_tokens <= 2000 + 16, stats
+
+print("4. Duplicate passages from copied articles are dropped...")
+copies = [dict(articles[0], article_id=f'copy{i}') for i in range(4)]
+context, stats = build(PromptBuilder(context_budget=800), question, copies)
+print(f"   {stats['duplicates']} duplicates dropped")
+assert stats['duplicates'] > 0
+assert context.count('To reset the printer queue') == 1
+
+print("5. Adjacent passages are stitched without repeating the overlap...")
+article = {'article_id': 'x', 'title': 'T', 'content': ' '.join(f'w{n}' for n in range(300))}
+context, stats = build(PromptBuilder(context_budget=5000), 'w5', [article])
+assert stats['passages'] == 1
+assert context.split().count('w150') == 1
+
+print("6. No articles gives the fallback context...")
+context, stats = build(PromptBuilder(), question, [])
+assert context.startswith('No relevant articles')
+
+print("7. Assembly time...")
+for count, paragraphs in ((5, 10), (5, 100), (20, 100)):
+    articles = [make_article(i, paragraphs) for i in range(count)]
+    chunks = {a['article_id']: chunk_text(a['title'], a['content']) for a in articles}
+    builder = PromptBuilder()
+    runs = 50
+    with contextlib.redirect_stdout(io.StringIO()):
+        # First build tokenizes every passage, later ones hit the caches
+        start = time.perf_counter()
+        builder.build_context(question, articles, chunks)
+        cold = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        for _ in range(runs):
+            builder.build_context(question, articles, chunks)
+        warm = (time.perf_counter() - start) * 1000 / runs
+    candidates = sum(len(c) for c in chunks.values())
+    print(f"   {count} articles, {candidates:4d} passages: {cold:6.2f} ms cold, {warm:6.2f} ms warm")
+
+print("✅ All prompt builder tests passed!")
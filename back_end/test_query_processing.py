@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Test stemming and KB-vocabulary spelling correction in front of search
+"""
+
+import random
+import time
+
+from benchmark import make_kb, make_workload
+from query_processing import SpellCorrector, stem, edit_distance
+from search_index import SearchIndex
+
+print("🧪 Testing query processing...")
+
+print("1. Stemming...")
+for word, expected in [('passwords', 'password'), ('printing', 'print'), ('settings', 'set'),
+                       ('configured', 'configur'), ('configure', 'configur'), ('policies', 'polici'),
+                       ('hopping', 'hop'), ('synced', 'sync'), ('vpn', 'vpn'), ('2fa', '2fa')]:
+    assert stem(word) == expected, (word, stem(word))
+assert edit_distance('pasword', 'password', 2) == 1
+assert edit_distance('factr', 'factor', 2) == 1
+assert edit_distance('recieve', 'receive', 2) == 1
+assert edit_distance('abc', 'xyzabc', 2) == 3
+
+print("2. Building the dictionary...")
+articles = make_kb(10000, seed=6)
+start = time.perf_counter()
+speller = SpellCorrector()
+speller.load((a['article_id'], a['title'], a['content']) for a in articles)
+print(f"   {len(articles)} FAQs in {(time.perf_counter() - start) * 1000:.0f} ms, {speller.stats()}")
+
+
+def typo(word, rng):
+    # One random delete, insert, substitution or transposition
+    i = rng.randrange(1, len(word) - 1)
+    kind = rng.randrange(4)
+    if kind == 0:
+        return word[:i] + word[i + 1:]
+    if kind == 1:
+        return word[:i] + rng.choice('abcdefghijklmnopqrstuvwxyz') + word[i:]
+    if kind == 2:
+        return word[:i] + rng.choice('abcdefghijklmnopqrstuvwxyz') + word[i + 1:]
+    return word[:i - 1] + word[i] + word[i - 1] + word[i + 1:]
+
+
+print("3. Search with typos, raw vs corrected...")
+index = SearchIndex()
+index.load((a['article_id'], a['title'], a['content'], a['url'], a['last_updated'], a['category'])
+           for a in articles)
+rng = random.Random(7)
+workload = []
+for question, expected in make_workload(articles, 1000, seed=8):
+    words = [typo(w, rng) if len(w) >= 5 and rng.random() < 0.5 else w for w in question.split()]
+    workload.append((question, ' '.join(words), expected))
+
+recall = {}
+seconds = []
+for mode in ('clean', 'typos', 'corrected'):
+    hits = 0
+    for clean, noisy, expected in workload:
+        query = clean if mode == 'clean' else noisy
+        if mode == 'corrected':
+            start = time.perf_counter()
+            query, _ = speller.correct(noisy)
+            seconds.append(time.perf_counter() - start)
+        hits += expected in [a['article_id'] for a in index.search(query, 5)]
+    recall[mode] = hits / len(workload)
+seconds.sort()
+print(f"   recall@5 clean {recall['clean']:.3f}, with typos {recall['typos']:.3f}, "
+      f"corrected {recall['corrected']:.3f}; correction p50 {seconds[len(seconds) // 2] * 1e6:.0f} us, "
+      f"p99 {seconds[int(len(seconds) * 0.99)] * 1e6:.0f} us")
+assert recall['corrected'] > recall['typos'] + 0.2
+assert recall['corrected'] > recall['clean'] - 0.1
+
+print("4. Known, short and numeric words are left alone...")
+clean = workload[0][0]
+assert speller.correct(clean) == (clean, [])
+assert speller.correct("vpm 2fa a1b2") == ("vpm 2fa a1b2", [])
+
+print("5. Dictionary follows FAQ edits...")
+speller = SpellCorrector()
+speller.add_faq('kb-1', "Two factor authentication", "Set up two factor sign in with Duo.")
+speller.add_faq('kb-2', "Password reset", "Reset your password from the portal.")
+print(f"   {speller.correct('how do i set up two factr')}, {speller.correct('pasword resett')}")
+assert speller.correct("two factr")[0] == "two factor"
+assert speller.correct("pasword")[0] == "password"
+speller.add_faq('kb-1', "Multi-factor sign in", "Use Duo for multi factor sign in.")
+speller.remove('kb-2')
+assert speller.correct("pasword")[0] == "pasword"
+assert speller.correct("factr")[0] == "factor"
+speller.remove('kb-1')
+assert speller.correct("factr")[0] == "factr"
+
+print("✅ All query processing tests passed!")
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Test and time Confluence sync against the local stub server
+"""
+
+import contextlib
+import io
+import os
+import time
+
+from stub_confluence import StubConfluenceServer
+
+stub = StubConfluenceServer(num_pages=500, latency=0.05, body_latency=0.1).start()
+
+# AtlassianClient reads its settings from the environment at import time
+os.environ['ATLASSIAN_BASE_URL'] = stub.base_url
+for name in ('SECRET_KEY', 'ATLASSIAN_EMAIL', 'ATLASSIAN_API_TOKEN'):
+    os.environ.setdefault(name, 'test')
+os.environ['ATLASSIAN_SPACE_KEY'] = 'KB'
+
+from atlassian_cl import AtlassianClient, AtlassianError
+
+
+def timed(label, fetch):
+    stub.requests = stub.throttled = 0
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        articles = list(fetch())
+    elapsed = time.perf_counter() - start
+    print(f"   {label}: {len(articles)} pages in {elapsed:.2f}s "
+          f"({stub.requests} requests, {stub.throttled} throttled)")
+    return articles
+
+
+print("🧪 Testing Confluence sync against stub server...")
+
+print("1. Sequential paginated fetch with bodies...")
+sequential = AtlassianClient(max_workers=1)
+articles = timed("sequential", sequential.iter_articles)
+assert len(articles) == 500, "pagination stopped early"
+
+print("2. List ids, then fetch bodies with 4 workers...")
+client = AtlassianClient(max_workers=4)
+articles = timed("concurrent", lambda: client.get_changed_articles({}))
+assert len(articles) == 500
+assert len({a['id'] for a in articles}) == 500
+
+print("3. Same with 20% of requests rate limited (429 + Retry-After)...")
+stub.rate_limit = 0.2
+articles = timed("concurrent + 429s", lambda: client.get_changed_articles({}))
+assert len(articles) == 500, "retries did not recover every page"
+stub.rate_limit = 0.0
+
+print("4. Incremental sync only fetches changed pages...")
+known = {a['id']: a['version']['number'] for a in articles}
+stub.pages['42']['version']['number'] = 2
+changed = timed("incremental", lambda: client.get_changed_articles(known))
+assert [a['id'] for a in changed] == ['42']
+
+print("5. A page that cannot be read fails the sync instead of ending it...")
+for status in (401, 500):
+    stub.fail_status, stub.fail_cursor = status, 200
+    failing = AtlassianClient(max_workers=4, max_retries=1, backoff_base=0.01)
+    seen = []
+    try:
+        for article in failing.get_changed_articles({}):
+            seen.append(article)
+        raise AssertionError(f"{status} on the second listing page was swallowed")
+    except AtlassianError as e:
+        assert e.status == status and not seen, (status, e.status, len(seen))
+    print(f"   {status}: raised after listing {stub.fail_cursor} pages, nothing fetched")
+stub.fail_status = None
+
+stub.shutdown()
+print("✅ All sync tests passed!")
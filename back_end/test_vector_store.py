@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Test the memory-mapped vector store: writes, rebuilds and other workers
+"""
+
+import json
+import os
+import tempfile
+import threading
+
+from database import DatabaseManager
+from embeddings import VectorStore
+from models import init_db
+
+FAQS = [
+    ('vpn', "Connecting to the Campus VPN", "Install GlobalProtect and sign in with your campus ID."),
+    ('wifi', "Joining eduroam Wi-Fi", "Select eduroam and enter your campus email and password."),
+    ('print', "Printing in the Computer Labs", "Release print jobs at any station with your campus card."),
+]
+
+
+def write(db, sql, params=()):
+    conn = db.get_connection()
+    conn.execute(sql, params)
+    conn.commit()
+    conn.close()
+
+
+def top(store, query):
+    found = store.search_articles(query, 1)
+    return found[0]['article_id'] if found else None
+
+
+print("🧪 Testing the vector store...")
+folder = tempfile.mkdtemp()
+path = os.path.join(folder, 'faqs.db')
+init_db(path)
+db = DatabaseManager(path)
+for article_id, title, content in FAQS:
+    write(db, "INSERT INTO faqs (article_id, title, content, last_updated) VALUES (?, ?, ?, '2026-01-01')",
+          (article_id, title, content))
+
+print("1. Build and search...")
+store = VectorStore(db, path=os.path.join(folder, 'vectors.json'))
+store.load()
+db.vectors = store
+assert top(store, "globalprotect vpn") == 'vpn'
+assert top(store, "eduroam wifi") == 'wifi'
+
+print("2. Writes show up without a rebuild...")
+write(db, "INSERT INTO faqs (article_id, title, content, last_updated) VALUES "
+          "('park', 'Buying a Parking Permit', 'Parking permits are sold online.', '2026-01-01')")
+db.refresh_article('park')
+assert top(store, "parking permit") == 'park'
+write(db, "UPDATE faqs SET title = 'Campus Printers', content = 'Printer queues and toner.' "
+          "WHERE article_id = 'print'")
+db.refresh_article('print')
+assert top(store, "toner printer queues") == 'print'
+write(db, "DELETE FROM faqs WHERE article_id = 'vpn'")
+db.refresh_article('vpn')
+assert top(store, "globalprotect vpn") != 'vpn'
+print(f"   {store.stats()}")
+assert store.stats() == {'rows': 3, 'overlay': 3}
+
+print("3. Rebuild folds the overlay into the matrix...")
+store.compact()
+assert store.stats() == {'rows': 3, 'overlay': 0}
+assert top(store, "parking permit") == 'park' and top(store, "toner printer queues") == 'print'
+assert len([f for f in os.listdir(folder) if f.endswith('.npy')]) == 1
+
+print("4. Another worker picks up the rebuilt matrix...")
+other_db = DatabaseManager(path)
+other = VectorStore(other_db, path=store.path)
+other.load()
+other_db.vectors = other
+write(db, "INSERT INTO faqs (article_id, title, content, last_updated) VALUES "
+          "('room', 'Booking a Study Room', 'Reserve library study rooms online.', '2026-01-01')")
+db.refresh_article('room')
+other_db.checked_at = 0
+other_db.refresh_changed()
+assert top(other, "library study room") == 'room' and other.stats()['overlay'] == 1
+store.compact()
+assert top(other, "library study room") == 'room'
+assert other.stats() == {'rows': 4, 'overlay': 0}, other.stats()
+
+print("5. Concurrent rebuilds never pair ids with another build's rows...")
+errors = []
+
+
+def reader():
+    for _ in range(200):
+        try:
+            other.load()
+            with open(store.path) as f:
+                manifest = json.load(f)
+            assert other.matrix.shape[0] == len(other.article_ids), (other.matrix.shape, len(other.article_ids))
+            assert len(manifest['ids']) == len(manifest['digests'])
+        except Exception as e:
+            errors.append(e)
+
+
+thread = threading.Thread(target=reader)
+thread.start()
+for i in range(20):
+    write(db, "INSERT INTO faqs (article_id, title, content, last_updated) VALUES (?, ?, 'Body.', '2026-01-01')",
+          (f'extra-{i}', f'Extra {i}'))
+    store.build()
+thread.join()
+assert not errors, errors[:3]
+
+print("✅ All vector store tests passed!")
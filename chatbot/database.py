@@ -1,12 +1,47 @@
 import sqlite3
+import re
 from datetime import datetime
 
+# Words that carry no meaning for KB search
+STOPWORDS = {
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'but', 'by', 'can', 'do',
+    'does', 'for', 'from', 'how', 'i', 'if', 'in', 'is', 'it', 'me', 'my',
+    'of', 'on', 'or', 'so', 'the', 'to', 'what', 'when', 'where', 'which',
+    'who', 'why', 'with', 'you', 'your'
+}
+
+TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+# bm25 column weights for faq_articles_fts (title, content)
+TITLE_WEIGHT = 10.0
+CONTENT_WEIGHT = 1.0
+
+
+def build_fts_query(query):
+    # Turn a free-text question into an FTS5 MATCH expression
+    tokens = [t for t in TOKEN_RE.findall(query.lower()) if t not in STOPWORDS]
+    if not tokens:
+        return None
+
+    # Dedupe but keep the user's word order
+    seen = []
+    for token in tokens:
+        if token not in seen:
+            seen.append(token)
+
+    # Prefix match each term so "login" also hits "logins"/"logging"
+    return ' OR '.join(f'"{token}"*' for token in seen)
+
+
 class DatabaseManager:
     def __init__(self, db_path='faq_chatbot.db'):
         self.db_path = db_path
     
     def get_connection(self):
-        return sqlite3.connect(self.db_path)
+        conn = sqlite3.connect(self.db_path)
+        # INSERT OR REPLACE must fire the delete trigger so faq_articles_fts stays in sync
+        conn.execute('PRAGMA recursive_triggers = ON')
+        return conn
     
     def sync_articles(self, articles):
         """Sync articles from Atlassian to local database"""
@@ -38,39 +73,62 @@ class DatabaseManager:
         print(f" Successfully synced {len(articles)} articles to database")
     
     def search_articles(self, query, limit=5):
-        # Search for relevant articles based on query
+        # Search for relevant articles based on query, best match first
+        match = build_fts_query(query)
+        if not match:
+            return []
+
         conn = self.get_connection()
         c = conn.cursor()
-        
-        # Simple keyword search
-        search_term = f'%{query}%'
-        
+
         try:
             c.execute('''
-                SELECT title, content, url 
-                FROM faq_articles 
-                WHERE title LIKE ? OR content LIKE ?
+                SELECT f.title, f.content, f.url, f.article_id
+                FROM faq_articles_fts
+                JOIN faq_articles f ON f.id = faq_articles_fts.rowid
+                WHERE faq_articles_fts MATCH ?
+                ORDER BY bm25(faq_articles_fts, ?, ?)
                 LIMIT ?
-            ''', (search_term, search_term, limit))
-            
+            ''', (match, TITLE_WEIGHT, CONTENT_WEIGHT, limit))
+
             results = c.fetchall()
-            
-            formatted_results = []
-            for row in results:
-                formatted_results.append({
-                    'title': row[0], 
-                    'content': row[1], 
-                    'url': row[2]
-                })
-            
-            return formatted_results
-            
+
+        except sqlite3.OperationalError as e:
+            # No FTS5 in this SQLite build, fall back to keyword search
+            print(f" FTS search unavailable, using LIKE: {e}")
+            try:
+                results = self._like_search(c, query, limit)
+            except Exception as e:
+                print(f" Search error: {e}")
+                return []
         except Exception as e:
             print(f" Search error: {e}")
             return []
         finally:
             conn.close()
-    
+
+        formatted_results = []
+        for row in results:
+            formatted_results.append({
+                'title': row[0],
+                'content': row[1],
+                'url': row[2],
+                'article_id': row[3]
+            })
+
+        return formatted_results
+
+    def _like_search(self, c, query, limit):
+        # Simple keyword search
+        search_term = f'%{query}%'
+        c.execute('''
+            SELECT title, content, url, article_id
+            FROM faq_articles
+            WHERE title LIKE ? OR content LIKE ?
+            LIMIT ?
+        ''', (search_term, search_term, limit))
+        return c.fetchall()
+
     def save_chat(self, session_id, user_message, bot_response):
         # Save chat history
         conn = self.get_connection()
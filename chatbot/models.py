@@ -15,9 +15,31 @@ def init_db():
     # chat history table
     c.execute(query2)
 
+    init_fts(c)
+
     conn.commit()
     conn.close()
 
+def init_fts(c):
+    # Full-text index over faq_articles title/content, kept in sync by triggers
+    c.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='faq_articles_fts'")
+    exists = c.fetchone() is not None
+
+    try:
+        c.execute("CREATE VIRTUAL TABLE IF NOT EXISTS faq_articles_fts USING fts5(title, content, content='faq_articles', content_rowid='id', tokenize='porter unicode61')")
+    except sqlite3.OperationalError as e:
+        # SQLite built without FTS5, search_articles falls back to LIKE
+        print(f"FTS5 not available: {e}")
+        return
+
+    c.execute("CREATE TRIGGER IF NOT EXISTS faq_articles_ai AFTER INSERT ON faq_articles BEGIN INSERT INTO faq_articles_fts(rowid, title, content) VALUES (new.id, new.title, new.content); END")
+    c.execute("CREATE TRIGGER IF NOT EXISTS faq_articles_ad AFTER DELETE ON faq_articles BEGIN INSERT INTO faq_articles_fts(faq_articles_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content); END")
+    c.execute("CREATE TRIGGER IF NOT EXISTS faq_articles_au AFTER UPDATE ON faq_articles BEGIN INSERT INTO faq_articles_fts(faq_articles_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content); INSERT INTO faq_articles_fts(rowid, title, content) VALUES (new.id, new.title, new.content); END")
+
+    # Index rows that were already in faq_articles before the FTS table existed
+    if not exists:
+        c.execute("INSERT INTO faq_articles_fts(faq_articles_fts) VALUES ('rebuild')")
+
 if __name__ == '__main__':
     init_db()
     print("Database initialized.")
\ No newline at end of file
@@ -49,24 +49,65 @@ export default function ChatBot() {
     setIsTyping(true);
     setInputMessage("");
 
-    try {
-    const response = await fetch("http://127.0.0.1:8000/api/chat", {
-  method: "POST",
-  headers: { "Content-Type": "application/json" },
-  body: JSON.stringify({ message: inputMessage }),
-    });
-
-
-      const data = await response.json();
-
-      const botMessage: Message = {
-        id: (Date.now() + 1).toString(),
-        content: data.answer || "Sorry, I couldn’t find an answer for that.",
-        sender: "bot",
-        timestamp: new Date(),
-      };
+    const botId = (Date.now() + 1).toString();
+    let answer = "";
+
+    const showAnswer = (content: string) => {
+      setMessages((prev) =>
+        prev.some((m) => m.id === botId)
+          ? prev.map((m) => (m.id === botId ? { ...m, content } : m))
+          : [
+              ...prev,
+              { id: botId, content, sender: "bot", timestamp: new Date() },
+            ]
+      );
+    };
 
-      setMessages((prev) => [...prev, botMessage]);
+    try {
+      const response = await fetch("http://127.0.0.1:8000/api/chat/stream", {
+        method: "POST",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify({ message: inputMessage }),
+      });
+
+      if (!response.ok || !response.body) {
+        throw new Error(`Chat request failed: ${response.status}`);
+      }
+
+      // Server-Sent Events: "event: <name>\ndata: <json>\n\n"
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = "";
+
+      while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+
+        buffer += decoder.decode(value, { stream: true });
+        const events = buffer.split("\n\n");
+        buffer = events.pop() ?? "";
+
+        for (const raw of events) {
+          let event = "message";
+          let data = "";
+          for (const line of raw.split("\n")) {
+            if (line.startsWith("event: ")) event = line.slice(7);
+            else if (line.startsWith("data: ")) data += line.slice(6);
+          }
+
+          if (event === "token") {
+            answer += JSON.parse(data).text;
+            setIsTyping(false);
+            showAnswer(answer);
+          } else if (event === "error") {
+            throw new Error(JSON.parse(data).error);
+          }
+        }
+      }
+
+      if (!answer) {
+        showAnswer("Sorry, I couldn’t find an answer for that.");
+      }
     } catch (error) {
       console.error(error);
       setMessages((prev) => [
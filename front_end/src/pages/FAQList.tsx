@@ -6,7 +6,8 @@ import { useState } from "react";
 interface FAQ {
   id: string;
   question: string;
-  answer: string;
+  // List responses leave the answer out; it is fetched when expanded
+  answer?: string;
   category: string;
 }
 
@@ -16,9 +17,23 @@ interface FAQListProps {
 
 export default function FAQList({ faqs }: FAQListProps) {
   const [expandedFAQ, setExpandedFAQ] = useState<string | null>(null);
+  const [answers, setAnswers] = useState<Record<string, string>>({});
 
-  const toggleFAQ = (id: string) => {
-    setExpandedFAQ(expandedFAQ === id ? null : id);
+  const toggleFAQ = async (faq: FAQ) => {
+    setExpandedFAQ(expandedFAQ === faq.id ? null : faq.id);
+    if (faq.answer || answers[faq.id] !== undefined) {
+      return;
+    }
+    try {
+      const response = await fetch(`http://127.0.0.1:8000/api/faqs/${encodeURIComponent(faq.id)}`);
+      if (!response.ok) {
+        throw new Error(`FAQ request failed: ${response.status}`);
+      }
+      const data = await response.json();
+      setAnswers((prev) => ({ ...prev, [faq.id]: data.answer }));
+    } catch (error) {
+      console.error("Error loading FAQ:", error);
+    }
   };
 
   if (faqs.length === 0) {
@@ -36,7 +51,7 @@ export default function FAQList({ faqs }: FAQListProps) {
         <Card key={faq.id} className="transition-shadow hover:shadow-md">
           <CardHeader 
             className="cursor-pointer"
-            onClick={() => toggleFAQ(faq.id)}
+            onClick={() => toggleFAQ(faq)}
           >
             <div className="flex items-start justify-between">
               <div className="flex-1">
@@ -63,7 +78,7 @@ export default function FAQList({ faqs }: FAQListProps) {
             <CardContent className="pt-0">
               <div className="border-t pt-4">
                 <p className="text-gray-700 leading-relaxed whitespace-pre-wrap">
-                  {faq.answer}
+                  {faq.answer ?? answers[faq.id] ?? "Loading..."}
                 </p>
               </div>
             </CardContent>
@@ -1,4 +1,4 @@
-import { useState } from "react";
+import { useEffect, useState } from "react";
 import { BarChart, Users, MessageSquare, FileText, Plus, Edit, Trash2, Eye } from "lucide-react";
 import { Card, CardContent, CardHeader, CardTitle } from "./features/ui_features/card";
 import { Button } from "./features/button";
@@ -19,6 +19,16 @@ interface User {
   role: 'student' | 'faculty'| 'admin';
 }
 
+interface ManagedFAQ {
+  article_id: string;
+  question: string;
+  category: string;
+  lastUpdated: string;
+}
+
+// List view only needs these columns; the answer is fetched per FAQ
+const FAQ_LIST_URL = "http://127.0.0.1:8000/api/faqs?limit=50&fields=question,category,lastUpdated";
+
 interface FacultyDashboardProps {
   user: User;
 }
@@ -49,12 +59,30 @@ export default function FacultyDashboard({ user }: FacultyDashboardProps) {
     { id: 'T005', student: 'David Brown', subject: 'Internship Information', priority: 'low', status: 'resolved', created: '2 days ago' }
   ];
 
-  // Mock FAQ management data
-  const managedFAQs = [
-    { id: '1', question: 'What are the prerequisites for CMSC 341?', category: 'Prerequisites', lastUpdated: '2 days ago' },
-    { id: '2', question: 'How do I get lab access?', category: 'Technical Support', lastUpdated: '1 week ago' },
-    { id: '3', question: 'When should I meet with my advisor?', category: 'Academic Advising', lastUpdated: '3 days ago' }
-  ];
+  // FAQ management list, one keyset page at a time
+  const [managedFAQs, setManagedFAQs] = useState<ManagedFAQ[]>([]);
+  const [nextAfter, setNextAfter] = useState<number | null>(null);
+
+  const loadFAQs = async (after: number = 0) => {
+    try {
+      // The server answers an unchanged page with 304 (ETag), which the
+      // browser turns back into the cached body
+      const response = await fetch(`${FAQ_LIST_URL}&after=${after}`);
+      if (!response.ok) {
+        throw new Error(`FAQ list request failed: ${response.status}`);
+      }
+      const data = await response.json();
+      setManagedFAQs((prev) => (after === 0 ? data.faqs : [...prev, ...data.faqs]));
+      setNextAfter(data.next_after);
+    } catch (error) {
+      console.error("Error loading FAQs:", error);
+      toast.error("Could not load FAQs");
+    }
+  };
+
+  useEffect(() => {
+    loadFAQs();
+  }, []);
 
   const handleAddFAQ = () => {
     if (!newFAQ.question || !newFAQ.answer) {
@@ -296,7 +324,7 @@ export default function FacultyDashboard({ user }: FacultyDashboardProps) {
                 </TableHeader>
                 <TableBody>
                   {managedFAQs.map((faq) => (
-                    <TableRow key={faq.id}>
+                    <TableRow key={faq.article_id}>
                       <TableCell className="font-medium">{faq.question}</TableCell>
                       <TableCell>
                         <Badge variant="outline">{faq.category}</Badge>
@@ -316,6 +344,13 @@ export default function FacultyDashboard({ user }: FacultyDashboardProps) {
                   ))}
                 </TableBody>
               </Table>
+              {nextAfter !== null && (
+                <div className="flex justify-center pt-4">
+                  <Button variant="outline" onClick={() => loadFAQs(nextAfter)}>
+                    Load more
+                  </Button>
+                </div>
+              )}
             </CardContent>
           </Card>
         </TabsContent>